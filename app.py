@@ -7,8 +7,7 @@ import json
 import re
 import time
 import os
-from src.state import alert_state
-from src.config_utils import load_config, get_alert_config, get_restart_command
+from src.config_utils import load_config, get_alert_config, get_restart_command, get_clusters, get_cluster
 from src.telegram import telegram_enabled, send_telegram_message, should_send_alert
 from src.utils import calculate_rate
 from src.haproxy import (
@@ -24,12 +23,27 @@ from src.haproxy import (
 )
 from src.cluster import read_node_status as _read_node_status, calculate_rates as _calc_rates, get_node_status, parse_wsrep_provider_options
 from src.alerts import evaluate_alerts
+from src.history import record_history, api_history
+from src.anomaly import api_anomalies
+from src.collector import start_collector, get_cluster_snapshot
+from src.timing import start_trace, end_trace, get_trace, server_timing_header, api_debug_timings
+from src.breaker import api_breakers
 from src.slow_queries import api_slow_queries
 from src.transactions import handle_transactions, handle_process_list, handle_kill_process
-from src.config import api_get_config, api_update_config
+from src.config import api_get_config, api_update_config, api_update_cluster_config
+from src.config_drift import api_config_diff, start_drift_monitor
+from src.health import api_health, start_health_refresher
+from src.balancer import api_balancer_status, api_balancer_run, start_balancer
+from src.probes import start_probes, get_probe_latency
+from src.alert_history import api_alerts
+from src.timeline import api_timeline
+from src.export import api_export
 from src.auth import AuthManager
+from src.responses import FastJSONProvider, compress_response
+from src.coalesce import coalesced
 
 app = Flask(__name__)
+app.json = FastJSONProvider(app)
 app.secret_key = 'your-secret-key-change-this-in-production'  # Change this in production!
 
 # Initialize authentication
@@ -47,45 +61,85 @@ auth_manager = AuthManager(app)
 
 # Authentication routes are now handled by AuthManager in src/auth.py
 
+# HAProxy polls the health check every few seconds; it only needs fresh snapshots
+HEALTH_ENDPOINT = 'route_health'
+
+@app.before_request
+def start_request_timing():
+    # Reset for every request: worker threads are reused, and a trace left
+    # over from an earlier /api/ request must not leak into this one
+    if request.path.startswith('/api/'):
+        start_trace()
+    else:
+        end_trace()
+
+@app.before_request
+def start_background_collector():
+    # Started on first request so the reloader's parent process never polls
+    start_collector()
+    if request.endpoint == HEALTH_ENDPOINT:
+        start_health_refresher()
+        return
+    start_drift_monitor()
+    start_balancer()
+    start_probes()
+
+@app.after_request
+def add_server_timing(response):
+    trace = get_trace()
+    if trace:
+        response.headers['Server-Timing'] = server_timing_header(trace)
+    return response
+
+@app.teardown_request
+def end_request_timing(exc):
+    end_trace()
+
+# Registered after add_server_timing so it runs first and its span is reported
+app.after_request(compress_response)
+
 @app.route('/')
 @login_required
 def index():
     return render_template('index.html')
 
+@app.route('/api/clusters')
+@login_required
+def api_clusters():
+    try:
+        clusters = [{
+            'name': cluster['name'],
+            'nodes': len(cluster['nodes']),
+            'interval_seconds': cluster['interval_seconds']
+        } for cluster in get_clusters()]
+        return jsonify({'ok': True, 'clusters': clusters})
+    except Exception as e:
+        return jsonify({'ok': False, 'error': str(e)}), 500
+
 @app.route('/api/status')
 @login_required
+@coalesced
 def get_cluster_status():
     try:
-        config = load_config()
-        if not config or 'nodes' not in config:
+        cluster = get_cluster(request.args.get('cluster'))
+        if cluster is None:
+            return jsonify({'error': f"Unknown cluster {request.args.get('cluster')}"}), 404
+        if not cluster['nodes']:
             print("Error: No nodes found in config")
             return jsonify({'error': 'No nodes configured'}), 500
         
-        nodes_status = []
-        for node in config['nodes']:
-            status = get_node_status(node)
-            nodes_status.append(status)
-            if status.get('error'):
-                print(f"Error for node {node.get('host')}: {status['error']}")
-        
-        # Evaluate alerts based on current snapshot
-        try:
-            evaluate_alerts(nodes_status)
-        except Exception as e:
-            print(f"Alert evaluation error: {e}")
-            # Never let alert evaluation break the API response
-            pass
-        
-        # Add HAProxy weights to the response
-        try:
-            haproxy_weights = get_haproxy_server_weights()
-        except Exception as e:
-            print(f"HAProxy weights error: {e}")
-            haproxy_weights = {}
+        # Served from the background collector when it runs, polled now otherwise
+        snapshot = get_cluster_snapshot(cluster)
         
         response_data = {
-            'nodes': nodes_status,
-            'haproxy_weights': haproxy_weights
+            'cluster': snapshot['cluster'],
+            'nodes': snapshot['nodes'],
+            'haproxy_weights': snapshot['haproxy_weights'],
+            'poll_intervals': snapshot['poll_intervals'],
+            'replication': snapshot.get('replication', {}),
+            'flow_control': snapshot.get('flow_control', {}),
+            'probes': get_probe_latency(snapshot['cluster']),
+            'collected_at': snapshot['collected_at']
         }
         
         response = jsonify(response_data)
@@ -97,19 +151,57 @@ def get_cluster_status():
         print(f"Critical error in get_cluster_status: {e}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/debug/timings', methods=['GET'])
+@login_required
+def route_api_debug_timings():
+    return api_debug_timings()
+
+@app.route('/api/debug/breakers', methods=['GET'])
+@login_required
+def route_api_debug_breakers():
+    return api_breakers()
+
+@app.route('/api/history', methods=['GET'])
+@login_required
+def route_api_history():
+    return api_history()
+
+@app.route('/api/export', methods=['GET'])
+@login_required
+def route_api_export():
+    return api_export()
+
+@app.route('/api/alerts', methods=['GET'])
+@login_required
+def route_api_alerts():
+    return api_alerts()
+
+@app.route('/api/timeline', methods=['GET'])
+@login_required
+def route_api_timeline():
+    return api_timeline()
+
+@app.route('/api/anomalies', methods=['GET'])
+@login_required
+def route_api_anomalies():
+    return api_anomalies()
+
 @app.route('/api/haproxy/server/<action>', methods=['POST'])
 @login_required
 def api_haproxy_server_action(action):
     try:
         body = request.get_json(silent=True) or {}
-        backend = body.get('backend') or load_config().get('haproxy', {}).get('backend_name', 'galera_cluster_backend')
+        cluster = get_cluster(body.get('cluster'))
+        if cluster is None:
+            return jsonify({'ok': False, 'error': 'Unknown cluster'}), 404
+        backend = body.get('backend') or cluster.get('haproxy', {}).get('backend_name', 'galera_cluster_backend')
         server = body.get('server')
         host = body.get('host')
         if not server:
             if not host:
                 return jsonify({'ok': False, 'error': 'server or host is required'}), 400
-            server = get_haproxy_server_name_for_host(host)
-        ok, msg = haproxy_admin_server_action(backend, server, action)
+            server = get_haproxy_server_name_for_host(host, cluster)
+        ok, msg = haproxy_admin_server_action(backend, server, action, cluster)
         return jsonify({'ok': ok, 'message': msg}), (200 if ok else 500)
     except Exception as e:
         return jsonify({'ok': False, 'error': str(e)}), 500
@@ -124,10 +216,21 @@ def route_api_haproxy_restart():
 def route_api_haproxy_set_weight():
     return api_haproxy_set_weight()
 
+@app.route('/api/haproxy/balancer', methods=['GET'])
+@login_required
+def route_api_balancer_status():
+    return api_balancer_status()
+
+@app.route('/api/haproxy/balancer/run', methods=['POST'])
+@login_required
+def route_api_balancer_run():
+    return api_balancer_run()
+
 
 
 @app.route('/api/slow_queries', methods=['GET'])
 @login_required
+@coalesced
 def route_api_slow_queries():
     # Fix dependency injection
     from src.slow_queries import get_nodes_status, load_config
@@ -138,6 +241,7 @@ def route_api_slow_queries():
 
 @app.route('/api/get_config', methods=['GET'])
 @login_required
+@coalesced
 def route_api_get_config():
     return api_get_config()
 
@@ -146,13 +250,30 @@ def route_api_get_config():
 def route_api_update_config():
     return api_update_config()
 
+@app.route('/api/update_config/cluster', methods=['POST'])
+@login_required
+def route_api_update_cluster_config():
+    return api_update_cluster_config()
+
+@app.route('/api/config/diff', methods=['GET'])
+@login_required
+def route_api_config_diff():
+    return api_config_diff()
+
+# Unauthenticated on purpose: HAProxy polls it as an httpchk
+@app.route('/health/<host>', methods=['GET'])
+def route_health(host):
+    return api_health(host)
+
 @app.route('/api/transactions', methods=['GET'])
 @login_required
+@coalesced
 def route_api_transactions():
     return handle_transactions()
 
 @app.route('/api/process_list', methods=['GET'])
 @login_required
+@coalesced
 def route_api_process_list():
     return handle_process_list()
 
@@ -165,8 +286,10 @@ def route_api_kill_process():
 @login_required
 def api_nodes():
     try:
-        config = load_config()
-        nodes = config.get('nodes', [])
+        cluster = get_cluster(request.args.get('cluster'))
+        if cluster is None:
+            return jsonify({'ok': False, 'error': 'Unknown cluster'}), 404
+        nodes = cluster['nodes']
         
         # Format nodes data for frontend
         formatted_nodes = []
@@ -179,6 +302,7 @@ def api_nodes():
         
         return jsonify({
             'ok': True,
+            'cluster': cluster['name'],
             'nodes': formatted_nodes
         })
     except Exception as e:
@@ -0,0 +1,129 @@
+"""
+Record live collector samples and replay them through collection and alerts.
+
+Usage (run from the directory holding config.yaml):
+    python -m benchmarks.replay record --output storm.ndjson.gz --duration 600 --interval 1 --processlist
+    python -m benchmarks.replay replay storm.ndjson.gz --speed 100 --interval 1 --profile replay.prof
+
+`record` polls every configured node (and HAProxy) through RecordingBackend.
+`replay` feeds a recording back through get_node_status and evaluate_alerts at
+`--speed` times real time and reports per-cycle latency. Telegram sends are
+counted instead of delivered unless --send-alerts is given. To drive the UI
+from a recording, set `collector.backend: replay` in config.yaml instead.
+"""
+
+import argparse
+import cProfile
+import os
+import pstats
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from src.backends import LiveBackend, RecordingBackend, ReplayBackend, set_backend
+from src.config_utils import get_clusters
+
+
+def record(args):
+    from src.cluster import get_node_status
+    from src.haproxy import get_haproxy_server_states
+
+    backend = RecordingBackend(LiveBackend(), args.output)
+    set_backend(backend)
+    deadline = time.monotonic() + args.duration
+    cycles = 0
+    try:
+        while time.monotonic() < deadline:
+            started = time.monotonic()
+            for cluster in get_clusters():
+                haproxy_states = get_haproxy_server_states(cluster)
+                for node in cluster['nodes']:
+                    status = get_node_status(node, cluster, haproxy_states)
+                    if status.get('error'):
+                        print(f"Error for node {node.get('host')}: {status['error']}")
+                    if args.processlist:
+                        try:
+                            backend.processlist(node)
+                        except Exception as e:
+                            print(f"Processlist error for {node.get('host')}: {e}")
+            cycles += 1
+            time.sleep(max(0.0, args.interval - (time.monotonic() - started)))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        backend.close()
+    print(f"Recorded {cycles} cycles to {args.output}")
+
+
+def replay(args):
+    import src.alerts
+    from src.alerts import evaluate_alerts
+    from src.cluster import get_node_status
+    from src.haproxy import get_haproxy_server_states
+
+    backend = ReplayBackend(args.recording, speed=args.speed, loop=False)
+    set_backend(backend)
+
+    sent = []
+    if not args.send_alerts:
+        src.alerts.send_telegram_message = lambda cfg, msg: sent.append(msg) or True
+
+    duration = args.duration or backend.duration / args.speed
+    latencies = []
+    profiler = cProfile.Profile() if args.profile else None
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        started = time.perf_counter()
+        if profiler:
+            profiler.enable()
+        for cluster in get_clusters():
+            haproxy_states = get_haproxy_server_states(cluster)
+            nodes_status = [get_node_status(node, cluster, haproxy_states) for node in cluster['nodes']]
+            evaluate_alerts(nodes_status, cluster['name'])
+        if profiler:
+            profiler.disable()
+        latencies.append((time.perf_counter() - started) * 1000.0)
+        time.sleep(max(0.0, args.interval - (time.perf_counter() - started)))
+
+    latencies.sort()
+    if latencies:
+        p = lambda pct: latencies[min(len(latencies) - 1, int(len(latencies) * pct / 100))]
+        print(f"Replayed {backend.duration:.1f}s of recording at {args.speed}x in {len(latencies)} cycles")
+        print(f"cycle latency p50={p(50):.2f}ms p95={p(95):.2f}ms p99={p(99):.2f}ms max={latencies[-1]:.2f}ms")
+    print(f"Alerts fired: {len(sent)}" + ('' if args.send_alerts else ' (not delivered)'))
+    if profiler:
+        profiler.dump_stats(args.profile)
+        pstats.Stats(profiler).sort_stats('cumulative').print_stats(20)
+        print(f"Profile written to {args.profile}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Record and replay collector samples')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    rec = sub.add_parser('record', help='record live samples')
+    rec.add_argument('--output', default='recording.ndjson.gz')
+    rec.add_argument('--duration', type=float, default=600, help='seconds to record')
+    rec.add_argument('--interval', type=float, default=1.0, help='seconds between polls')
+    rec.add_argument('--processlist', action='store_true', help='also record processlist samples')
+
+    rep = sub.add_parser('replay', help='replay a recording through collection and alerts')
+    rep.add_argument('recording')
+    rep.add_argument('--speed', type=float, default=100.0)
+    rep.add_argument('--interval', type=float, default=0.01, help='wall seconds between replayed polls')
+    rep.add_argument('--duration', type=float, default=None, help='wall seconds to run (default: whole recording)')
+    rep.add_argument('--profile', default=None, help='write cProfile stats to this file')
+    rep.add_argument('--send-alerts', action='store_true', help='deliver Telegram alerts instead of counting them')
+
+    args = parser.parse_args()
+    if args.command == 'record':
+        record(args)
+    else:
+        replay(args)
+
+
+if __name__ == '__main__':
+    main()
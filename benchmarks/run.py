@@ -0,0 +1,239 @@
+"""
+Benchmark collection and API latency against local stand-ins.
+
+Usage:
+    python -m benchmarks.run --nodes 3 9 30 --iterations 50 --output bench.json
+    python -m benchmarks.run --baseline old.json     # print deltas against a previous run
+
+Each scenario writes a temporary config.yaml pointing at a fake HAProxy stats
+server and N nodes served by FakeMySQL, then drives the Flask app through its
+test client. Results are written as JSON so runs can be diffed.
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import yaml
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from benchmarks.stand_ins import FakeHAProxy, FakeMySQL, build_haproxy_csv
+
+ENDPOINTS = ['/api/status', '/api/process_list', '/api/transactions', '/api/slow_queries?limit=1000']
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    k = (len(sorted_values) - 1) * pct / 100.0
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+def peak_rss_mb():
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(rss / (1024.0 * 1024.0) if sys.platform == 'darwin' else rss / 1024.0, 2)
+
+
+def summarize(name, nodes, latencies, wall_seconds, concurrency, errors):
+    values = sorted(latencies)
+    return {
+        'name': name,
+        'nodes': nodes,
+        'iterations': len(values),
+        'concurrency': concurrency,
+        'errors': errors,
+        'p50_ms': round(percentile(values, 50), 3),
+        'p95_ms': round(percentile(values, 95), 3),
+        'p99_ms': round(percentile(values, 99), 3),
+        'mean_ms': round(sum(values) / len(values), 3),
+        'throughput_rps': round(len(values) / wall_seconds, 2) if wall_seconds > 0 else None,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def measure(fn, iterations, concurrency, warmup):
+    for _ in range(warmup):
+        fn()
+    errors = 0
+
+    def timed(_):
+        start = time.perf_counter()
+        ok = fn()
+        return (time.perf_counter() - start) * 1000.0, ok
+
+    wall_start = time.perf_counter()
+    if concurrency > 1:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(timed, range(iterations)))
+    else:
+        results = [timed(i) for i in range(iterations)]
+    wall = time.perf_counter() - wall_start
+    latencies = [r[0] for r in results]
+    errors = sum(1 for r in results if not r[1])
+    return latencies, wall, errors
+
+
+def write_config(workdir, node_count, haproxy_port):
+    config = {
+        'nodes': [{
+            'host': f"node{i + 1}.bench.local",
+            'user': 'bench',
+            'password': 'bench-secret',
+            'port': 3306,
+            'haproxy_server': f"node{i + 1}",
+        } for i in range(node_count)],
+        'mysql': {'user': 'bench', 'password': 'bench-secret'},
+        'haproxy': {
+            'host': '127.0.0.1',
+            'stats_port': haproxy_port,
+            'stats_path': '/stats;csv',
+            'stats_user': 'admin',
+            'stats_password': 'bench-secret',
+            'backend_name': 'galera_cluster_backend',
+        },
+        'telegram': {'enabled': False},
+        'alerts': {'enabled': True},
+        'history': {'enabled': True, 'path': os.path.join(workdir, 'history.db')},
+        'authentication': {'username': 'admin', 'password': 'admin123'},
+    }
+    with open(os.path.join(workdir, 'config.yaml'), 'w') as f:
+        yaml.safe_dump(config, f)
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=REPO_ROOT, text=True).strip()
+    except Exception:
+        return None
+
+
+def run(args):
+    import mysql.connector
+
+    fake_mysql = FakeMySQL(latency_ms=args.db_latency_ms)
+    mysql.connector.connect = fake_mysql.connect
+
+    workdir = tempfile.mkdtemp(prefix='galera-bench-')
+    os.chdir(workdir)
+    write_config(workdir, max(args.nodes), 0)
+
+    import app as app_module
+    from src.haproxy import get_haproxy_server_states
+
+    app_module.app.config['LOGIN_DISABLED'] = True
+    app_module.app.config['TESTING'] = True
+
+    results = []
+    for node_count in args.nodes:
+        haproxy = FakeHAProxy(build_haproxy_csv(node_count, extra_proxies=args.haproxy_proxies),
+                              latency_ms=args.haproxy_latency_ms).start()
+        try:
+            write_config(workdir, node_count, haproxy.port)
+            host = "node1.bench.local"
+
+            def haproxy_parse():
+                return bool(get_haproxy_server_states())
+
+            latencies, wall, errors = measure(haproxy_parse, args.iterations, 1, args.warmup)
+            results.append(summarize('haproxy_parse', node_count, latencies, wall, 1, errors))
+            print(f"[{node_count} nodes] haproxy_parse p50={results[-1]['p50_ms']}ms")
+
+            for endpoint in ENDPOINTS:
+                sep = '&' if '?' in endpoint else '?'
+                url = endpoint if endpoint == '/api/status' else f"{endpoint}{sep}host={host}"
+
+                for concurrency in sorted({1, args.concurrency}):
+                    def call():
+                        client = app_module.app.test_client()
+                        response = client.get(url)
+                        response.get_data()
+                        return response.status_code == 200
+
+                    latencies, wall, errors = measure(call, args.iterations, concurrency, args.warmup)
+                    results.append(summarize(endpoint, node_count, latencies, wall, concurrency, errors))
+                    r = results[-1]
+                    print(f"[{node_count} nodes] {endpoint} c={concurrency} p50={r['p50_ms']}ms "
+                          f"p99={r['p99_ms']}ms {r['throughput_rps']} req/s errors={errors}")
+        finally:
+            haproxy.stop()
+
+    return {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'git_revision': git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'iterations': args.iterations,
+            'warmup': args.warmup,
+            'db_latency_ms': args.db_latency_ms,
+            'haproxy_latency_ms': args.haproxy_latency_ms,
+            'haproxy_proxies': args.haproxy_proxies,
+        },
+        'results': results,
+    }
+
+
+def compare(current, baseline):
+    """Print p50/p99 deltas for scenarios present in both runs"""
+    def key(r):
+        return (r['name'], r['nodes'], r['concurrency'])
+
+    previous = {key(r): r for r in baseline.get('results', [])}
+    print(f"\n{'scenario':<48}{'p50 Δ%':>10}{'p99 Δ%':>10}{'rps Δ%':>10}")
+    for r in current['results']:
+        old = previous.get(key(r))
+        if not old:
+            continue
+
+        def delta(field):
+            if not old.get(field) or r.get(field) is None:
+                return '-'
+            return f"{(r[field] - old[field]) / old[field] * 100:+.1f}"
+
+        label = f"{r['name']} n={r['nodes']} c={r['concurrency']}"
+        print(f"{label:<48}{delta('p50_ms'):>10}{delta('p99_ms'):>10}{delta('throughput_rps'):>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Galera Monitor benchmark suite')
+    parser.add_argument('--nodes', type=int, nargs='+', default=[3, 9, 30])
+    parser.add_argument('--iterations', type=int, default=50)
+    parser.add_argument('--warmup', type=int, default=3)
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--db-latency-ms', type=float, default=0.0, help='simulated latency per connect/query')
+    parser.add_argument('--haproxy-latency-ms', type=float, default=0.0, help='simulated stats page latency')
+    parser.add_argument('--haproxy-proxies', type=int, default=200, help='unrelated proxies in the stats CSV')
+    parser.add_argument('--output', default=None, help='write results JSON to this file')
+    parser.add_argument('--baseline', default=None, help='previous results JSON to compare against')
+    args = parser.parse_args()
+
+    output = os.path.abspath(args.output) if args.output else None
+    baseline_path = os.path.abspath(args.baseline) if args.baseline else None
+
+    report = run(args)
+    if output:
+        with open(output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {output}")
+    else:
+        print(json.dumps(report, indent=2))
+    if baseline_path:
+        with open(baseline_path) as f:
+            compare(report, json.load(f))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,213 @@
+"""
+Local stand-ins for the services the monitor talks to.
+
+FakeHAProxy serves a realistic stats CSV over HTTP; FakeMySQL replaces
+mysql.connector.connect with canned result sets so collection code runs
+unchanged without a database.
+"""
+
+import itertools
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+HAPROXY_CSV_HEADER = (
+    "# pxname,svname,qcur,qmax,scur,smax,slim,stot,bin,bout,dreq,dresp,ereq,econ,eresp,wretr,wredis,"
+    "status,weight,act,bck,chkfail,chkdown,lastchg,downtime,qlimit,pid,iid,sid,throttle,lbtot,tracked,"
+    "type,rate,rate_lim,rate_max,check_status,check_code,check_duration,hrsp_1xx,hrsp_2xx,hrsp_3xx,"
+    "hrsp_4xx,hrsp_5xx,hrsp_other,hanafail,req_rate,req_rate_max,req_tot,cli_abrt,srv_abrt,"
+)
+
+
+def build_haproxy_csv(node_count, backend_name='galera_cluster_backend', extra_proxies=200, servers_per_proxy=4):
+    """Build a stats CSV with the Galera backend plus many unrelated proxies"""
+    columns = HAPROXY_CSV_HEADER.rstrip(',').split(',')
+    rng = random.Random(42)
+
+    def row(pxname, svname, scur, status='UP', weight=1):
+        values = {name: '' for name in columns}
+        values.update({
+            '# pxname': pxname, 'svname': svname, 'scur': str(scur), 'smax': str(scur * 2),
+            'stot': str(rng.randint(1000, 10 ** 7)), 'bin': str(rng.randint(10 ** 6, 10 ** 10)),
+            'bout': str(rng.randint(10 ** 6, 10 ** 10)), 'status': status, 'weight': str(weight),
+            'act': '1', 'bck': '0', 'lastchg': str(rng.randint(1, 10 ** 6)), 'pid': '1', 'iid': '2',
+            'type': '2', 'check_status': 'L7OK', 'check_code': '200', 'check_duration': '1',
+        })
+        return ','.join(values[name] for name in columns) + ','
+
+    lines = [HAPROXY_CSV_HEADER]
+    for p in range(extra_proxies):
+        pxname = f"app_backend_{p}"
+        lines.append(row(pxname, 'FRONTEND', rng.randint(0, 500), status='OPEN'))
+        for s in range(servers_per_proxy):
+            lines.append(row(pxname, f"srv{s + 1}", rng.randint(0, 200)))
+        lines.append(row(pxname, 'BACKEND', rng.randint(0, 500)))
+    lines.append(row(backend_name, 'FRONTEND', 0, status='OPEN'))
+    for i in range(node_count):
+        lines.append(row(backend_name, f"node{i + 1}", rng.randint(0, 300), weight=rng.randint(1, 100)))
+    lines.append(row(backend_name, 'BACKEND', 0))
+    return '\n'.join(lines) + '\n'
+
+
+class FakeHAProxy:
+    """Threaded HTTP server returning a fixed stats CSV on every path"""
+
+    def __init__(self, csv_text, latency_ms=0.0):
+        body = csv_text.encode('utf-8')
+        latency = latency_ms / 1000.0
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if latency:
+                    time.sleep(latency)
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.port = self.server.server_address[1]
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class FakeMySQL:
+    """Drop-in replacement for mysql.connector.connect backed by generated data"""
+
+    def __init__(self, latency_ms=0.0, processes=500, transactions=200, slow_queries=1000, status_vars=900):
+        self.latency = latency_ms / 1000.0
+        self.counter = itertools.count(1)
+        rng = random.Random(7)
+        self.base_status = {f"Extra_status_{i}": str(rng.randint(0, 10 ** 6)) for i in range(status_vars)}
+        self.processes = [{
+            'id': i, 'user': f"app{i % 7}", 'host': f"10.0.{i % 250}.{i % 200}:{40000 + i}",
+            'db': 'shop', 'command': 'Query', 'time': rng.randint(0, 900), 'state': 'executing',
+            'info': 'SELECT * FROM orders o JOIN customers c ON c.id = o.customer_id WHERE o.id = %d' % i,
+            'time_ms': Decimal('%d.123' % rng.randint(0, 900000)),
+        } for i in range(processes)]
+        now = datetime.now()
+        self.transactions = [{
+            'trx_id': str(1000 + i), 'trx_state': 'RUNNING', 'trx_started': now - timedelta(seconds=i),
+            'trx_requested_lock_id': None, 'trx_wait_started': None, 'trx_mysql_thread_id': i,
+            'trx_query': 'UPDATE stock SET qty = qty - 1 WHERE sku = %d' % i, 'trx_operation_state': None,
+            'trx_tables_in_use': 1, 'trx_tables_locked': 1, 'trx_rows_locked': 1, 'trx_rows_modified': 1,
+            'trx_concurrency_tickets': 0, 'trx_isolation_level': 'REPEATABLE READ', 'trx_unique_checks': 1,
+            'trx_foreign_key_checks': 1,
+        } for i in range(transactions)]
+        self.slow_log = [{
+            'start_time': now - timedelta(minutes=i), 'user_host': 'app[app] @ [10.0.0.1]',
+            'query_time': timedelta(seconds=rng.randint(1, 30)), 'lock_time': timedelta(microseconds=rng.randint(0, 10 ** 6)),
+            'rows_sent': rng.randint(0, 1000), 'rows_examined': rng.randint(1000, 10 ** 6), 'db': 'shop',
+            'last_insert_id': 0, 'insert_id': 0, 'server_id': 1,
+            'sql_text': 'SELECT SQL_NO_CACHE * FROM events WHERE created_at > NOW() - INTERVAL %d DAY' % i,
+            'thread_id': i,
+        } for i in range(slow_queries)]
+        self.innodb_status = '\n'.join(f"INNODB MONITOR OUTPUT LINE {i} " + 'x' * 60 for i in range(2000))
+
+    def global_status(self):
+        tick = next(self.counter)
+        status = dict(self.base_status)
+        status.update({
+            'wsrep_local_state_comment': 'Synced', 'wsrep_cluster_size': '3', 'wsrep_local_index': '0',
+            'wsrep_cluster_status': 'Primary', 'wsrep_flow_control_active': 'false',
+            'wsrep_flow_control_recv': str(tick), 'wsrep_flow_control_sent': str(tick // 2),
+            'wsrep_flow_control_paused': '0.000123', 'wsrep_flow_control_paused_ns': str(tick * 1000),
+            'wsrep_local_cert_failures': '3', 'wsrep_local_recv_queue': str(tick % 17),
+            'wsrep_local_send_queue': '0', 'wsrep_cert_deps_distance': '12.5',
+            'wsrep_last_committed': str(1000000 + tick * 50), 'wsrep_provider_version': '26.4.14(r1234)',
+            'wsrep_thread_count': '9', 'wsrep_cluster_conf_id': '42',
+            'wsrep_cluster_state_uuid': '6f0f7d36-0000-11ee-9d8f-0242ac120002', 'wsrep_local_state': '4',
+            'wsrep_ready': 'ON', 'wsrep_applier_thread_count': '8', 'wsrep_rollbacker_thread_count': '1',
+            'wsrep_replicated_bytes': str(tick * 10 ** 6), 'wsrep_received_bytes': str(tick * 2 * 10 ** 6),
+            'Com_lock_tables': '0', 'Threads_running': '5', 'Memory_used': str(8 * 1024 ** 3),
+            'Slave_connections': '0', 'Slaves_connected': '0', 'Uptime': str(86400 + tick),
+            'Com_insert': str(tick * 100), 'Com_insert_select': '0', 'Com_update': str(tick * 50),
+            'Com_update_multi': '0', 'Com_select': str(tick * 1000), 'Queries': str(tick * 1500),
+        })
+        return status
+
+    def connect(self, **kwargs):
+        if self.latency:
+            time.sleep(self.latency)
+        return _FakeConnection(self)
+
+
+class _FakeConnection:
+    def __init__(self, source):
+        self.source = source
+
+    def cursor(self, dictionary=False):
+        return _FakeCursor(self.source, dictionary)
+
+    def is_connected(self):
+        return True
+
+    def close(self):
+        pass
+
+
+class _FakeCursor:
+    def __init__(self, source, dictionary):
+        self.source = source
+        self.dictionary = dictionary
+        self.rows = []
+
+    def execute(self, sql, params=None):
+        source = self.source
+        if source.latency:
+            time.sleep(source.latency)
+        text = ' '.join(sql.split()).upper()
+        if text.startswith('SHOW GLOBAL STATUS') or text.startswith('SHOW STATUS'):
+            status = source.global_status()
+            if params:
+                wanted = {str(p).lower() for p in params}
+                status = {k: v for k, v in status.items() if k.lower() in wanted}
+            self.rows = [{'Variable_name': k, 'Value': v} for k, v in status.items()]
+        elif "LIKE 'WSREP_PROVIDER_OPTIONS'" in text:
+            self.rows = [{'Variable_name': 'wsrep_provider_options', 'Value': (
+                'base_dir = /var/lib/mysql/; gcache.page_size = 128M; gcache.size = 2G; '
+                'gcs.fc_limit = 160; gcs.fc_factor = 0.8; evs.send_window = 512')}]
+        elif text.startswith('SHOW VARIABLES'):
+            names = params or []
+            self.rows = [{'Variable_name': name, 'Value': '1'} for name in names]
+        elif 'INNODB_TRX' in text:
+            self.rows = source.transactions
+        elif 'INNODB_LOCK_WAITS' in text or 'INNODB_LOCKS' in text:
+            self.rows = []
+        elif text.startswith('SHOW ENGINE INNODB STATUS'):
+            self.rows = [{'Type': 'InnoDB', 'Name': '', 'Status': source.innodb_status}]
+        elif 'PROCESSLIST' in text:
+            self.rows = source.processes
+        elif 'SLOW_LOG' in text:
+            limit = int(params[0]) if params else len(source.slow_log)
+            self.rows = source.slow_log[:limit]
+        else:
+            self.rows = [{'1': 1}]
+        if self.dictionary:
+            self.rows = [dict(row) for row in self.rows]
+        else:
+            self.rows = [tuple(row.values()) for row in self.rows]
+
+    def fetchall(self):
+        return list(self.rows)
+
+    def fetchone(self):
+        return self.rows[0] if self.rows else None
+
+    def close(self):
+        pass
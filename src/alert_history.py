@@ -0,0 +1,199 @@
+"""
+Persistent alert history.
+
+Alert evaluation reports, per node, which alert keys are currently
+triggered. Comparing that with the node's previously active keys (kept in
+the state store, so it survives across workers) yields one `fired` event
+when a key becomes active and one `resolved` event when it clears, whatever
+the Telegram cooldown did. Events are queued to a background SQLite writer,
+indexed by cluster and time, host and time, and alert key and time, and
+pruned after retention_days.
+"""
+
+import threading
+import time
+from flask import jsonify, request
+from src.config_utils import load_config, get_cluster, cluster_node_key, DEFAULT_CLUSTER
+from src.state import get_state_store
+from src.storage import connect, BackgroundWriter
+
+ALERT_HISTORY_SCHEMA = """
+CREATE TABLE IF NOT EXISTS alert_events (
+    id INTEGER PRIMARY KEY,
+    ts INTEGER NOT NULL,
+    cluster TEXT NOT NULL,
+    host TEXT NOT NULL,
+    alert_key TEXT NOT NULL,
+    event TEXT NOT NULL,
+    message TEXT,
+    notified INTEGER NOT NULL DEFAULT 0,
+    duration_ms INTEGER
+);
+CREATE INDEX IF NOT EXISTS alert_events_cluster_ts ON alert_events (cluster, ts);
+CREATE INDEX IF NOT EXISTS alert_events_host_ts ON alert_events (cluster, host, ts);
+CREATE INDEX IF NOT EXISTS alert_events_key_ts ON alert_events (cluster, alert_key, ts);
+"""
+
+INSERT_EVENT_SQL = ("INSERT INTO alert_events (ts, cluster, host, alert_key, event, message, notified, duration_ms) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)")
+# Host recorded for cluster-wide alerts such as configuration drift
+CLUSTER_HOST = '*'
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_alert_history_config():
+    """Get alert history configuration with defaults"""
+    cfg = (load_config() or {}).get('alert_history', {}) or {}
+    return {
+        'enabled': cfg.get('enabled', True),
+        'path': cfg.get('path', 'alerts.db'),
+        'retention_days': cfg.get('retention_days', 365),
+        'default_limit': int(cfg.get('default_limit', 100) or 100),
+        'max_limit': int(cfg.get('max_limit', 1000) or 1000),
+    }
+
+
+def _get_writer(cfg):
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            retention_ms = int(float(cfg['retention_days']) * 86400 * 1000) if cfg['retention_days'] else None
+
+            def prune(conn):
+                if retention_ms:
+                    conn.execute("DELETE FROM alert_events WHERE ts < ?", (int(time.time() * 1000) - retention_ms,))
+
+            _writer = BackgroundWriter(cfg['path'], ALERT_HISTORY_SCHEMA, maintenance=prune)
+        return _writer
+
+
+def record_alert_transitions(cluster_name, host, triggered, notified=()):
+    """Record fired/resolved events for one node given {alert_key: message} currently triggered"""
+    cfg = get_alert_history_config()
+    if not cfg['enabled']:
+        return
+    cluster_name = cluster_name or DEFAULT_CLUSTER
+    now_ms = int(time.time() * 1000)
+    rows = []
+
+    def transition(active):
+        active = dict(active or {})
+        for key, message in triggered.items():
+            if key not in active:
+                active[key] = now_ms
+                rows.append((now_ms, cluster_name, host, key, 'fired', message, int(key in notified), None))
+        for key in [key for key in active if key not in triggered]:
+            rows.append((now_ms, cluster_name, host, key, 'resolved', None, 0, now_ms - active.pop(key)))
+        return active
+
+    if not triggered and not get_state_store().get('alert_active', cluster_node_key(cluster_name, host)):
+        # Nothing active before or now; skip the atomic write
+        return
+    get_state_store().update('alert_active', cluster_node_key(cluster_name, host), transition)
+    _get_writer(cfg).submit(INSERT_EVENT_SQL, rows)
+
+
+def active_alerts(cluster_name):
+    """{host: {alert_key: since_ms}} of the alerts currently active in a cluster"""
+    prefix = cluster_node_key(cluster_name, '')
+    return {key[len(prefix):]: active for key, active in get_state_store().items('alert_active').items()
+            if key.startswith(prefix) and active}
+
+
+def _filters(cluster_name, start_ms, end_ms, host=None, key=None, event=None):
+    clauses = ['cluster = ?', 'ts BETWEEN ? AND ?']
+    params = [cluster_name, start_ms, end_ms]
+    if host:
+        clauses.append('host = ?')
+        params.append(host)
+    if key:
+        if key.endswith('*'):
+            # Prefix match, e.g. anomaly_*; the range keeps the alert_key index usable
+            clauses.append('alert_key >= ? AND alert_key < ?')
+            params.extend([key[:-1], key[:-1] + '\uffff'])
+        else:
+            clauses.append('alert_key = ?')
+            params.append(key)
+    if event:
+        clauses.append('event = ?')
+        params.append(event)
+    return ' AND '.join(clauses), params
+
+
+def query_alerts(cluster_name, start_ms, end_ms, host=None, key=None, event=None, limit=100, cursor=None):
+    """Newest-first events in a range plus per-key counts; cursor is the 'ts:id' of the last row seen"""
+    cfg = get_alert_history_config()
+    _get_writer(cfg).ready.wait(5)
+    where, params = _filters(cluster_name, start_ms, end_ms, host, key, event)
+    page_where, page_params = where, list(params)
+    if cursor:
+        cursor_ts, cursor_id = (int(part) for part in cursor.split(':', 1))
+        page_where += ' AND (ts < ? OR (ts = ? AND id < ?))'
+        page_params.extend([cursor_ts, cursor_ts, cursor_id])
+    conn = connect(cfg['path'])
+    try:
+        rows = conn.execute(
+            f"SELECT id, ts, host, alert_key, event, message, notified, duration_ms FROM alert_events "
+            f"WHERE {page_where} ORDER BY ts DESC, id DESC LIMIT ?",
+            page_params + [limit + 1]
+        ).fetchall()
+        counts = conn.execute(
+            f"SELECT alert_key, event, COUNT(*) FROM alert_events WHERE {where} GROUP BY alert_key, event",
+            params
+        ).fetchall()
+    finally:
+        conn.close()
+    events = [{
+        'ts': ts,
+        'host': row_host,
+        'key': alert_key,
+        'event': row_event,
+        'message': message,
+        'notified': bool(notified),
+        'duration_ms': duration_ms,
+    } for _, ts, row_host, alert_key, row_event, message, notified, duration_ms in rows[:limit]]
+    next_cursor = f"{rows[limit - 1][1]}:{rows[limit - 1][0]}" if len(rows) > limit else None
+    per_key = {}
+    for alert_key, row_event, n in counts:
+        per_key.setdefault(alert_key, {'fired': 0, 'resolved': 0})[row_event] = n
+    return events, next_cursor, per_key
+
+
+def api_alerts():
+    """API endpoint returning stored alert events with pagination and per-key counts"""
+    try:
+        cfg = get_alert_history_config()
+        if not cfg['enabled']:
+            return jsonify({'ok': False, 'error': 'Alert history is disabled'}), 404
+        cluster = get_cluster(request.args.get('cluster'))
+        if cluster is None:
+            return jsonify({'ok': False, 'error': 'Unknown cluster'}), 404
+        now_ms = int(time.time() * 1000)
+        end_ms = request.args.get('to', default=now_ms, type=int)
+        window = request.args.get('window', default=7 * 86400, type=int)
+        start_ms = request.args.get('from', default=end_ms - window * 1000, type=int)
+        limit = max(1, min(request.args.get('limit', default=cfg['default_limit'], type=int), cfg['max_limit']))
+        event = request.args.get('event')
+        if event not in (None, '', 'fired', 'resolved'):
+            return jsonify({'ok': False, 'error': 'event must be fired or resolved'}), 400
+        try:
+            events, next_cursor, counts = query_alerts(
+                cluster['name'], start_ms, end_ms,
+                host=request.args.get('host'), key=request.args.get('key'), event=event or None,
+                limit=limit, cursor=request.args.get('cursor'))
+        except ValueError:
+            return jsonify({'ok': False, 'error': 'Invalid cursor'}), 400
+        return jsonify({
+            'ok': True,
+            'cluster': cluster['name'],
+            'from': start_ms,
+            'to': end_ms,
+            'events': events,
+            'next_cursor': next_cursor,
+            'counts': counts,
+            'active': active_alerts(cluster['name']),
+        })
+    except Exception as e:
+        return jsonify({'ok': False, 'error': str(e)}), 500
@@ -1,10 +1,15 @@
 from datetime import datetime
-from src.config_utils import get_alert_config
+from src.config_utils import get_alert_config, cluster_node_key, DEFAULT_CLUSTER
 from src.telegram import telegram_enabled, send_telegram_message, should_send_alert
-from src.state import alert_state
+from src.alert_history import record_alert_transitions
+from src.timing import span
 
-def evaluate_alerts(nodes_status):
-    """Evaluate alerts for all nodes"""
+def evaluate_alerts(nodes_status, cluster_name=None):
+    """Evaluate alerts for all nodes of one cluster"""
+    with span('alerts.evaluate'):
+        _evaluate_alerts(nodes_status, cluster_name)
+
+def _evaluate_alerts(nodes_status, cluster_name=None):
     cfg = get_alert_config()
     alerts_cfg = cfg['alerts']
     telegram_cfg = cfg['telegram']
@@ -15,7 +20,18 @@ def evaluate_alerts(nodes_status):
         host = node.get('host')
         status = (node.get('status') or {})
         error = node.get('error')
-        node_key = host
+        node_key = cluster_node_key(cluster_name, host)
+        # Name the cluster in messages once more than one is monitored
+        label = host if not cluster_name or cluster_name == DEFAULT_CLUSTER else f"{cluster_name}/{host}"
+        # Every alert condition seen this round, whether or not its cooldown lets a message out
+        triggered, notified = {}, set()
+
+        def fire(key, message):
+            triggered[key] = message
+            if should_send_alert(node_key, key, cooldown):
+                notified.add(key)
+                send_telegram_message(telegram_cfg, message)
+
         offline_triggered = False
         if error:
             offline_triggered = True
@@ -28,52 +44,77 @@ def evaluate_alerts(nodes_status):
                 offline_triggered = True
                 reason = f"state={state_comment}, cluster={cluster_status}, ready={wsrep_ready}"
         if alerts_cfg['node'].get('offline') and offline_triggered:
-            key = 'node_offline'
-            if should_send_alert(alert_state, node_key, key, cooldown):
-                msg = (f"<b>Galera Alert</b>\nNode: <code>{host}</code> appears <b>OFFLINE/UNSYNCED</b>\nReason: {reason}")
-                send_telegram_message(telegram_cfg, msg)
+            fire('node_offline', f"<b>Galera Alert</b>\nNode: <code>{label}</code> appears <b>OFFLINE/UNSYNCED</b>\nReason: {reason}")
         if alerts_cfg.get('flow_control', {}).get('active'):
             fc_active = str(status.get('wsrep_flow_control_active', '')).lower() == 'true'
-            if fc_active and should_send_alert(alert_state, node_key, 'flow_control_active', cooldown):
-                send_telegram_message(telegram_cfg, f"<b>Galera Alert</b>\nNode: <code>{host}</code> flow control is <b>ACTIVE</b>")
+            if fc_active:
+                fire('flow_control_active', f"<b>Galera Alert</b>\nNode: <code>{label}</code> flow control is <b>ACTIVE</b>")
         paused_threshold = alerts_cfg.get('flow_control', {}).get('paused_threshold')
         if paused_threshold is not None:
             try:
-                paused = float(status.get('wsrep_flow_control_paused', 0) or 0)
+                # Paused fraction over the recent window; the cumulative value until a window exists
+                window = alerts_cfg['flow_control'].get('window') or '1m'
+                windowed = status.get(f'fc_paused_pct_{window}')
+                if windowed is not None:
+                    paused = round(float(windowed) / 100.0, 6)
+                    paused_text = f"flow_control_paused={paused} over {window}"
+                else:
+                    paused = float(status.get('wsrep_flow_control_paused', 0) or 0)
+                    paused_text = f"flow_control_paused={paused} (since startup)"
                 if paused >= float(paused_threshold):
-                    if should_send_alert(alert_state, node_key, 'flow_control_paused', cooldown):
-                        send_telegram_message(telegram_cfg, f"<b>Galera Alert</b>\nNode: <code>{host}</code> flow_control_paused={paused} ≥ threshold={paused_threshold}")
+                    senders = ', '.join(status.get('fc_senders') or []) or 'unknown'
+                    fire('flow_control_paused', f"<b>Galera Alert</b>\nNode: <code>{label}</code> {paused_text} ≥ threshold={paused_threshold}\nFC sent by: {senders}")
             except Exception:
                 pass
         try:
             qps_cfg = alerts_cfg.get('qps', {})
             qps = float(status.get('queries_per_second', 0) or 0)
             if qps_cfg.get('min') is not None and qps < float(qps_cfg['min']):
-                if should_send_alert(alert_state, node_key, 'qps_low', cooldown):
-                    send_telegram_message(telegram_cfg, f"<b>Galera Alert</b>\nNode: <code>{host}</code> QPS low: {qps} < {qps_cfg['min']}")
+                fire('qps_low', f"<b>Galera Alert</b>\nNode: <code>{label}</code> QPS low: {qps} < {qps_cfg['min']}")
             if qps_cfg.get('max') is not None and qps > float(qps_cfg['max']):
-                if should_send_alert(alert_state, node_key, 'qps_high', cooldown):
-                    send_telegram_message(telegram_cfg, f"<b>Galera Alert</b>\nNode: <code>{host}</code> QPS high: {qps} > {qps_cfg['max']}")
+                fire('qps_high', f"<b>Galera Alert</b>\nNode: <code>{label}</code> QPS high: {qps} > {qps_cfg['max']}")
         except Exception:
             pass
         try:
             wps_cfg = alerts_cfg.get('wps', {})
             wps = float(status.get('writes_per_second', 0) or 0)
             if wps_cfg.get('min') is not None and wps < float(wps_cfg['min']):
-                if should_send_alert(alert_state, node_key, 'wps_low', cooldown):
-                    send_telegram_message(telegram_cfg, f"<b>Galera Alert</b>\nNode: <code>{host}</code> WPS low: {wps} < {wps_cfg['min']}")
+                fire('wps_low', f"<b>Galera Alert</b>\nNode: <code>{label}</code> WPS low: {wps} < {wps_cfg['min']}")
             if wps_cfg.get('max') is not None and wps > float(wps_cfg['max']):
-                if should_send_alert(alert_state, node_key, 'wps_high', cooldown):
-                    send_telegram_message(telegram_cfg, f"<b>Galera Alert</b>\nNode: <code>{host}</code> WPS high: {wps} > {wps_cfg['max']}")
+                fire('wps_high', f"<b>Galera Alert</b>\nNode: <code>{label}</code> WPS high: {wps} > {wps_cfg['max']}")
         except Exception:
             pass
+        if alerts_cfg.get('anomaly', {}).get('enabled'):
+            for anomaly in status.get('anomalies') or []:
+                key = f"anomaly_{anomaly['metric']}_{anomaly['direction']}"
+                fire(key, f"<b>Galera Alert</b>\nNode: <code>{label}</code> {anomaly['metric']} unusually {anomaly['direction']}: {anomaly['value']} vs expected {anomaly['expected']} (z={anomaly['z']}, {anomaly['detector']} baseline)")
+        ist_floor = alerts_cfg.get('gcache', {}).get('ist_window_min_minutes')
+        if ist_floor is not None and status.get('ist_window_minutes') is not None:
+            try:
+                window = float(status['ist_window_minutes'])
+                if window < float(ist_floor):
+                    fire('ist_window_low', f"<b>Galera Warning</b>\nNode: <code>{label}</code> gcache only covers ~{window} min of write-sets (below {ist_floor} min); a longer outage needs a full SST")
+            except Exception:
+                pass
+        lag_threshold = alerts_cfg.get('replication', {}).get('lag_threshold')
+        if lag_threshold is not None and status.get('wsrep_seqno_lag') is not None:
+            try:
+                lag = int(status['wsrep_seqno_lag'])
+                if lag >= int(lag_threshold):
+                    eta = status.get('catchup_eta_seconds')
+                    eta_text = f"catch-up in ~{eta}s" if eta is not None else "not catching up"
+                    fire('replication_lag', f"<b>Galera Alert</b>\nNode: <code>{label}</code> is {lag} write-sets behind the cluster ≥ {lag_threshold} ({eta_text})")
+            except Exception:
+                pass
         hap_crit = alerts_cfg.get('haproxy', {}).get('connections_critical')
         if hap_crit is not None:
             try:
                 cur = int(status.get('haproxy_current', 0) or 0)
                 if cur >= int(hap_crit):
-                    if should_send_alert(alert_state, node_key, 'haproxy_conn_critical', cooldown):
-                        send_telegram_message(telegram_cfg, f"<b>Galera Alert</b>\nNode: <code>{host}</code> HAProxy current connections {cur} ≥ {hap_crit}")
+                    fire('haproxy_conn_critical', f"<b>Galera Alert</b>\nNode: <code>{label}</code> HAProxy current connections {cur} ≥ {hap_crit}")
             except Exception:
                 pass
-
+        try:
+            record_alert_transitions(cluster_name, host, triggered, notified)
+        except Exception as e:
+            print(f"Error recording alert history for {label}: {e}")
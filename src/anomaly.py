@@ -0,0 +1,277 @@
+"""
+Rolling-baseline anomaly detection for per-node traffic metrics.
+
+Each series (cluster/host + metric) keeps an exponentially weighted mean and
+variance. Polls arrive at irregular intervals, so every sample is weighted by
+the time it covers: alpha = 1 - 0.5 ** (dt / half_life). With `seasonal` on,
+each hour-of-week slot keeps its own mean/variance too, so Monday 09:00 is
+compared with previous Mondays at 09:00 instead of with Sunday night. State
+is a few numbers per series (at most 168 slots), updated on every collection.
+
+A sample is anomalous when every detector that has finished warming up puts
+it at least z_threshold standard deviations from its expected value.
+rescore_series() runs the same recurrences over stored history with NumPy,
+for the /api/anomalies endpoint.
+"""
+
+import math
+import time
+import numpy as np
+from src.config_utils import load_config
+from src.state import get_state_store
+
+# A poll gap longer than this does not count as more observed time
+MAX_SAMPLE_SECONDS = 300.0
+HOURS_PER_WEEK = 168
+# Smallest log of a block's product of decay factors the closed form is used for:
+# exp(-300) ~ 1e-130 leaves room for u / P with inputs (squared deviations) up to ~1e170
+MIN_LOG_PRODUCT = -300.0
+
+
+def get_anomaly_config():
+    """Get anomaly detection configuration with defaults"""
+    cfg = (load_config() or {}).get('anomaly', {}) or {}
+    return {
+        'enabled': cfg.get('enabled', True),
+        'metrics': list(cfg.get('metrics') or ['queries_per_second', 'writes_per_second']),
+        'half_life_seconds': float(cfg.get('half_life_seconds', 3600) or 3600),
+        'warmup_seconds': float(cfg.get('warmup_seconds', 3600) or 0),
+        'seasonal': cfg.get('seasonal', True),
+        'seasonal_half_life_seconds': float(cfg.get('seasonal_half_life_seconds', 4 * 3600) or 4 * 3600),
+        'seasonal_warmup_seconds': float(cfg.get('seasonal_warmup_seconds', 2 * 3600) or 0),
+        'z_threshold': float(cfg.get('z_threshold', 4.0) or 4.0),
+        'min_std': float(cfg.get('min_std', 1.0) or 0.0),
+        'min_relative_std': float(cfg.get('min_relative_std', 0.05) or 0.0),
+    }
+
+
+def _alpha(dt, half_life):
+    return 1.0 - 0.5 ** (dt / half_life)
+
+
+def _std_floor(mean, cfg):
+    return max(cfg['min_std'], cfg['min_relative_std'] * abs(mean))
+
+
+def _score(entry, value, warmup, cfg):
+    """z-score of value against a [mean, var, observed_seconds] entry, or None while warming up"""
+    if entry is None or entry[2] < warmup:
+        return None
+    mean, var = entry[0], entry[1]
+    return (value - mean) / max(math.sqrt(max(var, 0.0)), _std_floor(mean, cfg))
+
+
+def _update(entry, value, dt, half_life):
+    """West's incremental update of an exponentially weighted mean/variance"""
+    if entry is None:
+        return [value, 0.0, 0.0]
+    mean, var, observed = entry
+    alpha = _alpha(dt, half_life)
+    diff = value - mean
+    incr = alpha * diff
+    return [mean + incr, (1 - alpha) * (var + diff * incr), observed + dt]
+
+
+def hour_of_week(moment):
+    return moment.weekday() * 24 + moment.hour
+
+
+def score_node_metrics(node_key, status, moment):
+    """Score and fold this poll's metric values into the node's baselines; returns anomalies found"""
+    cfg = get_anomaly_config()
+    if not cfg['enabled']:
+        return []
+    now = moment.timestamp()
+    slot = str(hour_of_week(moment))
+    store = get_state_store()
+    anomalies = []
+    for metric in cfg['metrics']:
+        try:
+            value = float(status.get(metric))
+        except (TypeError, ValueError):
+            continue
+        if value < 0 or math.isnan(value):
+            # Counter reset between two polls
+            continue
+        found = []
+
+        def fold(state):
+            state = state or {'t': None, 'ewma': None, 'seasonal': {}}
+            dt = min(max(now - state['t'], 0.0), MAX_SAMPLE_SECONDS) if state['t'] is not None else 0.0
+            scores = [('ewma', state['ewma'], _score(state['ewma'], value, cfg['warmup_seconds'], cfg))]
+            seasonal_entry = state['seasonal'].get(slot)
+            if cfg['seasonal']:
+                scores.append(('seasonal', seasonal_entry, _score(seasonal_entry, value, cfg['seasonal_warmup_seconds'], cfg)))
+            ready = [(name, entry, z) for name, entry, z in scores if z is not None]
+            if ready and all(abs(z) >= cfg['z_threshold'] for _, _, z in ready):
+                # Report against the detector that is least surprised
+                name, entry, z = min(ready, key=lambda item: abs(item[2]))
+                found.append({
+                    'metric': metric,
+                    'value': value,
+                    'expected': round(entry[0], 3),
+                    'z': round(z, 2),
+                    'direction': 'high' if z > 0 else 'low',
+                    'detector': name,
+                })
+            state['ewma'] = _update(state['ewma'], value, dt, cfg['half_life_seconds'])
+            if cfg['seasonal']:
+                state['seasonal'][slot] = _update(seasonal_entry, value, dt, cfg['seasonal_half_life_seconds'])
+            state['t'] = now
+            return state
+
+        store.update('anomaly_baselines', f"{node_key}|{metric}", fold)
+        anomalies.extend(found)
+    return anomalies
+
+
+def linear_recurrence(c, u, y0):
+    """y[t] = c[t] * y[t-1] + u[t] with y[-1] = y0, vectorized in blocks
+
+    Within a block y = P * (y0 + cumsum(u / P)) where P = cumprod(c). P
+    shrinks with every factor, so a short half-life over long gaps can
+    underflow it even within one block; a block whose factors multiply to
+    below MIN_LOG_PRODUCT (or contain a 0, a full reset) is run as a plain
+    loop instead. c is clamped to [0, 1].
+    """
+    c = np.clip(c, 0.0, 1.0)
+    out = np.empty(len(u), dtype=np.float64)
+    block = 64
+    for start in range(0, len(u), block):
+        cb, ub = c[start:start + block], u[start:start + block]
+        with np.errstate(divide='ignore'):
+            log_product = np.sum(np.log(cb))
+        if log_product >= MIN_LOG_PRODUCT:
+            p = np.cumprod(cb)
+            out[start:start + block] = p * (y0 + np.cumsum(ub / p))
+        else:
+            y = y0
+            for i in range(len(ub)):
+                y = cb[i] * y + ub[i]
+                out[start + i] = y
+        y0 = out[start + len(ub) - 1]
+    return out
+
+
+def _ewm_prior(values, dt, half_life, warmup, cfg):
+    """Vectorized online detector: z-score of every sample against the state before it"""
+    n = len(values)
+    z = np.full(n, np.nan)
+    expected = np.full(n, np.nan)
+    if n < 2:
+        return z, expected
+    alpha = _alpha(dt[1:], half_life)
+    keep = 1.0 - alpha
+    # mean[t] over samples 0..t, starting from the first value
+    mean = np.empty(n)
+    mean[0] = values[0]
+    mean[1:] = linear_recurrence(keep, alpha * values[1:], values[0])
+    diff = values[1:] - mean[:-1]
+    var = np.empty(n)
+    var[0] = 0.0
+    var[1:] = linear_recurrence(keep, keep * alpha * diff * diff, 0.0)
+    observed = np.concatenate(([0.0], np.cumsum(dt[1:])))
+    prior_mean, prior_var = mean[:-1], var[:-1]
+    floor = np.maximum(cfg['min_std'], cfg['min_relative_std'] * np.abs(prior_mean))
+    scores = diff / np.maximum(np.sqrt(np.maximum(prior_var, 0.0)), floor)
+    ready = observed[:-1] >= warmup
+    z[1:] = np.where(ready, scores, np.nan)
+    expected[1:] = prior_mean
+    return z, expected
+
+
+def _hours_of_week(ts_ms):
+    """Local hour-of-week of epoch-ms timestamps (Monday 00:00 = 0), DST-aware"""
+    hours = ts_ms // 3600000
+    unique = np.unique(hours)
+    offsets = np.array([time.localtime(int(h) * 3600).tm_gmtoff for h in unique], dtype=np.int64)
+    local = (ts_ms // 1000 + offsets[np.searchsorted(unique, hours)]) // 3600
+    # 1970-01-01 was a Thursday
+    return (local + 72) % HOURS_PER_WEEK
+
+
+def rescore_series(ts_ms, values, cfg=None):
+    """Replay the online detectors over a stored series; returns (z, expected) per sample
+
+    z is NaN where no detector was warmed up, and 0 where not every warmed-up
+    detector exceeded the threshold.
+    """
+    cfg = cfg or get_anomaly_config()
+    values = values.astype(np.float64)
+    dt = np.concatenate(([0.0], np.clip(np.diff(ts_ms) / 1000.0, 0.0, MAX_SAMPLE_SECONDS)))
+    ewma_z, ewma_expected = _ewm_prior(values, dt, cfg['half_life_seconds'], cfg['warmup_seconds'], cfg)
+    detectors = [(ewma_z, ewma_expected)]
+    if cfg['seasonal'] and len(values):
+        seasonal_z = np.full(len(values), np.nan)
+        seasonal_expected = np.full(len(values), np.nan)
+        slots = _hours_of_week(ts_ms.astype(np.int64))
+        for slot in np.unique(slots):
+            idx = np.nonzero(slots == slot)[0]
+            # Observed time still comes from the gap to the previous sample of the series
+            z, expected = _ewm_prior(values[idx], dt[idx], cfg['seasonal_half_life_seconds'], cfg['seasonal_warmup_seconds'], cfg)
+            seasonal_z[idx], seasonal_expected[idx] = z, expected
+        detectors.append((seasonal_z, seasonal_expected))
+
+    zs = np.vstack([z for z, _ in detectors])
+    expecteds = np.vstack([expected for _, expected in detectors])
+    ready = ~np.isnan(zs)
+    magnitude = np.where(ready, np.abs(zs), np.inf)
+    # Same rule as online: every ready detector must agree, report the least surprised one
+    pick = np.argmin(magnitude, axis=0)
+    cols = np.arange(zs.shape[1])
+    z = zs[pick, cols]
+    expected = expecteds[pick, cols]
+    any_ready = ready.any(axis=0)
+    flagged = any_ready & (magnitude[pick, cols] >= cfg['z_threshold'])
+    z = np.where(any_ready, np.where(flagged, z, 0.0), np.nan)
+    return z, expected
+
+
+def api_anomalies():
+    """API endpoint re-scoring stored history for anomalies"""
+    from flask import jsonify, request
+    from src.config_utils import get_cluster
+    from src.history import HISTORY_METRICS, get_history_config, query_history
+
+    try:
+        if not get_history_config()['enabled']:
+            return jsonify({'ok': False, 'error': 'History is disabled'}), 404
+        cfg = get_anomaly_config()
+        cluster = get_cluster(request.args.get('cluster'))
+        if cluster is None:
+            return jsonify({'ok': False, 'error': 'Unknown cluster'}), 404
+        metric = request.args.get('metric', cfg['metrics'][0] if cfg['metrics'] else 'queries_per_second')
+        if metric not in HISTORY_METRICS:
+            return jsonify({'ok': False, 'error': f'Unknown metric {metric}'}), 400
+        hosts = request.args.get('hosts') or request.args.get('host')
+        hosts = [h for h in hosts.split(',') if h] if hosts else [node['host'] for node in cluster['nodes']]
+        now_ms = int(time.time() * 1000)
+        end_ms = request.args.get('to', default=now_ms, type=int)
+        window = request.args.get('window', default=7 * 86400, type=int)
+        start_ms = request.args.get('from', default=end_ms - window * 1000, type=int)
+
+        results = {}
+        for host in hosts:
+            ts, values = query_history(cluster['name'], host, metric, start_ms, end_ms)
+            z, expected = rescore_series(ts, values, cfg)
+            flagged = np.nonzero(np.abs(np.nan_to_num(z)) > 0)[0]
+            results[host] = {
+                'samples': len(ts),
+                'anomalies': [{
+                    'ts': int(ts[i]),
+                    'value': float(values[i]),
+                    'expected': round(float(expected[i]), 3),
+                    'z': round(float(z[i]), 2),
+                } for i in flagged],
+            }
+        return jsonify({
+            'ok': True,
+            'cluster': cluster['name'],
+            'metric': metric,
+            'from': start_ms,
+            'to': end_ms,
+            'z_threshold': cfg['z_threshold'],
+            'hosts': results,
+        })
+    except Exception as e:
+        return jsonify({'ok': False, 'error': str(e)}), 500
@@ -0,0 +1,347 @@
+"""
+Collector backends: where node status, processlist and HAProxy stats come from.
+
+LiveBackend talks to MySQL and HAProxy directly. RecordingBackend wraps the
+live backend and appends every sample to a gzip'd NDJSON file, storing global
+status as a delta against the previous sample of the same node. ReplayBackend
+feeds a recording back at real or accelerated speed, so incidents can be
+reproduced and the alerting/UI path profiled offline.
+"""
+
+import bisect
+import gzip
+import json
+import threading
+import time
+import mysql.connector
+import requests
+from requests.auth import HTTPBasicAuth
+from src.config_utils import load_config
+from src.timing import span
+
+PLACEHOLDER_PASSWORDS = ['your_password_here', 'password', '']
+
+
+class CollectorBackend:
+    """Interface implemented by every collector backend"""
+
+    def node_status(self, node_config, status_names=None, include_options=True):
+        """Return (global_status dict, wsrep_provider_options row or None)
+
+        status_names limits SHOW GLOBAL STATUS to those variables (an empty
+        list skips it); include_options=False skips the provider options.
+        """
+        raise NotImplementedError
+
+    def processlist(self, node_config):
+        """Return active (non-sleeping, non-system) processlist rows"""
+        raise NotImplementedError
+
+    def haproxy_stats(self, haproxy_config):
+        """Return the HAProxy stats CSV text, or None if the page is unavailable"""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class LiveBackend(CollectorBackend):
+    """Collect directly from MySQL nodes and the HAProxy stats page"""
+
+    def _connect(self, node_config, **extra):
+        if node_config['password'] in PLACEHOLDER_PASSWORDS:
+            raise Exception(f"Invalid password configuration for {node_config['host']}. Please update config.yaml with actual credentials.")
+        return mysql.connector.connect(
+            host=node_config['host'],
+            user=node_config['user'],
+            password=node_config['password'],
+            port=node_config.get('port', 3306),
+            connect_timeout=5,
+            **extra
+        )
+
+    def node_status(self, node_config, status_names=None, include_options=True):
+        host = node_config['host']
+        with span('mysql.connect', host):
+            conn = self._connect(node_config, autocommit=True)
+        try:
+            cursor = conn.cursor(dictionary=True)
+            global_status = {}
+            if status_names is None:
+                with span('mysql.global_status', host):
+                    cursor.execute("SHOW GLOBAL STATUS")
+                    global_status = {row['Variable_name']: row['Value'] for row in cursor.fetchall()}
+            elif status_names:
+                with span('mysql.hot_status', host):
+                    placeholders = ', '.join(['%s'] * len(status_names))
+                    cursor.execute(f"SHOW GLOBAL STATUS WHERE Variable_name IN ({placeholders})", list(status_names))
+                    global_status = {row['Variable_name']: row['Value'] for row in cursor.fetchall()}
+            provider_options = None
+            if include_options:
+                with span('mysql.provider_options', host):
+                    cursor.execute("SHOW VARIABLES LIKE 'wsrep_provider_options'")
+                    provider_options = cursor.fetchone()
+            cursor.close()
+            return global_status, provider_options
+        finally:
+            conn.close()
+
+    def processlist(self, node_config):
+        with span('mysql.connect', node_config['host']):
+            conn = self._connect(node_config, database='information_schema')
+        cursor = conn.cursor(dictionary=True)
+        try:
+            with span('mysql.processlist', node_config['host']):
+                # Get list of active processes (excluding sleeping processes and system processes)
+                cursor.execute("""
+                    SELECT
+                        ID as id,
+                        USER as user,
+                        HOST as host,
+                        DB as db,
+                        COMMAND as command,
+                        TIME as time,
+                        STATE as state,
+                        INFO as info,
+                        TIME_MS as time_ms
+                    FROM information_schema.PROCESSLIST
+                    WHERE COMMAND != 'Sleep'
+                       AND COMMAND != 'Daemon'
+                       AND USER != 'system user'
+                       AND (INFO IS NOT NULL AND INFO != '')
+                    ORDER BY TIME DESC
+                """)
+                return cursor.fetchall()
+        finally:
+            cursor.close()
+            conn.close()
+
+    def haproxy_stats(self, haproxy_config):
+        url = f"http://{haproxy_config['host']}:{haproxy_config['stats_port']}{haproxy_config['stats_path']}"
+        response = requests.get(url, auth=HTTPBasicAuth(haproxy_config['stats_user'], haproxy_config['stats_password']), timeout=5)
+        if response.status_code != 200:
+            print(f"Warning: HAProxy stats returned status {response.status_code}")
+            return None
+        return response.text
+
+
+def _jsonable(value):
+    """Processlist rows may contain Decimal/datetime values"""
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    return str(value)
+
+
+class RecordingBackend(CollectorBackend):
+    """Pass calls through to another backend and append each sample to a file"""
+
+    def __init__(self, inner, path):
+        self.inner = inner
+        self.path = path
+        self.lock = threading.Lock()
+        self.start = time.time()
+        self.last_status = {}
+        self.last_payload = {}
+        self.file = gzip.open(path, 'at', encoding='utf-8')
+        self._write({'kind': 'header', 'version': 1, 'started': self.start})
+
+    def _write(self, record):
+        line = json.dumps(record, separators=(',', ':'))
+        with self.lock:
+            self.file.write(line + '\n')
+            self.file.flush()
+
+    def _record(self, kind, key, call, encode=None):
+        t = round(time.time() - self.start, 3)
+        try:
+            result = call()
+        except Exception as e:
+            self._write({'t': t, 'kind': kind, 'key': key, 'error': str(e)})
+            raise
+        record = {'t': t, 'kind': kind, 'key': key}
+        payload = encode(result) if encode else {'data': result}
+        if kind != 'status':
+            # Unchanged processlist/HAProxy samples are stored as a back-reference
+            serialized = json.dumps(payload, sort_keys=True)
+            with self.lock:
+                unchanged = self.last_payload.get((kind, key)) == serialized
+                self.last_payload[(kind, key)] = serialized
+            if unchanged:
+                payload = {'same': 1}
+        record.update(payload)
+        self._write(record)
+        return result
+
+    def node_status(self, node_config, status_names=None, include_options=True):
+        host = node_config['host']
+
+        def encode(result):
+            global_status, provider_options = result
+            with self.lock:
+                previous = self.last_status.get(host)
+                merged = dict(previous or {})
+                merged.update(global_status)
+                self.last_status[host] = merged
+            encoded = {}
+            if include_options:
+                encoded['options'] = provider_options.get('Value') if provider_options else None
+            if previous is None:
+                encoded['status'] = global_status
+            else:
+                encoded['delta'] = {k: v for k, v in global_status.items() if previous.get(k) != v}
+                # Only a full SHOW GLOBAL STATUS tells us a variable went away
+                removed = [k for k in previous if k not in global_status] if status_names is None else []
+                if removed:
+                    encoded['removed'] = removed
+            return encoded
+
+        return self._record('status', host, lambda: self.inner.node_status(node_config, status_names, include_options), encode)
+
+    def processlist(self, node_config):
+        def encode(rows):
+            return {'data': [{k: _jsonable(v) for k, v in row.items()} for row in rows]}
+
+        return self._record('processlist', node_config['host'], lambda: self.inner.processlist(node_config), encode)
+
+    def haproxy_stats(self, haproxy_config):
+        key = f"{haproxy_config.get('host')}:{haproxy_config.get('stats_port')}"
+        return self._record('haproxy', key, lambda: self.inner.haproxy_stats(haproxy_config))
+
+    def close(self):
+        with self.lock:
+            self.file.close()
+
+
+class ReplayBackend(CollectorBackend):
+    """Serve samples from a recording, advancing at `speed` times real time"""
+
+    def __init__(self, path, speed=1.0, loop=True):
+        self.path = path
+        self.speed = float(speed or 1.0)
+        self.loop = loop
+        self.timelines = {}
+        self.duration = 0.0
+        self._load()
+        self.started = time.monotonic()
+
+    def _load(self):
+        current_status = {}
+        current_options = {}
+        last_data = {}
+        offset = 0.0
+        sessions = 0
+        with gzip.open(self.path, 'rt', encoding='utf-8') as f:
+            for line in f:
+                record = json.loads(line)
+                kind = record.get('kind')
+                if kind == 'header':
+                    # Appended recording sessions are replayed back to back
+                    if sessions:
+                        offset = self.duration + 1.0
+                    sessions += 1
+                    continue
+                record['t'] = record['t'] + offset
+                key = (kind, record['key'])
+                times, samples = self.timelines.setdefault(key, ([], []))
+                if 'error' in record:
+                    sample = {'error': record['error']}
+                elif record.get('same') and key in last_data:
+                    sample = last_data[key]
+                elif kind == 'status':
+                    status = dict(record['status']) if 'status' in record else dict(current_status.get(record['key'], {}))
+                    status.update(record.get('delta', {}))
+                    for name in record.get('removed', []):
+                        status.pop(name, None)
+                    current_status[record['key']] = status
+                    # Partial polls omit options; they stay as last recorded
+                    options = record['options'] if 'options' in record else current_options.get(record['key'])
+                    current_options[record['key']] = options
+                    sample = {'data': (status, {'Variable_name': 'wsrep_provider_options', 'Value': options} if options is not None else None)}
+                else:
+                    sample = {'data': record.get('data')}
+                if 'data' in sample:
+                    last_data[key] = sample
+                times.append(record['t'])
+                samples.append(sample)
+                self.duration = max(self.duration, record['t'])
+
+    def position(self):
+        """Current offset into the recording, in recorded seconds"""
+        elapsed = (time.monotonic() - self.started) * self.speed
+        if self.loop and self.duration > 0:
+            return elapsed % (self.duration + 1e-3)
+        return elapsed
+
+    def _sample(self, kind, key):
+        timeline = self.timelines.get((kind, key))
+        if not timeline:
+            raise Exception(f"No recorded {kind} samples for {key} in {self.path}")
+        times, samples = timeline
+        index = max(0, bisect.bisect_right(times, self.position()) - 1)
+        sample = samples[index]
+        if 'error' in sample:
+            raise Exception(sample['error'])
+        return sample['data']
+
+    def node_status(self, node_config, status_names=None, include_options=True):
+        # The full recorded status is returned; callers only rely on the names they asked for
+        global_status, provider_options = self._sample('status', node_config['host'])
+        return dict(global_status), (provider_options if include_options else None)
+
+    def processlist(self, node_config):
+        return [dict(row) for row in self._sample('processlist', node_config['host'])]
+
+    def haproxy_stats(self, haproxy_config):
+        return self._sample('haproxy', f"{haproxy_config.get('host')}:{haproxy_config.get('stats_port')}")
+
+
+_backend = None
+_backend_key = None
+_backend_lock = threading.Lock()
+
+
+def get_collector_config():
+    """Get collector backend configuration with defaults"""
+    cfg = (load_config() or {}).get('collector', {}) or {}
+    return {
+        'backend': cfg.get('backend', 'live'),
+        'record_file': cfg.get('record_file', 'recording.ndjson.gz'),
+        'replay_file': cfg.get('replay_file', cfg.get('record_file', 'recording.ndjson.gz')),
+        'replay_speed': float(cfg.get('replay_speed', 1.0) or 1.0),
+        'replay_loop': bool(cfg.get('replay_loop', True)),
+    }
+
+
+def create_backend(cfg):
+    kind = cfg['backend']
+    if kind == 'live':
+        return LiveBackend()
+    if kind == 'record':
+        return RecordingBackend(LiveBackend(), cfg['record_file'])
+    if kind == 'replay':
+        return ReplayBackend(cfg['replay_file'], speed=cfg['replay_speed'], loop=cfg['replay_loop'])
+    raise ValueError(f"Unknown collector backend: {kind}")
+
+
+def get_backend():
+    """Return the configured backend, rebuilding it when the configuration changes"""
+    global _backend, _backend_key
+    if _backend_key == 'explicit':
+        return _backend
+    cfg = get_collector_config()
+    key = tuple(sorted(cfg.items()))
+    with _backend_lock:
+        if _backend is None or key != _backend_key:
+            if _backend is not None:
+                _backend.close()
+            _backend = create_backend(cfg)
+            _backend_key = key
+        return _backend
+
+
+def set_backend(backend):
+    """Install a backend explicitly (tools and benchmarks); config changes no longer swap it"""
+    global _backend, _backend_key
+    with _backend_lock:
+        _backend = backend
+        _backend_key = 'explicit'
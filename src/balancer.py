@@ -0,0 +1,238 @@
+"""
+Closed-loop HAProxy weight balancing.
+
+Every interval_seconds the controller reads each cluster's latest snapshot and
+scores every node's pressure as the worst ratio of its receive queue, FC
+messages sent per second and Threads_running to their thresholds. A node at
+or below all thresholds has pressure 1. Target weights are max_weight scaled
+by the least pressured node's pressure over the node's own (HAProxy weights
+are relative, so when every node struggles equally nothing moves), bounded
+by min_weight.
+
+Changes are rate limited: each round moves a weight at most max_step toward
+its target and ignores moves smaller than min_change, so weights settle
+instead of flapping with every poll. A round's changes go to the runtime
+socket as one batch, and weights are changed at most once per
+interval_seconds per cluster, also when rounds are run by hand. Servers at weight 0 (drained by hand), down, in
+maintenance, not Synced or unreachable are left alone. With dry_run the
+controller only records and prints what it would do.
+"""
+
+import threading
+import time
+from datetime import datetime
+from flask import jsonify, request
+from src.collector import get_cluster_snapshot, LEADER_RETRY_SECONDS
+from src.config_utils import load_config, get_clusters, get_cluster
+from src.haproxy import get_haproxy_server_name_for_host, haproxy_runtime_commands
+from src.state import get_state_store
+
+_controller = None
+_controller_lock = threading.Lock()
+
+
+def get_balancer_config():
+    """Get automatic weight balancing configuration with defaults"""
+    cfg = (load_config() or {}).get('balancer', {}) or {}
+    min_weight = max(int(cfg.get('min_weight', 10) or 0), 1)
+    return {
+        'enabled': cfg.get('enabled', False),
+        'dry_run': cfg.get('dry_run', True),
+        'interval_seconds': float(cfg.get('interval_seconds', 30) or 30),
+        'min_weight': min_weight,
+        'max_weight': min(max(int(cfg.get('max_weight', 100) or 100), min_weight), 256),
+        'max_step': max(int(cfg.get('max_step', 20) or 0), 1),
+        'min_change': int(cfg.get('min_change', 5) or 0),
+        'recv_queue_threshold': float(cfg.get('recv_queue_threshold', 10) or 0),
+        'fc_sent_threshold': float(cfg.get('fc_sent_threshold', 1) or 0),
+        'threads_running_threshold': float(cfg.get('threads_running_threshold', 32) or 0),
+    }
+
+
+def _number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def node_pressure(status, cfg):
+    """Worst ratio of a node's load signals to their thresholds, never below 1"""
+    signals = (
+        (status.get('wsrep_local_recv_queue'), cfg['recv_queue_threshold']),
+        (status.get('fc_sent_per_sec_1m'), cfg['fc_sent_threshold']),
+        (status.get('Threads_running'), cfg['threads_running_threshold']),
+    )
+    return max([1.0] + [_number(value) / threshold for value, threshold in signals if threshold > 0])
+
+
+def _eligible(node_status, weight):
+    status = node_status.get('status') or {}
+    if node_status.get('error') or not status or weight in (None, 0):
+        return False
+    if status.get('wsrep_local_state_comment') != 'Synced':
+        return False
+    return not any(x in str(status.get('haproxy_status') or '').upper() for x in ['MAINT', 'DOWN'])
+
+
+def plan_weights(nodes_status, weights, cfg):
+    """{host: {current, target, next, pressure}} for every node the controller may adjust"""
+    pressures = {}
+    for node in nodes_status:
+        if _eligible(node, weights.get(node['host'])):
+            pressures[node['host']] = node_pressure(node['status'], cfg)
+    if not pressures:
+        return {}
+    best = min(pressures.values())
+    plan = {}
+    for host, pressure in pressures.items():
+        current = int(weights[host])
+        target = max(cfg['min_weight'], min(cfg['max_weight'], round(cfg['max_weight'] * best / pressure)))
+        delta = target - current
+        if abs(delta) < max(cfg['min_change'], 1):
+            step = current
+        else:
+            step = current + max(-cfg['max_step'], min(cfg['max_step'], delta))
+        plan[host] = {'current': current, 'target': target, 'next': step, 'pressure': round(pressure, 2)}
+    return plan
+
+
+def apply_wait_seconds(previous, cfg, now=None):
+    """Seconds until weights may be changed again, given the cluster's last stored round"""
+    try:
+        last = datetime.fromisoformat(previous['last_applied_at'])
+    except (KeyError, TypeError, ValueError):
+        return 0.0
+    elapsed = ((now or datetime.now()) - last).total_seconds()
+    return max(cfg['interval_seconds'] - elapsed, 0.0)
+
+
+def balance_cluster(cluster, cfg=None):
+    """Run one controller round for a cluster: plan, apply the changed weights in one batch, remember the result"""
+    cfg = cfg or get_balancer_config()
+    haproxy_config = cluster.get('haproxy') or {}
+    backend_name = haproxy_config.get('backend_name', 'galera_cluster_backend')
+    snapshot = get_cluster_snapshot(cluster)
+    weights = dict((snapshot.get('haproxy_weights') or {}).get(backend_name, {}))
+    store = get_state_store()
+    previous = store.get('balancer', cluster['name']) or {}
+    # Weights we set after this snapshot's HAProxy read are newer than what it shows
+    if previous.get('applied') and previous.get('applied_at', '') > snapshot.get('collected_at', ''):
+        for host, weight in previous.get('weights', {}).items():
+            if weights.get(host):
+                weights[host] = weight
+    plan = plan_weights(snapshot.get('nodes', []), weights, cfg)
+    changes = {host: entry['next'] for host, entry in plan.items() if entry['next'] != entry['current']}
+    commands = [f"set weight {backend_name}/{get_haproxy_server_name_for_host(host, cluster)} {weight}"
+                for host, weight in changes.items()]
+    result = {
+        'cluster': cluster['name'],
+        'backend': backend_name,
+        'dry_run': cfg['dry_run'],
+        'plan': plan,
+        'commands': commands,
+        'applied': False,
+        'error': None,
+        'weights': {host: entry['next'] for host, entry in plan.items()},
+        'applied_at': datetime.now().isoformat(),
+        'last_applied_at': previous.get('last_applied_at'),
+    }
+    if commands and cfg['dry_run']:
+        print(f"Balancer dry run for cluster {cluster['name']}: {'; '.join(commands)}")
+    elif commands:
+        # Claimed atomically: max_step is per round, so concurrent or back-to-back
+        # runs (e.g. repeated POSTs) must not move weights more than once per interval
+        claimed = []
+
+        def claim(current):
+            current = dict(current or {})
+            if apply_wait_seconds(current, cfg) <= 0:
+                current['last_applied_at'] = result['applied_at']
+                claimed.append(True)
+            return current
+
+        latest = store.update('balancer', cluster['name'], claim)
+        if not claimed:
+            wait = apply_wait_seconds(latest, cfg)
+            result['error'] = f"Weights were changed less than {cfg['interval_seconds']:.0f}s ago; retry in {wait:.0f}s"
+            result['retry_after_seconds'] = round(wait, 1)
+            return result
+        result['last_applied_at'] = result['applied_at']
+        ok, msg = haproxy_runtime_commands(commands, cluster)
+        result['applied'] = ok
+        result['error'] = None if ok else msg
+        if not ok:
+            print(f"Balancer error for cluster {cluster['name']}: {msg}")
+
+    def save(current):
+        # Keep the newest apply time even if a concurrent round applied after this one started
+        stamps = [stamp for stamp in ((current or {}).get('last_applied_at'), result['last_applied_at']) if stamp]
+        return {**result, 'last_applied_at': max(stamps, default=None)}
+
+    store.update('balancer', cluster['name'], save)
+    return result
+
+
+def _controller_loop():
+    # Only one worker process changes weights; the others wait to take over
+    store = get_state_store()
+    while not store.try_acquire_leader('balancer'):
+        time.sleep(LEADER_RETRY_SECONDS)
+    while True:
+        cfg = get_balancer_config()
+        if cfg['enabled']:
+            for cluster in get_clusters():
+                if not cluster.get('haproxy') or len(cluster['nodes']) < 2:
+                    continue
+                try:
+                    balance_cluster(cluster, cfg)
+                except Exception as e:
+                    print(f"Balancer error for cluster {cluster['name']}: {e}")
+        time.sleep(cfg['interval_seconds'])
+
+
+def start_balancer():
+    """Start the weight controller once per process; it runs where the balancer lock is held"""
+    global _controller
+    with _controller_lock:
+        if _controller is not None:
+            return _controller or None
+        if not get_balancer_config()['enabled']:
+            _controller = False
+            return None
+        _controller = threading.Thread(target=_controller_loop, name='haproxy-balancer', daemon=True)
+        _controller.start()
+        return _controller
+
+
+def api_balancer_status():
+    """API endpoint returning the weight controller's settings and last round for a cluster"""
+    try:
+        cluster = get_cluster(request.args.get('cluster'))
+        if cluster is None:
+            return jsonify({'ok': False, 'error': 'Unknown cluster'}), 404
+        cfg = get_balancer_config()
+        last = get_state_store().get('balancer', cluster['name'])
+        return jsonify({'ok': True, 'cluster': cluster['name'], 'config': cfg, 'last_round': last})
+    except Exception as e:
+        return jsonify({'ok': False, 'error': str(e)}), 500
+
+
+def api_balancer_run():
+    """API endpoint running one controller round now; dry run unless the body says otherwise"""
+    try:
+        body = request.get_json(silent=True) or {}
+        cluster = get_cluster(body.get('cluster'))
+        if cluster is None:
+            return jsonify({'ok': False, 'error': 'Unknown cluster'}), 404
+        if not cluster.get('haproxy'):
+            return jsonify({'ok': False, 'error': 'Cluster has no HAProxy configured'}), 400
+        cfg = get_balancer_config()
+        cfg['dry_run'] = bool(body.get('dry_run', True))
+        result = balance_cluster(cluster, cfg)
+        ok = result['error'] is None
+        if 'retry_after_seconds' in result:
+            return jsonify({'ok': False, **result}), 429
+        return jsonify({'ok': ok, **result}), (200 if ok else 500)
+    except Exception as e:
+        return jsonify({'ok': False, 'error': str(e)}), 500
@@ -0,0 +1,252 @@
+"""
+Per-target circuit breakers with stale-while-revalidate.
+
+A node or HAProxy that does not answer costs every caller the full connect
+timeout. Each target (mysql:host:port, haproxy:host:port) has a breaker:
+after failure_threshold consecutive connection failures it opens for
+base_backoff_seconds, and every failed half-open probe doubles that, up to
+max_backoff_seconds (with +-10% jitter so targets do not retry in step).
+While open, calls fail at once with CircuitOpenError. When the backoff has
+elapsed one caller is let through as the half-open probe; its success closes
+the breaker. Errors the target answered with (access denied, a missing
+table, ...) do not count: the target is reachable.
+
+cached_call() adds last-known data on top. Each successful result is kept
+per key, and while its target is open or failing the last result is returned
+immediately together with its age instead of an error. When the probe is due
+and there is something to serve, the probe runs in the background, so no
+request waits on a dead endpoint. Breakers and last-known data are kept per
+process.
+"""
+
+import random
+import threading
+import time
+import mysql.connector
+import requests
+from src.config_utils import load_config
+
+CONFIG_TTL_SECONDS = 5.0
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+# Client errors meaning the server was never reached or went away
+UNREACHABLE_ERRNOS = {2002, 2003, 2005, 2006, 2013, 2055}
+
+_breakers = {}
+_last_known = {}
+_lock = threading.Lock()
+_cached = None
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a target whose breaker is open"""
+
+    def __init__(self, target, last_error, retry_in):
+        super().__init__(f"{target} unreachable ({last_error}); next attempt in {retry_in:.0f}s")
+        self.target = target
+        self.retry_in = retry_in
+
+
+def get_breaker_config():
+    """Get circuit breaker configuration with defaults"""
+    cfg = (load_config() or {}).get('circuit_breaker', {}) or {}
+    base = float(cfg.get('base_backoff_seconds', 5) or 5)
+    return {
+        'enabled': cfg.get('enabled', True),
+        'failure_threshold': max(int(cfg.get('failure_threshold', 2) or 1), 1),
+        'base_backoff_seconds': base,
+        'max_backoff_seconds': max(float(cfg.get('max_backoff_seconds', 120) or 120), base),
+        # Last-known data older than this is not served
+        'stale_max_age_seconds': float(cfg.get('stale_max_age_seconds', 3600) or 3600),
+    }
+
+
+def _config():
+    global _cached
+    now = time.monotonic()
+    cached = _cached
+    if cached is None or cached[0] <= now:
+        cached = _cached = (now + CONFIG_TTL_SECONDS, get_breaker_config())
+    return cached[1]
+
+
+def mysql_target(node_config):
+    return f"mysql:{node_config['host']}:{node_config.get('port', 3306)}"
+
+
+def haproxy_target(haproxy_config):
+    return f"haproxy:{haproxy_config['host']}:{haproxy_config.get('stats_port')}"
+
+
+def is_unreachable(error):
+    """True for connection-level failures, following wrapped exceptions"""
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        if isinstance(error, (CircuitOpenError, requests.ConnectionError, requests.Timeout)):
+            return True
+        if isinstance(error, mysql.connector.Error):
+            return error.errno in UNREACHABLE_ERRNOS or (error.errno is None and isinstance(error, mysql.connector.InterfaceError))
+        if isinstance(error, OSError):
+            return True
+        error = error.__cause__ or error.__context__
+    return False
+
+
+class CircuitBreaker:
+    """Closed -> open after repeated failures -> half-open probe -> closed or open for longer"""
+
+    def __init__(self, target):
+        self.target = target
+        self.state = CLOSED
+        self.failures = 0
+        self.backoff = 0.0
+        self.open_until = 0.0
+        self.opened_at = None
+        self.last_error = None
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """'call' when closed, 'probe' for the one caller that may test an open target, else None"""
+        with self.lock:
+            if self.state == CLOSED:
+                return 'call'
+            if self.state == OPEN and time.monotonic() >= self.open_until:
+                self.state = HALF_OPEN
+                return 'probe'
+            return None
+
+    def success(self):
+        with self.lock:
+            self.state = CLOSED
+            self.failures = 0
+            self.backoff = 0.0
+            self.opened_at = None
+
+    def failure(self, error, cfg):
+        with self.lock:
+            self.failures += 1
+            self.last_error = str(error)
+            if self.state == OPEN:
+                # A call started before the breaker opened
+                return
+            if self.state == HALF_OPEN:
+                self.backoff = min(max(self.backoff, cfg['base_backoff_seconds']) * 2, cfg['max_backoff_seconds'])
+            elif self.failures >= cfg['failure_threshold']:
+                self.backoff = cfg['base_backoff_seconds']
+            else:
+                return
+            if self.state == CLOSED:
+                self.opened_at = time.time()
+            self.state = OPEN
+            self.open_until = time.monotonic() + self.backoff * random.uniform(0.9, 1.1)
+
+    def open_error(self):
+        return CircuitOpenError(self.target, self.last_error, max(self.open_until - time.monotonic(), 0))
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                'state': self.state,
+                'failures': self.failures,
+                'backoff_seconds': round(self.backoff, 1),
+                'retry_in_seconds': round(max(self.open_until - time.monotonic(), 0), 1) if self.state == OPEN else None,
+                'opened_at': self.opened_at,
+                'last_error': self.last_error,
+            }
+
+
+def get_breaker(target):
+    breaker = _breakers.get(target)
+    if breaker is None:
+        with _lock:
+            breaker = _breakers.setdefault(target, CircuitBreaker(target))
+    return breaker
+
+
+def _run(breaker, cfg, fn, args):
+    try:
+        result = fn(*args)
+    except Exception as e:
+        if is_unreachable(e):
+            breaker.failure(e, cfg)
+        else:
+            # The target answered, so it is reachable
+            breaker.success()
+        raise
+    breaker.success()
+    return result
+
+
+def guarded_call(target, fn, *args):
+    """Call fn(*args) through target's breaker; raises CircuitOpenError while it is open"""
+    cfg = _config()
+    if not cfg['enabled']:
+        return fn(*args)
+    breaker = get_breaker(target)
+    if breaker.acquire() is None:
+        raise breaker.open_error()
+    return _run(breaker, cfg, fn, args)
+
+
+def _stale(entry, reason):
+    value, stored_at = entry
+    return value, {'stale': True, 'stale_age_seconds': round(time.time() - stored_at, 1), 'stale_reason': reason}
+
+
+def _remember(key, result):
+    if result is not None:
+        _last_known[key] = (result, time.time())
+
+
+def _revalidate(breaker, cfg, key, fn, args):
+    try:
+        _remember(key, _run(breaker, cfg, fn, args))
+    except Exception as e:
+        print(f"Circuit breaker probe failed for {breaker.target}: {e}")
+
+
+def cached_call(target, key, fn, *args):
+    """(result, None) from fn(*args), or (last known result, stale info) while target is unreachable
+
+    Stale info is {'stale': True, 'stale_age_seconds', 'stale_reason'}. Without
+    a last-known result the error (or CircuitOpenError) is raised.
+    """
+    cfg = _config()
+    if not cfg['enabled']:
+        return fn(*args), None
+    breaker = get_breaker(target)
+    entry = _last_known.get(key)
+    if entry is not None and time.time() - entry[1] > cfg['stale_max_age_seconds']:
+        entry = None
+    decision = breaker.acquire()
+    if decision is None:
+        error = breaker.open_error()
+        if entry is None:
+            raise error
+        return _stale(entry, str(error))
+    if decision == 'probe' and entry is not None:
+        threading.Thread(target=_revalidate, args=(breaker, cfg, key, fn, args),
+                         name='breaker-probe', daemon=True).start()
+        return _stale(entry, f"{target} unreachable ({breaker.last_error}); retrying in the background")
+    try:
+        result = _run(breaker, cfg, fn, args)
+    except Exception as e:
+        if entry is None or not is_unreachable(e):
+            raise
+        return _stale(entry, str(e))
+    _remember(key, result)
+    return result, None
+
+
+def breaker_states():
+    """{target: state} of every breaker this process has used"""
+    return {target: breaker.snapshot() for target, breaker in sorted(_breakers.items())}
+
+
+def api_breakers():
+    """API endpoint returning this process's circuit breakers"""
+    from flask import jsonify
+
+    return jsonify({'ok': True, 'config': _config(), 'breakers': breaker_states()})
@@ -1,11 +1,19 @@
 from datetime import datetime
+import time
 import mysql.connector
-from src.state import previous_readings
+from src.state import get_state_store
+from src.metric_cache import read_node_metrics
+from src.flow_control import update_fc_windows
+from src.gcache import update_ist_window
+from src.utils import parse_wsrep_provider_options
+from src.config_utils import cluster_node_key
+from src.breaker import cached_call, mysql_target
+from src.timing import span, record_span
 
-def calculate_rates(previous_readings, node_key, current_time, total_writes, total_reads, total_queries):
-    if node_key in previous_readings:
-        prev = previous_readings[node_key]
-        time_diff = (current_time - prev['time']).total_seconds()
+def calculate_rates(prev, current_time, total_writes, total_reads, total_queries):
+    """Rates against the previous reading (whose 'time' is epoch seconds), or zeros without one"""
+    if prev:
+        time_diff = current_time.timestamp() - prev['time']
         if time_diff > 0:
             writes_diff = total_writes - prev['writes']
             reads_diff = total_reads - prev['reads']
@@ -17,162 +25,170 @@ def calculate_rates(previous_readings, node_key, current_time, total_writes, tot
             )
     return (0, 0, 0)
 
-def read_node_status(node_config):
+def read_node_status(node_config, node_key=None):
+    """Return (global_status, parsed wsrep_provider_options) through the tiered metric cache"""
     try:
-        # Check for placeholder values
-        if node_config['password'] in ['your_password_here', 'password', '']:
-            raise Exception(f"Invalid password configuration for {node_config['host']}. Please update config.yaml with actual credentials.")
-        
-        conn = mysql.connector.connect(
-            host=node_config['host'],
-            user=node_config['user'],
-            password=node_config['password'],
-            port=node_config['port'],
-            connect_timeout=5,
-            autocommit=True
-        )
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("SHOW GLOBAL STATUS")
-        global_status = {row['Variable_name']: row['Value'] for row in cursor.fetchall()}
-        cursor.execute("SHOW VARIABLES LIKE 'wsrep_provider_options'")
-        provider_options = cursor.fetchone()
-        cursor.close()
-        conn.close()
-        return global_status, provider_options
+        with span('node.read', node_config['host']):
+            return read_node_metrics(node_config, node_key or node_config['host'])
     except mysql.connector.Error as e:
         raise Exception(f"MySQL connection failed for {node_config['host']}: {str(e)}")
     except Exception as e:
         raise Exception(f"Error reading node status for {node_config['host']}: {str(e)}")
 
-def parse_wsrep_provider_options(options_str):
-    """Parse wsrep_provider_options string into a dictionary"""
-    options = {}
-    if options_str:
-        for option in options_str.split(';'):
-            if '=' in option:
-                key, value = option.split('=', 1)
-                options[key.strip()] = value.strip()
-    return options
+def get_node_status(node_config, cluster=None, haproxy_states=None):
+    """Get comprehensive status for a single node
 
-def get_node_status(node_config):
-    """Get comprehensive status for a single node"""
+    Cluster pollers pass the cluster's HAProxy states so the stats page is read
+    once per cluster instead of once per node. While the node's circuit breaker
+    is open the error comes back at once, with the last good status and its
+    age under 'stale'.
+    """
+    cluster_name = cluster['name'] if cluster else None
+    node_key = cluster_node_key(cluster_name, node_config['host'])
+    stale = None
     try:
-        current_time = datetime.now()
-        node_key = node_config['host']
-        
+        result, stale = cached_call(mysql_target(node_config), f"node_status:{node_key}",
+                                    poll_node_status, node_config, cluster_name, node_key, cluster, haproxy_states)
+        if not stale:
+            return result
+        error = stale['stale_reason']
+    except Exception as e:
+        error = str(e)
+    node_status = {
+        'host': node_config['host'],
+        'cluster': cluster_name,
+        'status': None,
+        'timestamp': datetime.now().isoformat(),
+        'error': error
+    }
+    if stale:
+        node_status['stale'] = {
+            'status': result['status'],
+            'timestamp': result['timestamp'],
+            'age_seconds': stale['stale_age_seconds']
+        }
+    return node_status
+
+def poll_node_status(node_config, cluster_name, node_key, cluster=None, haproxy_states=None):
+    """Read and derive one node's status; raises when the node cannot be read"""
+    current_time = datetime.now()
+    
+    if haproxy_states is None:
         # Import here to avoid circular imports
         from src.haproxy import get_haproxy_server_states
-        import yaml
-        
-        # Load config locally to avoid circular imports
-        def load_config():
-            try:
-                with open('config.yaml', 'r') as file:
-                    return yaml.safe_load(file)
-            except:
-                return {'nodes': []}
-        
-        # Get HAProxy stats first
-        haproxy_states = get_haproxy_server_states()
-        
-        # Get all global status variables
-        global_status, provider_options = read_node_status(node_config)
-        
-        # Get Galera specific status
-        galera_vars = [
-            'wsrep_local_state_comment',
-            'wsrep_cluster_size',
-            'wsrep_local_index',
-            'wsrep_cluster_status',
-            'wsrep_flow_control_active',
-            'wsrep_flow_control_recv',
-            'wsrep_flow_control_sent',
-            'wsrep_flow_control_paused',
-            'wsrep_local_cert_failures',
-            'wsrep_local_recv_queue',
-            'wsrep_local_send_queue',
-            'wsrep_cert_deps_distance',
-            'wsrep_last_committed',
-            'wsrep_provider_version',
-            'wsrep_thread_count',
-            'wsrep_cluster_conf_id',
-            'wsrep_cluster_size',
-            'wsrep_cluster_state_uuid',
-            'wsrep_local_state',
-            'wsrep_ready',
-            'wsrep_applier_thread_count',
-            'wsrep_rollbacker_thread_count'
-        ]
-        
-        status = {var: global_status.get(var, '-') for var in galera_vars}
-        
-        # Add additional server metrics
-        server_metrics = [
-            'Com_lock_tables',
-            'Threads_running',
-            'Memory_used',
-            'Slave_connections',
-            'Slaves_connected'
-        ]
-        
-        for metric in server_metrics:
-            status[metric] = global_status.get(metric, '0')
-            
-        # Add HAProxy current connections and state
-        hap_state = haproxy_states.get(node_config['host'], {})
-        status['haproxy_current'] = hap_state.get('current', 0)
-        status['haproxy_status'] = hap_state.get('status', '-')
+        with span('node.haproxy', node_config['host']):
+            haproxy_states = get_haproxy_server_states(cluster)
+    
+    # Get all global status variables
+    global_status, options = read_node_status(node_config, node_key)
+    process_start = time.perf_counter()
+    
+    # Get Galera specific status
+    galera_vars = [
+        'wsrep_local_state_comment',
+        'wsrep_cluster_size',
+        'wsrep_local_index',
+        'wsrep_cluster_status',
+        'wsrep_flow_control_active',
+        'wsrep_flow_control_recv',
+        'wsrep_flow_control_sent',
+        'wsrep_flow_control_paused',
+        'wsrep_local_cert_failures',
+        'wsrep_local_recv_queue',
+        'wsrep_local_send_queue',
+        'wsrep_cert_deps_distance',
+        'wsrep_last_committed',
+        'wsrep_provider_version',
+        'wsrep_thread_count',
+        'wsrep_cluster_conf_id',
+        'wsrep_cluster_size',
+        'wsrep_cluster_state_uuid',
+        'wsrep_local_state',
+        'wsrep_ready',
+        'wsrep_applier_thread_count',
+        'wsrep_rollbacker_thread_count'
+    ]
+    
+    status = {var: global_status.get(var, '-') for var in galera_vars}
+    
+    # Add additional server metrics
+    server_metrics = [
+        'Com_lock_tables',
+        'Threads_running',
+        'Memory_used',
+        'Slave_connections',
+        'Slaves_connected'
+    ]
+    
+    for metric in server_metrics:
+        status[metric] = global_status.get(metric, '0')
         
-        # Get wsrep_provider_options
-        if provider_options and 'Value' in provider_options:
-            options = parse_wsrep_provider_options(provider_options['Value'])
-            status['gcache.page_size'] = options.get('gcache.page_size', '-')
-            status['gcache.size'] = options.get('gcache.size', '-')
-            status['gcs.fc_limit'] = options.get('gcs.fc_limit', '-')
-        
-        # Calculate metrics based on SHOW GLOBAL STATUS
-        total_writes = (
-            int(global_status.get('Com_insert', 0)) +
-            int(global_status.get('Com_insert_select', 0)) +
-            int(global_status.get('Com_update', 0)) +
-            int(global_status.get('Com_update_multi', 0))
-        )
-        
-        total_reads = int(global_status.get('Com_select', 0))
-        total_queries = int(global_status.get('Queries', 0))
-        
-        # Calculate rates based on previous readings
-        wps, rps, qps = calculate_rates(previous_readings, node_key, current_time, total_writes, total_reads, total_queries)
-        status['writes_per_second'] = wps
-        status['reads_per_second'] = rps
-        status['queries_per_second'] = qps
+    # Add HAProxy current connections and state
+    hap_state = haproxy_states.get(node_config['host'], {})
+    status['haproxy_current'] = hap_state.get('current', 0)
+    status['haproxy_status'] = hap_state.get('status', '-')
+    
+    # Get wsrep_provider_options
+    if options:
+        status['gcache.page_size'] = options.get('gcache.page_size', '-')
+        status['gcache.size'] = options.get('gcache.size', '-')
+        status['gcs.fc_limit'] = options.get('gcs.fc_limit', '-')
+    
+    # Calculate metrics based on SHOW GLOBAL STATUS
+    total_writes = (
+        int(global_status.get('Com_insert', 0)) +
+        int(global_status.get('Com_insert_select', 0)) +
+        int(global_status.get('Com_update', 0)) +
+        int(global_status.get('Com_update_multi', 0))
+    )
+    
+    total_reads = int(global_status.get('Com_select', 0))
+    total_queries = int(global_status.get('Queries', 0))
+    
+    # Swap in the current reading and calculate rates against the previous one in a
+    # single atomic update, so concurrent workers never share or lose a baseline
+    reading = {
+        'writes': total_writes,
+        'reads': total_reads,
+        'queries': total_queries,
+        'time': current_time.timestamp()
+    }
+    rates = []
+    def swap_reading(prev):
+        rates.append(calculate_rates(prev, current_time, total_writes, total_reads, total_queries))
+        has_baseline.append(prev is not None)
+        return reading
+    has_baseline = []
+    get_state_store().update('readings', node_key, swap_reading)
+    wps, rps, qps = rates[-1]
+    status['writes_per_second'] = wps
+    status['reads_per_second'] = rps
+    status['queries_per_second'] = qps
 
-        # If HAProxy marks server as MAINT/DOWN, zero out rates for UI clarity
-        hap_stat_str = str(status.get('haproxy_status') or '').upper()
-        if any(x in hap_stat_str for x in ['MAINT', 'DOWN']):
-            status['writes_per_second'] = 0
-            status['reads_per_second'] = 0
-            status['queries_per_second'] = 0
-        
-        # Store current readings for next calculation
-        previous_readings[node_key] = {
-            'writes': total_writes,
-            'reads': total_reads,
-            'queries': total_queries,
-            'time': current_time
-        }
-        
-        return {
-            'host': node_config['host'],
-            'status': status,
-            'timestamp': current_time.isoformat(),
-            'error': None
-        }
-    except Exception as e:
-        return {
-            'host': node_config['host'],
-            'status': None,
-            'timestamp': datetime.now().isoformat(),
-            'error': str(e)
-        }
+    # Paused share and FC message rates over 10s/1m/5m instead of since startup
+    status.update(update_fc_windows(node_key, global_status, current_time.timestamp()))
+
+    # How long this node's gcache covers at the current write-set rate
+    status.update(update_ist_window(node_key, global_status, options, current_time.timestamp()))
+
+    # If HAProxy marks server as MAINT/DOWN, zero out rates for UI clarity
+    hap_stat_str = str(status.get('haproxy_status') or '').upper()
+    if any(x in hap_stat_str for x in ['MAINT', 'DOWN']):
+        status['writes_per_second'] = 0
+        status['reads_per_second'] = 0
+        status['queries_per_second'] = 0
+    elif has_baseline[-1]:
+        # Rates are only meaningful once there was a previous reading
+        from src.anomaly import score_node_metrics
+        status['anomalies'] = score_node_metrics(node_key, status, current_time)
+    
+    record_span('node.process', (time.perf_counter() - process_start) * 1000.0, node_config['host'])
+    
+    return {
+        'host': node_config['host'],
+        'cluster': cluster_name,
+        'status': status,
+        'timestamp': current_time.isoformat(),
+        'error': None
+    }
 
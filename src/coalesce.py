@@ -0,0 +1,119 @@
+"""
+Single-flight request coalescing for expensive endpoints.
+
+Five operators opening the dashboard together, or a double click in the
+transactions tab, would otherwise run the same status collection or
+SHOW ENGINE INNODB STATUS once per request. Views wrapped with @coalesced
+are keyed by endpoint and query string: the first request runs the view and
+concurrent identical requests wait for it and get a copy of its response.
+With ttl_seconds > 0 a successful response is also reused for that long
+afterwards, absorbing bursts. An error response is shared only with the
+requests already waiting for it and is never reused afterwards. When the run
+raises, one of the waiters runs the view again for the rest, so a failing
+node still costs one run at a time rather than one per dashboard.
+
+The shared result is the uncompressed body, status and headers. Each request
+gets its own response object, so compress_response still picks gzip, brotli
+or nothing from that request's Accept-Encoding, and login is checked per
+request before the view is reached. Coalescing is per worker process, and
+settings are read once.
+"""
+
+import functools
+import threading
+import time
+from flask import current_app, request
+from src.config_utils import load_config
+from src.timing import span
+
+# Cached results above this count are pruned once expired
+MAX_ENTRIES = 256
+# Recomputed per response
+SKIP_HEADERS = ('content-length',)
+
+_calls = {}
+_calls_lock = threading.Lock()
+_coalescing_cfg = None
+
+
+def get_coalescing_config():
+    """Get request coalescing configuration with defaults (read once)"""
+    global _coalescing_cfg
+    if _coalescing_cfg is None:
+        cfg = (load_config() or {}).get('coalescing', {}) or {}
+        _coalescing_cfg = {
+            'enabled': cfg.get('enabled', True),
+            'ttl_seconds': float(cfg.get('ttl_seconds', 0) or 0),
+            'max_wait_seconds': float(cfg.get('max_wait_seconds', 30) or 30),
+        }
+    return _coalescing_cfg
+
+
+class _Call:
+    """One execution of a view and the result every waiter gets"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.raised = False
+        self.expires = 0.0
+
+
+def _prune(now):
+    for key in [key for key, call in _calls.items() if call.done.is_set() and call.expires <= now]:
+        del _calls[key]
+
+
+def _run_leader(key, call, view, args, kwargs, ttl):
+    try:
+        response = current_app.make_response(view(*args, **kwargs))
+        if not response.is_streamed and not response.direct_passthrough:
+            headers = [(name, value) for name, value in response.headers if name.lower() not in SKIP_HEADERS]
+            call.result = (response.get_data(), response.status_code, headers)
+        return response
+    except BaseException:
+        call.raised = True
+        raise
+    finally:
+        ok = call.result is not None and 200 <= call.result[1] < 300
+        call.expires = time.monotonic() + (ttl if ok else 0)
+        with _calls_lock:
+            if (not ok or not ttl) and _calls.get(key) is call:
+                del _calls[key]
+        call.done.set()
+
+
+def coalesced(view):
+    """Decorator: concurrent identical requests to view share one execution"""
+
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        cfg = get_coalescing_config()
+        if not cfg['enabled']:
+            return view(*args, **kwargs)
+        key = (request.endpoint, tuple(sorted(request.args.items(multi=True))), tuple(sorted(kwargs.items())))
+        while True:
+            now = time.monotonic()
+            with _calls_lock:
+                call = _calls.get(key)
+                if call is not None and call.done.is_set() and call.expires <= now:
+                    call = None
+                leader = call is None
+                if leader:
+                    if len(_calls) >= MAX_ENTRIES:
+                        _prune(now)
+                    call = _calls[key] = _Call()
+            if leader:
+                return _run_leader(key, call, view, args, kwargs, cfg['ttl_seconds'])
+            with span('coalesce.wait'):
+                finished = call.done.wait(cfg['max_wait_seconds'])
+            if finished and call.raised:
+                # The run raised and was dropped; the first waiter back becomes the next leader
+                continue
+            if not finished or call.result is None:
+                # The shared run is stuck or streamed; do the work for this request
+                return view(*args, **kwargs)
+            body, status, headers = call.result
+            return current_app.response_class(body, status=status, headers=headers)
+
+    return wrapper
@@ -0,0 +1,434 @@
+"""
+Background collection for every configured cluster.
+
+One scheduler thread keeps a heap of per-node due times and hands due polls
+to a worker pool shared by all clusters. A node is only rescheduled once its
+poll finished, so a slow or unreachable node never piles up or delays anyone
+else. Each node's interval adapts to its health: about a second while it is
+not Synced, under flow control or queueing, backing off towards a long
+interval once it is stable. Intervals are jittered and every poll spends
+tokens from a global queries-per-second budget against the databases.
+Finished polls get replication lag estimates (src.replication) and go
+through alerts and history and are merged into the
+cluster's latest snapshot in the shared state store. With a shared store only
+one worker process (the holder of the collector lock) polls; the others serve
+its snapshots and take over if it exits.
+"""
+
+import contextvars
+import heapq
+import itertools
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from src.config_utils import load_config, get_clusters
+from src.state import get_state_store
+from src.timing import span
+
+# Queries a single node poll runs (global status + provider options)
+QUERIES_PER_POLL = 2
+# How often a follower worker retries the collector lock
+LEADER_RETRY_SECONDS = 5.0
+
+_pool_lock = threading.Lock()
+_node_pool = None
+_scheduler = None
+_start_checked = False
+_collector_enabled = False
+
+
+def get_scheduler_config():
+    """Get background collection settings with defaults"""
+    cfg = (load_config() or {}).get('collector', {}) or {}
+    adaptive = cfg.get('adaptive', {}) or {}
+    return {
+        'enabled': bool(cfg.get('enabled', False)),
+        'interval_seconds': float(cfg.get('interval_seconds', 10) or 10),
+        'workers': int(cfg.get('workers', 16) or 16),
+        'max_db_qps': float(cfg.get('max_db_qps', 50) or 0),
+        'adaptive': {
+            'enabled': bool(adaptive.get('enabled', True)),
+            'min_interval': float(adaptive.get('min_interval', 1.0) or 1.0),
+            'max_interval': float(adaptive.get('max_interval', 60.0) or 60.0),
+            'backoff': float(adaptive.get('backoff', 1.5) or 1.5),
+            'jitter': float(adaptive.get('jitter', 0.1) or 0.0),
+            'recv_queue_threshold': float(adaptive.get('recv_queue_threshold', 10) or 0),
+            'send_queue_threshold': float(adaptive.get('send_queue_threshold', 10) or 0),
+        },
+    }
+
+
+def _get_pool():
+    global _node_pool
+    with _pool_lock:
+        if _node_pool is None:
+            _node_pool = ThreadPoolExecutor(max_workers=get_scheduler_config()['workers'], thread_name_prefix='collector-node')
+        return _node_pool
+
+
+def submit_node_task(fn, *args):
+    """Run fn on the shared node pool, carrying over the caller's timing trace"""
+    return _get_pool().submit(contextvars.copy_context().run, fn, *args)
+
+
+def _post_process(cluster_name, nodes_status):
+    # Imported here so the collector can be loaded without pulling in Flask
+    from src.alerts import evaluate_alerts
+    from src.history import record_history
+    from src.timeline import record_transitions
+
+    # Evaluate alerts based on current snapshot
+    try:
+        evaluate_alerts(nodes_status, cluster_name)
+    except Exception as e:
+        # Never let alert evaluation break collection
+        print(f"Alert evaluation error for cluster {cluster_name}: {e}")
+
+    # Persist numeric metrics for the history API (written off the request path)
+    try:
+        record_history(nodes_status, cluster_name)
+    except Exception as e:
+        print(f"History recording error for cluster {cluster_name}: {e}")
+
+    # Only wsrep state changes are kept for the timeline
+    try:
+        record_transitions(nodes_status, cluster_name)
+    except Exception as e:
+        print(f"Timeline recording error for cluster {cluster_name}: {e}")
+
+
+def _apply_rate(cluster_name, node_status):
+    from src.replication import annotate_apply_rate
+
+    try:
+        annotate_apply_rate(cluster_name, node_status)
+    except Exception as e:
+        print(f"Apply rate error for {node_status.get('host')} in cluster {cluster_name}: {e}")
+
+
+def _replication(nodes_status, enabled):
+    from src.replication import replication_lag
+
+    return replication_lag(nodes_status) if enabled else {}
+
+
+def process_snapshot(cluster, nodes_status, haproxy_weights):
+    """Run alerts and history for a full cluster poll and publish it as the latest snapshot"""
+    from src.flow_control import annotate_fc_senders, flow_control_summary
+    from src.replication import annotate_lag, get_replication_config
+
+    replication = _replication(nodes_status, get_replication_config()['enabled'])
+    flow_control = flow_control_summary(nodes_status)
+    for node_status in nodes_status:
+        annotate_lag(node_status, replication.get(node_status['host']))
+        annotate_fc_senders(node_status, flow_control)
+    _post_process(cluster['name'], nodes_status)
+    snapshot = {
+        'cluster': cluster['name'],
+        'nodes': nodes_status,
+        'haproxy_weights': haproxy_weights,
+        'poll_intervals': {},
+        'replication': replication,
+        'flow_control': flow_control,
+        'collected_at': datetime.now().isoformat(),
+    }
+    get_state_store().set('snapshots', cluster['name'], snapshot)
+    return snapshot
+
+
+def publish_node_status(cluster, node_status, haproxy_weights, interval):
+    """Merge one node's poll into the cluster snapshot, then run alerts and history for it"""
+    from src.flow_control import annotate_fc_senders, flow_control_summary
+    from src.replication import annotate_lag, get_replication_config
+
+    name = cluster['name']
+    host = node_status['host']
+    lag_enabled = get_replication_config()['enabled']
+
+    def merge(previous):
+        previous = previous or {}
+        by_host = {node['host']: node for node in previous.get('nodes', [])}
+        by_host[host] = node_status
+        nodes = [by_host[node['host']] for node in cluster['nodes'] if node['host'] in by_host]
+        intervals = dict(previous.get('poll_intervals', {}))
+        intervals[host] = round(interval, 2)
+        # Lag and FC senders are re-evaluated for every node; only the polled node's status carries them
+        replication = _replication(nodes, lag_enabled)
+        annotate_lag(node_status, replication.get(host))
+        flow_control = flow_control_summary(nodes)
+        annotate_fc_senders(node_status, flow_control)
+        # Readers get a new dict, never one that is being modified
+        return {
+            'cluster': name,
+            'nodes': nodes,
+            'haproxy_weights': haproxy_weights,
+            'poll_intervals': intervals,
+            'replication': replication,
+            'flow_control': flow_control,
+            'collected_at': node_status['timestamp'],
+        }
+
+    get_state_store().update('snapshots', name, merge)
+    _post_process(name, [node_status])
+
+
+def collect_cluster(cluster):
+    """Poll every node of a cluster concurrently and return the processed snapshot"""
+    from src.cluster import get_node_status
+    from src.haproxy import fetch_backend_servers, haproxy_states_from_servers, haproxy_weights_from_servers
+
+    with span('cluster.haproxy', cluster['name']):
+        servers = fetch_backend_servers(cluster)
+    haproxy_states = haproxy_states_from_servers(servers)
+    haproxy_weights = haproxy_weights_from_servers(servers, cluster['haproxy']) if cluster['haproxy'] else {}
+
+    futures = [submit_node_task(get_node_status, node, cluster, haproxy_states) for node in cluster['nodes']]
+    nodes_status = [future.result() for future in futures]
+    for status in nodes_status:
+        if status.get('error'):
+            print(f"Error for node {status.get('host')} in cluster {cluster['name']}: {status['error']}")
+        else:
+            _apply_rate(cluster['name'], status)
+    return process_snapshot(cluster, nodes_status, haproxy_weights)
+
+
+def collector_running():
+    """True once start_collector has started this process's collector (polling or waiting for the lock)"""
+    return _collector_enabled
+
+
+def get_cluster_snapshot(cluster):
+    """Latest snapshot from the background collector, or a fresh poll when there is none"""
+    if _collector_enabled:
+        snapshot = get_state_store().get('snapshots', cluster['name'])
+        if snapshot is not None and len(snapshot['nodes']) == len(cluster['nodes']):
+            # A snapshot nobody refreshed for two long intervals means no worker is collecting
+            cfg = get_scheduler_config()
+            stale_after = 2 * max(cfg['adaptive']['max_interval'], cluster['interval_seconds'])
+            try:
+                age = (datetime.now() - datetime.fromisoformat(snapshot['collected_at'])).total_seconds()
+            except (KeyError, TypeError, ValueError):
+                age = None
+            if age is not None and age <= stale_after:
+                return snapshot
+    return collect_cluster(cluster)
+
+
+def needs_fast_poll(node_status, adaptive_cfg):
+    """True when a node is unreachable, not Synced, under flow control or queueing"""
+    status = node_status.get('status')
+    if node_status.get('error') or not status:
+        return True
+    if str(status.get('wsrep_local_state_comment') or '').lower() != 'synced':
+        return True
+    if str(status.get('wsrep_flow_control_active') or '').lower() == 'true':
+        return True
+    for metric, threshold in (('wsrep_local_recv_queue', adaptive_cfg['recv_queue_threshold']),
+                              ('wsrep_local_send_queue', adaptive_cfg['send_queue_threshold'])):
+        try:
+            if threshold and float(status.get(metric) or 0) > threshold:
+                return True
+        except (TypeError, ValueError):
+            pass
+    return False
+
+
+def next_poll_interval(previous, base, node_status, cfg):
+    """Interval until a node's next poll, before jitter"""
+    adaptive = cfg['adaptive']
+    if not adaptive['enabled']:
+        return base
+    if needs_fast_poll(node_status, adaptive):
+        return adaptive['min_interval']
+    # Stable: back off geometrically from wherever the node is now
+    return min(max(previous, adaptive['min_interval']) * adaptive['backoff'], adaptive['max_interval'])
+
+
+class TokenBucket:
+    """Global budget of database queries per second shared by all polls"""
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst if burst is not None else max(rate, QUERIES_PER_POLL)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def take(self, cost):
+        """Spend cost tokens; returns 0 on success or the seconds to wait before retrying"""
+        if self.rate <= 0:
+            return 0.0
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= cost:
+                self.tokens -= cost
+                return 0.0
+            return (cost - self.tokens) / self.rate
+
+
+class CollectorScheduler:
+    """Poll every node on its own adaptive interval over the shared worker pool"""
+
+    def __init__(self, resync_interval=30.0):
+        self.resync_interval = resync_interval
+        self.cfg = get_scheduler_config()
+        self.budget = TokenBucket(self.cfg['max_db_qps'])
+        self._heap = []
+        self._clusters = {}
+        self._known = set()
+        self._intervals = {}
+        self._haproxy = {}
+        self._haproxy_locks = {}
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._next_resync = 0.0
+        self.thread = threading.Thread(target=self._run, name='collector-scheduler', daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+
+    def _schedule(self, key, due):
+        with self._cond:
+            heapq.heappush(self._heap, (due, next(self._seq), key))
+            self._cond.notify()
+
+    def _jittered(self, interval):
+        jitter = self.cfg['adaptive']['jitter']
+        return interval * random.uniform(1 - jitter, 1 + jitter) if jitter else interval
+
+    def _resync(self, now):
+        """Reload clusters from config.yaml and stagger first polls of new nodes"""
+        self._next_resync = now + self.resync_interval
+        self.cfg = get_scheduler_config()
+        self.budget.rate = self.cfg['max_db_qps']
+        self.budget.capacity = max(self.budget.rate, QUERIES_PER_POLL)
+        self._clusters = {cluster['name']: cluster for cluster in get_clusters()}
+        for cluster in self._clusters.values():
+            new = [node for node in cluster['nodes'] if (cluster['name'], node['host']) not in self._known]
+            for i, node in enumerate(new):
+                key = (cluster['name'], node['host'])
+                self._known.add(key)
+                self._intervals[key] = cluster['interval_seconds']
+                self._schedule(key, now + cluster['interval_seconds'] * i / len(new))
+
+    def _lookup(self, key):
+        cluster = self._clusters.get(key[0])
+        if cluster is None:
+            return None, None
+        for node in cluster['nodes']:
+            if node['host'] == key[1]:
+                return cluster, node
+        return cluster, None
+
+    def _run(self):
+        pool = _get_pool()
+        while not self._stop.is_set():
+            now = time.monotonic()
+            if now >= self._next_resync:
+                try:
+                    self._resync(now)
+                except Exception as e:
+                    print(f"Collector config reload error: {e}")
+            with self._cond:
+                if not self._heap or self._heap[0][0] > now:
+                    timeout = self._next_resync - now
+                    if self._heap:
+                        timeout = min(timeout, self._heap[0][0] - now)
+                    self._cond.wait(max(0.01, timeout))
+                    continue
+                _, _, key = heapq.heappop(self._heap)
+            cluster, node = self._lookup(key)
+            if node is None:
+                # Removed from config.yaml; a later resync re-adds it if it comes back
+                self._known.discard(key)
+                self._intervals.pop(key, None)
+                if key[0] not in self._clusters:
+                    get_state_store().delete('snapshots', key[0])
+                continue
+            wait = self.budget.take(QUERIES_PER_POLL)
+            if wait:
+                self._schedule(key, now + wait)
+                continue
+            pool.submit(self._poll, cluster, node)
+
+    def _haproxy_view(self, cluster):
+        """HAProxy states/weights for a cluster, shared by polls within min_interval"""
+        from src.haproxy import fetch_backend_servers, haproxy_states_from_servers, haproxy_weights_from_servers
+
+        name = cluster['name']
+        lock = self._haproxy_locks.setdefault(name, threading.Lock())
+        with lock:
+            cached = self._haproxy.get(name)
+            if cached and time.monotonic() - cached[0] < self.cfg['adaptive']['min_interval']:
+                return cached[1], cached[2]
+            with span('cluster.haproxy', name):
+                servers = fetch_backend_servers(cluster)
+            states = haproxy_states_from_servers(servers)
+            weights = haproxy_weights_from_servers(servers, cluster['haproxy']) if cluster['haproxy'] else {}
+            self._haproxy[name] = (time.monotonic(), states, weights)
+            return states, weights
+
+    def _poll(self, cluster, node):
+        from src.cluster import get_node_status
+
+        key = (cluster['name'], node['host'])
+        started = time.monotonic()
+        interval = self._intervals.get(key, cluster['interval_seconds'])
+        try:
+            states, weights = self._haproxy_view(cluster)
+            status = get_node_status(node, cluster, states)
+            if status.get('error'):
+                print(f"Error for node {node['host']} in cluster {cluster['name']}: {status['error']}")
+            else:
+                _apply_rate(cluster['name'], status)
+            interval = next_poll_interval(interval, cluster['interval_seconds'], status, self.cfg)
+            publish_node_status(cluster, status, weights, interval)
+        except Exception as e:
+            print(f"Collection error for {node['host']} in cluster {cluster['name']}: {e}")
+        finally:
+            self._intervals[key] = interval
+            self._schedule(key, started + self._jittered(interval))
+
+
+def _wait_for_leadership(scheduler):
+    global _scheduler
+    store = get_state_store()
+    while not store.try_acquire_leader('collector'):
+        time.sleep(LEADER_RETRY_SECONDS)
+    print("Collector lock acquired, polling from this process")
+    _scheduler = scheduler.start()
+
+
+def start_collector():
+    """Start the background collector once per process if collector.enabled is set
+
+    With a shared state store only the process holding the collector lock
+    polls; the others keep retrying the lock in the background.
+    """
+    global _scheduler, _start_checked, _collector_enabled
+    if _start_checked:
+        return _scheduler
+    with _pool_lock:
+        if _start_checked:
+            return _scheduler
+        _start_checked = True
+    if not get_scheduler_config()['enabled']:
+        return None
+    _collector_enabled = True
+    scheduler = CollectorScheduler()
+    if get_state_store().try_acquire_leader('collector'):
+        _scheduler = scheduler.start()
+    else:
+        threading.Thread(target=_wait_for_leadership, args=(scheduler,), name='collector-leader', daemon=True).start()
+    return _scheduler
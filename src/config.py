@@ -1,6 +1,12 @@
 from flask import request, jsonify
 import mysql.connector
 import yaml
+from src.config_utils import resolve_cluster, cluster_node_key, get_cluster
+from src.metric_cache import cached_variables, invalidate_node
+from src.collector import submit_node_task
+from src.db_pool import pooled_connection
+from src.breaker import guarded_call, mysql_target, CircuitOpenError
+from src.timing import span
 
 def load_config():
     with open('config.yaml', 'r') as file:
@@ -10,100 +16,133 @@ def get_nodes_status():
     # This function is not used in config module, keeping as placeholder
     pass
 
+# Important MySQL configuration variables shown on the Configuration tab
+CONFIG_VARIABLES = [
+    # Galera specific
+    'wsrep_cluster_size', 'wsrep_cluster_status', 'wsrep_connected',
+    'wsrep_ready', 'wsrep_provider', 'wsrep_provider_options',
+    
+    # General MySQL
+    'version', 'version_comment', 'innodb_version',
+    'max_connections', 'max_user_connections', 'max_connect_errors',
+    'connect_timeout', 'wait_timeout', 'interactive_timeout',
+    
+    # Query cache
+    'query_cache_type', 'query_cache_size', 'query_cache_limit',
+    
+    # Buffers and memory
+    'innodb_buffer_pool_size', 'innodb_buffer_pool_instances',
+    'innodb_log_buffer_size', 'innodb_log_file_size',
+    'key_buffer_size', 'max_allowed_packet',
+    
+    # Slow query log
+    'slow_query_log', 'long_query_time', 'slow_query_log_file', 'log_output',
+    
+    # Replication
+    'server_id', 'log_bin', 'binlog_format',
+    'sync_binlog', 'expire_logs_days',
+    
+    # InnoDB settings
+    'innodb_flush_log_at_trx_commit', 'innodb_flush_method',
+    'innodb_file_per_table', 'innodb_io_capacity',
+    'innodb_read_io_threads', 'innodb_write_io_threads'
+]
+
+# Status variables shown next to them
+CONFIG_STATUS_VARIABLES = [
+    'wsrep_local_recv_queue', 'wsrep_local_send_queue',
+    'wsrep_flow_control_paused', 'wsrep_flow_control_paused_ns',
+    'wsrep_flow_control_sent', 'wsrep_flow_control_recv',
+    'wsrep_cert_deps_distance', 'wsrep_apply_oooe',
+    'wsrep_apply_oool', 'wsrep_commit_oooe', 'wsrep_commit_oool',
+    'uptime', 'threads_connected', 'threads_running',
+    'max_used_connections', 'queries', 'questions',
+    'slow_queries', 'opened_tables', 'innodb_buffer_pool_read_requests',
+    'innodb_buffer_pool_reads', 'innodb_row_lock_current_waits',
+    'innodb_row_lock_time', 'innodb_row_lock_waits',
+    'wsrep_cluster_conf_id'
+]
+
+# Enough status to tell whether cached variables are still valid
+CACHE_MARKER_STATUS = ['uptime', 'wsrep_cluster_conf_id']
+
+def _query_node_config(cluster, host, status_vars):
+    with pooled_connection(cluster, host) as conn:
+        cursor = conn.cursor(dictionary=True)
+        try:
+            placeholders = ', '.join(['%s'] * len(status_vars))
+            cursor.execute(f"SHOW GLOBAL STATUS WHERE Variable_name IN ({placeholders})", status_vars)
+            status_data = {row['Variable_name']: row['Value'] for row in cursor.fetchall()}
+            
+            def fetch_variables():
+                placeholders = ', '.join(['%s'] * len(CONFIG_VARIABLES))
+                cursor.execute(f"SHOW VARIABLES WHERE Variable_name IN ({placeholders})", CONFIG_VARIABLES)
+                return {row['Variable_name']: row['Value'] for row in cursor.fetchall()}
+            
+            # Variables are near-static: served from the metric cache until they
+            # expire or Uptime/wsrep_cluster_conf_id show a restart or reconfiguration
+            config_data = cached_variables(cluster_node_key(cluster['name'], host), status_data, fetch_variables)
+            return config_data, status_data
+        finally:
+            cursor.close()
+
+def read_node_config(cluster, host, status_vars=CONFIG_STATUS_VARIABLES):
+    """Return (variables, status) for one node; variables come from the metric cache when valid
+
+    Runs over a pooled connection behind the node's circuit breaker, so an
+    unreachable node fails fast with CircuitOpenError instead of holding a
+    worker for a connect timeout on every check.
+    """
+    node = next((node for node in cluster['nodes'] if node['host'] == host), {'host': host})
+    return guarded_call(mysql_target(node), _query_node_config, cluster, host, status_vars)
+
 def api_get_config():
     try:
         host = request.args.get('host')
+        cluster = resolve_cluster(request.args.get('cluster'), host)
+        if cluster is None:
+            return jsonify({'ok': False, 'error': 'Unknown cluster'}), 404
         if not host:
-            config = load_config()
-            nodes = config.get('nodes', [])
+            nodes = cluster['nodes']
             if not nodes:
                 return jsonify({'ok': False, 'error': 'No nodes available'}), 404
             host = nodes[0]['host']
         
-        # Connect to database
-        config = load_config()
-        db_config = {
-            'host': host,
-            'user': config.get('mysql', {}).get('user', 'root'),
-            'password': config.get('mysql', {}).get('password', ''),
-            'database': 'mysql'
-        }
-        
-        conn = mysql.connector.connect(**db_config)
-        cursor = conn.cursor(dictionary=True)
-        
         try:
-            # Get important MySQL configuration variables
-            variables = [
-                # Galera specific
-                'wsrep_cluster_size', 'wsrep_cluster_status', 'wsrep_connected',
-                'wsrep_ready', 'wsrep_provider', 'wsrep_provider_options',
-                
-                # General MySQL
-                'version', 'version_comment', 'innodb_version',
-                'max_connections', 'max_user_connections', 'max_connect_errors',
-                'connect_timeout', 'wait_timeout', 'interactive_timeout',
-                
-                # Query cache
-                'query_cache_type', 'query_cache_size', 'query_cache_limit',
-                
-                # Buffers and memory
-                'innodb_buffer_pool_size', 'innodb_buffer_pool_instances',
-                'innodb_log_buffer_size', 'innodb_log_file_size',
-                'key_buffer_size', 'max_allowed_packet',
-                
-                # Slow query log
-                'slow_query_log', 'long_query_time', 'slow_query_log_file', 'log_output',
-                
-                # Replication
-                'server_id', 'log_bin', 'binlog_format',
-                'sync_binlog', 'expire_logs_days',
-                
-                # InnoDB settings
-                'innodb_flush_log_at_trx_commit', 'innodb_flush_method',
-                'innodb_file_per_table', 'innodb_io_capacity',
-                'innodb_read_io_threads', 'innodb_write_io_threads'
-            ]
-            
-            # Build query to get variables
-            placeholders = ', '.join(['%s'] * len(variables))
-            cursor.execute(f"SHOW VARIABLES WHERE Variable_name IN ({placeholders})", variables)
-            config_data = {row['Variable_name']: row['Value'] for row in cursor.fetchall()}
-            
-            # Get some status variables
-            status_vars = [
-                'wsrep_local_recv_queue', 'wsrep_local_send_queue',
-                'wsrep_flow_control_paused', 'wsrep_flow_control_paused_ns',
-                'wsrep_flow_control_sent', 'wsrep_flow_control_recv',
-                'wsrep_cert_deps_distance', 'wsrep_apply_oooe',
-                'wsrep_apply_oool', 'wsrep_commit_oooe', 'wsrep_commit_oool',
-                'uptime', 'threads_connected', 'threads_running',
-                'max_used_connections', 'queries', 'questions',
-                'slow_queries', 'opened_tables', 'innodb_buffer_pool_read_requests',
-                'innodb_buffer_pool_reads', 'innodb_row_lock_current_waits',
-                'innodb_row_lock_time', 'innodb_row_lock_waits'
-            ]
-            
-            placeholders = ', '.join(['%s'] * len(status_vars))
-            cursor.execute(f"SHOW GLOBAL STATUS WHERE Variable_name IN ({placeholders})", status_vars)
-            status_data = {row['Variable_name']: row['Value'] for row in cursor.fetchall()}
-            
-            return jsonify({
-                'ok': True,
-                'host': host,
-                'config': config_data,
-                'status': status_data
-            })
-            
-        except mysql.connector.Error as err:
+            config_data, status_data = read_node_config(cluster, host)
+        except (mysql.connector.Error, CircuitOpenError) as err:
             return jsonify({'ok': False, 'error': str(err)}), 500
-        finally:
-            cursor.close()
-            conn.close()
+        
+        return jsonify({
+            'ok': True,
+            'host': host,
+            'config': config_data,
+            'status': status_data
+        })
             
     except Exception as e:
         return jsonify({'ok': False, 'error': str(e)}), 500
 
+# Variables that can be changed dynamically
+ALLOWED_VARIABLES = [
+    'slow_query_log', 'long_query_time', 'max_connections',
+    'max_user_connections', 'connect_timeout', 'wait_timeout',
+    'interactive_timeout', 'query_cache_type', 'query_cache_size',
+    'query_cache_limit', 'max_allowed_packet', 'expire_logs_days'
+]
+
+NUMERIC_VARIABLES = [
+    'long_query_time', 'max_connections', 'max_user_connections',
+    'connect_timeout', 'wait_timeout', 'interactive_timeout',
+    'query_cache_size', 'query_cache_limit', 'max_allowed_packet', 'expire_logs_days'
+]
+
+def coerce_value(variable, value):
+    """Convert a submitted value to the type SET GLOBAL expects for the variable"""
+    if variable in NUMERIC_VARIABLES:
+        return float(value) if variable == 'long_query_time' else int(value)
+    return value
+
 def api_update_config():
     try:
         data = request.get_json()
@@ -114,19 +153,13 @@ def api_update_config():
         if not host or not variable or value is None:
             return jsonify({'ok': False, 'error': 'Host, variable and value parameters are required'}), 400
         
-        # List of variables that can be changed dynamically
-        allowed_variables = [
-            'slow_query_log', 'long_query_time', 'max_connections',
-            'max_user_connections', 'connect_timeout', 'wait_timeout',
-            'interactive_timeout', 'query_cache_type', 'query_cache_size',
-            'query_cache_limit', 'max_allowed_packet', 'expire_logs_days'
-        ]
-        
-        if variable not in allowed_variables:
+        if variable not in ALLOWED_VARIABLES:
             return jsonify({'ok': False, 'error': f'Variable {variable} cannot be modified dynamically or is not allowed'}), 400
         
         # Connect to database
-        config = load_config()
+        config = resolve_cluster(data.get('cluster'), host)
+        if config is None:
+            return jsonify({'ok': False, 'error': 'Unknown cluster'}), 404
         db_config = {
             'host': host,
             'user': config.get('mysql', {}).get('user', 'root'),
@@ -143,16 +176,10 @@ def api_update_config():
             old_value = cursor.fetchone()[0]
             
             # Update variable - handle numeric values properly
-            if variable in ['long_query_time', 'max_connections', 'max_user_connections', 
-                          'connect_timeout', 'wait_timeout', 'interactive_timeout', 
-                          'query_cache_size', 'query_cache_limit', 'max_allowed_packet', 'expire_logs_days']:
-                # Convert to appropriate numeric type
-                if variable == 'long_query_time':
-                    value = float(value)
-                else:
-                    value = int(value)
+            value = coerce_value(variable, value)
             
             cursor.execute(f"SET GLOBAL {variable} = %s", (value,))
+            invalidate_node(cluster_node_key(config['name'], host))
             
             # Confirm change
             cursor.execute(f"SELECT @@{variable}")
@@ -173,4 +200,143 @@ def api_update_config():
             conn.close()
             
     except Exception as e:
-        return jsonify({'ok': False, 'error': str(e)}), 500
\ No newline at end of file
+        return jsonify({'ok': False, 'error': str(e)}), 500
+
+def _normalized(value):
+    """Comparable form of a variable value (1/ON/TRUE and 1.0/1 compare equal)"""
+    text = str(value).strip().upper()
+    if text in ('ON', 'TRUE', 'YES'):
+        text = '1'
+    elif text in ('OFF', 'FALSE', 'NO'):
+        text = '0'
+    try:
+        return repr(float(text))
+    except ValueError:
+        return text
+
+def _is_numeric(value):
+    try:
+        float(_normalized(value))
+        return True
+    except ValueError:
+        return False
+
+def _read_global(cluster, host, variable):
+    with pooled_connection(cluster, host) as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute(f"SELECT @@GLOBAL.{variable}")
+            return cursor.fetchone()[0]
+        finally:
+            cursor.close()
+
+def _set_global(cluster, host, variable, value):
+    """SET GLOBAL on one node and read the value back"""
+    with pooled_connection(cluster, host) as conn:
+        cursor = conn.cursor()
+        try:
+            with span('config.set_global', host):
+                cursor.execute(f"SET GLOBAL {variable} = %s", (value,))
+                invalidate_node(cluster_node_key(cluster['name'], host))
+                cursor.execute(f"SELECT @@GLOBAL.{variable}")
+                return cursor.fetchone()[0]
+        finally:
+            cursor.close()
+
+def _run_on_nodes(hosts, fn, *args):
+    """Run fn(host, *args) on every host in parallel; returns {host: (result, error)}"""
+    futures = {host: submit_node_task(fn, host, *args) for host in hosts}
+    results = {}
+    for host, future in futures.items():
+        try:
+            results[host] = (future.result(), None)
+        except Exception as e:
+            results[host] = (None, str(e))
+    return results
+
+def update_cluster_variable(cluster, variable, value):
+    """Set a variable on every node of a cluster, rolling back everywhere if any node fails
+
+    Returns (applied, per-host results); each result's new_value is what the
+    server stored. Nothing is changed when an old value cannot be read; after
+    SET GLOBAL, nodes that failed or ended up with different values cause
+    every changed node to be restored. Numbers MySQL rounds or clamps (sizes
+    to a block multiple, for instance) are accepted as long as every node
+    stored the same value; a non-numeric value must read back as requested.
+    """
+    hosts = [node['host'] for node in cluster['nodes']]
+    results = {host: {'old_value': None, 'new_value': None, 'status': 'skipped', 'error': None} for host in hosts}
+
+    old_values = _run_on_nodes(hosts, lambda host: _read_global(cluster, host, variable))
+    for host, (old_value, error) in old_values.items():
+        results[host]['old_value'] = old_value
+        if error:
+            results[host].update(status='failed', error=f'Could not read current value: {error}')
+    if any(error for _, error in old_values.values()):
+        return False, results
+
+    applied = _run_on_nodes(hosts, lambda host: _set_global(cluster, host, variable, value))
+    changed = []
+    for host, (new_value, error) in applied.items():
+        if error:
+            results[host].update(status='failed', error=error)
+        else:
+            results[host].update(status='applied', new_value=new_value)
+            changed.append(host)
+    consistent = len({_normalized(results[host]['new_value']) for host in changed}) <= 1
+    mismatched = [] if _is_numeric(value) else [
+        host for host in changed if _normalized(results[host]['new_value']) != _normalized(value)
+    ]
+    if len(changed) == len(hosts) and consistent and not mismatched:
+        return True, results
+
+    if not consistent:
+        for host in changed:
+            results[host]['error'] = 'Nodes ended up with different values'
+    for host in mismatched:
+        results[host]['error'] = f"Node reports {results[host]['new_value']} instead of the requested {value}"
+    restored = _run_on_nodes(changed, lambda host: _set_global(cluster, host, variable, old_values[host][0]))
+    for host, (restored_value, error) in restored.items():
+        if error:
+            results[host].update(status='rollback_failed', error=f'Rollback failed: {error}')
+        else:
+            results[host].update(status='rolled_back', new_value=restored_value)
+    return False, results
+
+def api_update_cluster_config():
+    try:
+        data = request.get_json() or {}
+        variable = data.get('variable')
+        value = data.get('value')
+        
+        if not variable or value is None:
+            return jsonify({'ok': False, 'error': 'Variable and value parameters are required'}), 400
+        if variable not in ALLOWED_VARIABLES:
+            return jsonify({'ok': False, 'error': f'Variable {variable} cannot be modified dynamically or is not allowed'}), 400
+        
+        cluster = get_cluster(data.get('cluster'))
+        if cluster is None:
+            return jsonify({'ok': False, 'error': 'Unknown cluster'}), 404
+        if not cluster['nodes']:
+            return jsonify({'ok': False, 'error': 'No nodes available'}), 404
+        
+        try:
+            value = coerce_value(variable, value)
+        except (TypeError, ValueError):
+            return jsonify({'ok': False, 'error': f'Invalid value for {variable}: {value}'}), 400
+        
+        applied, results = update_cluster_variable(cluster, variable, value)
+        body = {
+            'ok': applied,
+            'cluster': cluster['name'],
+            'variable': variable,
+            'value': value,
+            'results': results
+        }
+        if not applied:
+            body['error'] = f'{variable} was not changed on every node; changed nodes were rolled back'
+            return jsonify(body), 500
+        body['stored_value'] = next(iter(results.values()))['new_value']
+        return jsonify(body)
+    except Exception as e:
+        return jsonify({'ok': False, 'error': str(e)}), 500
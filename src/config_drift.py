@@ -0,0 +1,182 @@
+"""
+Cluster-wide configuration drift detection.
+
+Reads the Configuration tab's variable set from every node of a cluster
+concurrently (over the collector's node pool) and reports only what differs.
+Variables come from the metric cache's static tier, so a check costs one
+small status query per node until a node restarts, the membership changes
+or the cache expires. wsrep_provider_options is compared option by option.
+A background thread re-checks every cluster periodically and alerts when a
+variable starts to differ.
+"""
+
+import fnmatch
+import threading
+import time
+from datetime import datetime
+from flask import jsonify, request
+from src.config import read_node_config, CACHE_MARKER_STATUS
+from src.config_utils import load_config, get_clusters, get_cluster, get_alert_config, DEFAULT_CLUSTER
+from src.alert_history import record_alert_transitions, CLUSTER_HOST
+from src.collector import submit_node_task, LEADER_RETRY_SECONDS
+from src.state import get_state_store
+from src.telegram import send_telegram_message, should_send_alert
+from src.timing import span
+from src.utils import parse_wsrep_provider_options
+
+# Per-node by nature: identities, addresses and paths
+DEFAULT_DRIFT_IGNORE = [
+    'server_id',
+    'slow_query_log_file',
+    'wsrep_provider_options:base_host',
+    'wsrep_provider_options:gmcast.listen_addr',
+    'wsrep_provider_options:ist.recv_addr',
+    'wsrep_provider_options:ist.recv_bind',
+]
+
+_monitor = None
+_monitor_lock = threading.Lock()
+
+
+def get_drift_config():
+    """Get configuration drift detection settings with defaults"""
+    cfg = (load_config() or {}).get('config_drift', {}) or {}
+    return {
+        'enabled': cfg.get('enabled', True),
+        'interval_seconds': float(cfg.get('interval_seconds', 300) or 0),
+        'ignore': DEFAULT_DRIFT_IGNORE + list(cfg.get('ignore') or []),
+    }
+
+
+def flatten_variables(variables):
+    """Expand wsrep_provider_options into one entry per option"""
+    flat = {}
+    for name, value in variables.items():
+        if name == 'wsrep_provider_options':
+            for option, option_value in parse_wsrep_provider_options(value).items():
+                flat[f'wsrep_provider_options:{option}'] = option_value
+        else:
+            flat[name] = value
+    return flat
+
+
+def diff_variables(per_host, ignore=()):
+    """{variable: {host: value}} for variables whose values (or presence) differ across hosts"""
+    names = set()
+    for variables in per_host.values():
+        names.update(variables)
+    diff = {}
+    for name in sorted(names):
+        if any(fnmatch.fnmatchcase(name, pattern) for pattern in ignore):
+            continue
+        values = {host: variables.get(name) for host, variables in per_host.items()}
+        if len(set(values.values())) > 1:
+            diff[name] = values
+    return diff
+
+
+def new_drift(previous, diff):
+    """Variables that differ now but did not, or differed differently, on hosts seen both times"""
+    new = {}
+    for name, values in diff.items():
+        before = previous.get(name)
+        if before is None or any(host in before and before[host] != value for host, value in values.items()):
+            new[name] = values
+    return new
+
+
+def config_diff(cluster):
+    """Fetch every node's variables concurrently and return what differs"""
+    cfg = get_drift_config()
+    with span('config.diff', cluster['name']):
+        futures = {node['host']: submit_node_task(read_node_config, cluster, node['host'], CACHE_MARKER_STATUS)
+                   for node in cluster['nodes']}
+        per_host, errors = {}, {}
+        for host, future in futures.items():
+            try:
+                variables, _ = future.result()
+                per_host[host] = flatten_variables(variables)
+            except Exception as e:
+                errors[host] = str(e)
+    return {
+        'cluster': cluster['name'],
+        'hosts': list(per_host),
+        'errors': errors,
+        'diff': diff_variables(per_host, cfg['ignore']) if len(per_host) > 1 else {},
+        'checked_at': datetime.now().isoformat(),
+    }
+
+
+def check_drift(cluster):
+    """Run a diff, remember it, and alert on variables that started to differ since the last check"""
+    result = config_diff(cluster)
+    if result['errors'] and not result['hosts']:
+        return result
+    previous = get_state_store().get('config_drift', cluster['name'])
+    # The first check only records a baseline
+    new = new_drift(previous, result['diff']) if previous is not None else {}
+    get_state_store().set('config_drift', cluster['name'], result['diff'])
+    result['new'] = sorted(new)
+    alert_cfg = get_alert_config()
+    if not (alert_cfg['alerts'].get('enabled') and alert_cfg['alerts'].get('config_drift')):
+        return result
+    notified = set()
+    if new:
+        label = '' if cluster['name'] == DEFAULT_CLUSTER else f" in cluster <code>{cluster['name']}</code>"
+        lines = [f"{name}: " + ', '.join(f"{host}={value}" for host, value in values.items()) for name, values in new.items()]
+        cooldown = int(alert_cfg['alerts'].get('cooldown_seconds', 300) or 300)
+        if should_send_alert(cluster['name'], 'config_drift|' + '|'.join(sorted(new)), cooldown):
+            notified.add('config_drift')
+            send_telegram_message(alert_cfg['telegram'], f"<b>Galera Alert</b>\nConfiguration drift{label}:\n" + '\n'.join(lines[:20]))
+    # Drift is active while any variable differs, whichever ones started it
+    triggered = {'config_drift': 'Variables differ: ' + ', '.join(sorted(result['diff']))} if result['diff'] else {}
+    record_alert_transitions(cluster['name'], CLUSTER_HOST, triggered, notified)
+    return result
+
+
+def _monitor_loop():
+    # Only one worker process checks; the others wait to take over
+    store = get_state_store()
+    while not store.try_acquire_leader('config_drift'):
+        time.sleep(LEADER_RETRY_SECONDS)
+    while True:
+        cfg = get_drift_config()
+        interval = cfg['interval_seconds']
+        if cfg['enabled'] and interval > 0:
+            for cluster in get_clusters():
+                if len(cluster['nodes']) < 2:
+                    continue
+                try:
+                    check_drift(cluster)
+                except Exception as e:
+                    print(f"Config drift check error for cluster {cluster['name']}: {e}")
+        time.sleep(interval if interval > 0 else 60)
+
+
+def start_drift_monitor():
+    """Start the periodic drift check once per process; it runs where the config_drift lock is held"""
+    global _monitor
+    with _monitor_lock:
+        if _monitor is not None:
+            return _monitor or None
+        cfg = get_drift_config()
+        if not cfg['enabled'] or cfg['interval_seconds'] <= 0:
+            _monitor = False
+            return None
+        _monitor = threading.Thread(target=_monitor_loop, name='config-drift', daemon=True)
+        _monitor.start()
+        return _monitor
+
+
+def api_config_diff():
+    """API endpoint returning the variables that differ across a cluster's nodes"""
+    try:
+        cluster = get_cluster(request.args.get('cluster'))
+        if cluster is None:
+            return jsonify({'ok': False, 'error': 'Unknown cluster'}), 404
+        if not cluster['nodes']:
+            return jsonify({'ok': False, 'error': 'No nodes available'}), 404
+        result = config_diff(cluster)
+        return jsonify({'ok': True, **result})
+    except Exception as e:
+        return jsonify({'ok': False, 'error': str(e)}), 500
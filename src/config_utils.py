@@ -1,9 +1,10 @@
 import yaml
+from src.timing import span
 
 def load_config():
     """Load configuration from config.yaml file"""
     try:
-        with open('config.yaml', 'r') as file:
+        with span('config.load'), open('config.yaml', 'r') as file:
             return yaml.safe_load(file)
     except FileNotFoundError:
         print("Error: config.yaml file not found. Please copy config-example.yaml to config.yaml and configure it.")
@@ -34,11 +35,22 @@ def get_alert_config():
         },
         'flow_control': {
             'active': True,
-            'paused_threshold': None
+            'paused_threshold': None,
+            'window': '1m'  # 10s | 1m | 5m, for paused_threshold
         },
         'haproxy': {
             'connections_critical': None
         },
+        'replication': {
+            'lag_threshold': None  # seqnos behind the cluster head
+        },
+        'anomaly': {
+            'enabled': False  # alert on QPS/WPS deviations from the rolling baselines
+        },
+        'gcache': {
+            'ist_window_min_minutes': None  # warn when gcache covers less downtime than this
+        },
+        'config_drift': True,  # alert when a variable starts to differ across nodes
         'node': {
             'offline': True,  # when node not synced/primary
         }
@@ -57,12 +69,76 @@ def get_alert_config():
         'telegram': telegram_cfg
     }
 
-def get_restart_command():
+def get_restart_command(cluster=None):
     """Get HAProxy restart command from config or default"""
-    cfg = load_config()
-    # Allow override via config.yaml → haproxy.restart_command
+    cfg = cluster or load_config()
+    # Allow override via config.yaml → haproxy.restart_command (or the cluster's haproxy block)
     cmd = (cfg.get('haproxy', {}) or {}).get('restart_command')
     if cmd:
         return cmd
     # sensible default for most Linux distros
-    return 'systemctl restart haproxy'
\ No newline at end of file
+    return 'systemctl restart haproxy'
+
+DEFAULT_CLUSTER = 'default'
+
+def get_clusters(config=None):
+    """Return the configured clusters
+
+    Each cluster has the same shape as a single-cluster config.yaml (nodes,
+    haproxy, mysql) plus a name and a polling interval. Configs without a
+    `clusters:` section are treated as one cluster named 'default'.
+    """
+    if config is None:
+        config = load_config()
+    config = config or {}
+    collector_cfg = config.get('collector', {}) or {}
+    default_interval = float(collector_cfg.get('interval_seconds', 10) or 10)
+    entries = config.get('clusters') or [{
+        'name': DEFAULT_CLUSTER,
+        'nodes': config.get('nodes', []),
+        'haproxy': config.get('haproxy', {}),
+    }]
+    clusters = []
+    for i, entry in enumerate(entries):
+        cluster = dict(entry)
+        cluster['name'] = str(entry.get('name') or f'cluster{i+1}')
+        cluster['nodes'] = entry.get('nodes', []) or []
+        cluster['haproxy'] = entry.get('haproxy', {}) or {}
+        # Clusters without their own credentials fall back to the top-level mysql block
+        cluster['mysql'] = entry.get('mysql') or config.get('mysql', {}) or {}
+        cluster['interval_seconds'] = float(entry.get('interval_seconds', default_interval) or default_interval)
+        clusters.append(cluster)
+    return clusters
+
+def get_cluster(name=None, config=None):
+    """Return the named cluster (the first one when name is empty), or None if unknown"""
+    clusters = get_clusters(config)
+    if not name:
+        return clusters[0] if clusters else None
+    for cluster in clusters:
+        if cluster['name'] == name:
+            return cluster
+    return None
+
+def find_node(host, cluster_name=None, config=None):
+    """Return (cluster, node_config) for a host, searching one cluster or all of them"""
+    clusters = get_clusters(config)
+    if cluster_name:
+        clusters = [c for c in clusters if c['name'] == cluster_name]
+    for cluster in clusters:
+        for node in cluster['nodes']:
+            if node.get('host') == host:
+                return cluster, node
+    return None, None
+
+def cluster_node_key(cluster_name, host):
+    """Key for per-node state, unique across clusters that reuse host names"""
+    return f"{cluster_name or DEFAULT_CLUSTER}/{host}"
+
+def resolve_cluster(cluster_name=None, host=None):
+    """Cluster a request refers to: the one holding host if it is configured, else the named/first cluster"""
+    if host:
+        cluster, _ = find_node(host, cluster_name)
+        if cluster is not None:
+            return cluster
+    return get_cluster(cluster_name)
@@ -0,0 +1,96 @@
+"""
+Small per-node MySQL connection pool.
+
+Connections are opened with mysql.connector.connect (so the benchmark
+stand-ins and connection settings apply as everywhere else) and parked per
+(host, port, user) after use. A parked connection is reused if it is younger
+than idle_seconds and still connected; a connection that saw an error is
+closed instead of returned.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+import mysql.connector
+from src.config_utils import load_config
+from src.timing import span
+
+_idle = {}
+_idle_lock = threading.Lock()
+
+
+def get_pool_config():
+    """Get connection pool configuration with defaults"""
+    cfg = ((load_config() or {}).get('mysql', {}) or {})
+    return {
+        'pool_size': int(cfg.get('pool_size', 4) or 0),
+        'idle_seconds': float(cfg.get('pool_idle_seconds', 60) or 0),
+    }
+
+
+def node_db_config(cluster, host, port=None):
+    """Connection settings for a node of a cluster (the cluster's `mysql` admin credentials)
+
+    port overrides the node's configured port, e.g. for an HAProxy frontend.
+    """
+    node = next((node for node in cluster['nodes'] if node['host'] == host), {})
+    mysql_cfg = cluster.get('mysql', {}) or {}
+    return {
+        'host': host,
+        'port': port or node.get('port', 3306),
+        'user': mysql_cfg.get('user', 'root'),
+        'password': mysql_cfg.get('password', ''),
+        'connect_timeout': 5,
+    }
+
+
+def _checkout(key, db_config):
+    now = time.monotonic()
+    cfg = get_pool_config()
+    while True:
+        with _idle_lock:
+            parked = _idle.get(key)
+            entry = parked.pop() if parked else None
+        if entry is None:
+            break
+        conn, parked_at = entry
+        if now - parked_at < cfg['idle_seconds']:
+            try:
+                if conn.is_connected():
+                    return conn
+            except Exception:
+                pass
+        try:
+            conn.close()
+        except Exception:
+            pass
+    with span('mysql.connect', db_config['host']):
+        return mysql.connector.connect(autocommit=True, **db_config)
+
+
+def _checkin(key, conn):
+    cfg = get_pool_config()
+    with _idle_lock:
+        parked = _idle.setdefault(key, [])
+        if len(parked) < cfg['pool_size']:
+            parked.append((conn, time.monotonic()))
+            return
+    conn.close()
+
+
+@contextmanager
+def pooled_connection(cluster, host, port=None):
+    """Borrow a connection to a cluster node, returning it to the pool afterwards"""
+    db_config = node_db_config(cluster, host, port)
+    key = (db_config['host'], db_config['port'], db_config['user'])
+    conn = _checkout(key, db_config)
+    try:
+        yield conn
+    except Exception:
+        try:
+            conn.close()
+        except Exception:
+            pass
+        raise
+    else:
+        _checkin(key, conn)
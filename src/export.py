@@ -0,0 +1,211 @@
+"""
+Streaming bulk export of metric history and the latest snapshot.
+
+/api/export walks the requested (host, metric) series one after another in
+the history table's primary-key order and encodes each batch as it arrives,
+so a year of samples for many nodes leaves the worker in small chunks
+instead of being built up in memory. CSV and NDJSON are gzip'd on the fly
+when the client accepts it (the after_request compressor leaves streamed
+bodies alone); Parquet is written one row group per batch when pyarrow is
+installed.
+"""
+
+import csv
+import io
+import json
+import time
+import zlib
+from datetime import datetime, timezone
+from flask import Response, jsonify, request, stream_with_context
+from src.config_utils import get_cluster
+from src.history import HISTORY_METRICS, PROBE_METRICS, default_hosts, get_history_config, iter_history
+from src.probes import FRONTEND_LABEL
+from src.responses import get_compression_config
+from src.state import get_state_store
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+EXPORT_FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+}
+CSV_HEADER = ['ts', 'time', 'cluster', 'host', 'metric', 'value']
+BATCH_SIZE = 5000
+
+
+def _iso(ts_ms):
+    return datetime.fromtimestamp(ts_ms / 1000.0, tz=timezone.utc).isoformat(timespec='milliseconds')
+
+
+def snapshot_batches(cluster_name, hosts, metrics):
+    """The latest stored snapshot as (host, metric, [(ts, value)]) batches of its numeric status fields"""
+    snapshot = get_state_store().get('snapshots', cluster_name) or {}
+    for node in snapshot.get('nodes', []):
+        if node['host'] not in hosts or node.get('error') or not node.get('status'):
+            continue
+        try:
+            ts = int(datetime.fromisoformat(node['timestamp']).timestamp() * 1000)
+        except (KeyError, TypeError, ValueError):
+            continue
+        for metric, value in sorted(node['status'].items()):
+            if metrics and metric not in metrics:
+                continue
+            try:
+                yield node['host'], metric, [(ts, float(value))]
+            except (TypeError, ValueError):
+                continue
+
+
+def encode_csv(cluster_name, batches):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    writer.writerow(CSV_HEADER)
+    for host, metric, rows in batches:
+        writer.writerows((ts, _iso(ts), cluster_name, host, metric, value) for ts, value in rows)
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    tail = buffer.getvalue()
+    if tail:
+        yield tail.encode('utf-8')
+
+
+def encode_ndjson(cluster_name, batches):
+    dumps = orjson.dumps if orjson is not None else (lambda obj: json.dumps(obj, separators=(',', ':')).encode('utf-8'))
+    for host, metric, rows in batches:
+        yield b''.join(dumps({'ts': ts, 'cluster': cluster_name, 'host': host, 'metric': metric, 'value': value}) + b'\n'
+                       for ts, value in rows)
+
+
+class _ChunkSink:
+    """Write-only file object collecting what ParquetWriter writes, with a running tell()"""
+
+    closed = False
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def write(self, data):
+        data = bytes(data)
+        self.chunks.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def writable(self):
+        return True
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def encode_parquet(cluster_name, batches):
+    schema = pyarrow.schema([
+        ('ts', pyarrow.timestamp('ms', tz='UTC')),
+        ('cluster', pyarrow.string()),
+        ('host', pyarrow.string()),
+        ('metric', pyarrow.string()),
+        ('value', pyarrow.float64()),
+    ])
+    sink = _ChunkSink()
+    writer = pyarrow.parquet.ParquetWriter(pyarrow.PythonFile(sink, mode='w'), schema, compression='zstd')
+    try:
+        for host, metric, rows in batches:
+            ts, values = zip(*rows)
+            n = len(rows)
+            writer.write_table(pyarrow.table({
+                'ts': pyarrow.array(ts, type=pyarrow.timestamp('ms', tz='UTC')),
+                'cluster': pyarrow.array([cluster_name] * n, type=pyarrow.string()),
+                'host': pyarrow.array([host] * n, type=pyarrow.string()),
+                'metric': pyarrow.array([metric] * n, type=pyarrow.string()),
+                'value': pyarrow.array(values, type=pyarrow.float64()),
+            }, schema=schema))
+            data = sink.drain()
+            if data:
+                yield data
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+def gzip_stream(chunks, level):
+    """Gzip a byte stream chunk by chunk"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def api_export():
+    """API endpoint streaming stored metrics (or the latest snapshot) as CSV, NDJSON or Parquet"""
+    try:
+        cluster = get_cluster(request.args.get('cluster'))
+        if cluster is None:
+            return jsonify({'ok': False, 'error': 'Unknown cluster'}), 404
+        fmt = request.args.get('format', 'csv').lower()
+        if fmt not in EXPORT_FORMATS:
+            return jsonify({'ok': False, 'error': f'Unknown format {fmt}'}), 400
+        if fmt == 'parquet' and pyarrow is None:
+            return jsonify({'ok': False, 'error': 'Parquet export needs pyarrow (pip install pyarrow)'}), 400
+        source = request.args.get('source', 'history')
+        if source not in ('history', 'snapshot'):
+            return jsonify({'ok': False, 'error': 'source must be history or snapshot'}), 400
+        metrics = request.args.get('metrics') or request.args.get('metric')
+        metrics = [m for m in metrics.split(',') if m] if metrics else []
+        hosts = request.args.get('hosts') or request.args.get('host')
+        hosts = [h for h in hosts.split(',') if h] if hosts else default_hosts(cluster, metrics or HISTORY_METRICS)
+
+        if source == 'history':
+            if not get_history_config()['enabled']:
+                return jsonify({'ok': False, 'error': 'History is disabled'}), 404
+            unknown = [m for m in metrics if m not in HISTORY_METRICS]
+            if unknown:
+                return jsonify({'ok': False, 'error': f"Unknown metric {', '.join(unknown)}"}), 400
+            now_ms = int(time.time() * 1000)
+            end_ms = request.args.get('to', default=now_ms, type=int)
+            window = request.args.get('window', default=86400, type=int)
+            start_ms = request.args.get('from', default=end_ms - window * 1000, type=int)
+            # The HAProxy frontend only has probe series
+            series = [(host, metric) for host in hosts for metric in (metrics or HISTORY_METRICS)
+                      if host != FRONTEND_LABEL or metric in PROBE_METRICS]
+            batches = iter_history(cluster['name'], series, start_ms, end_ms, BATCH_SIZE)
+            stamp = f"{start_ms}-{end_ms}"
+        else:
+            batches = snapshot_batches(cluster['name'], set(hosts), set(metrics))
+            stamp = 'snapshot'
+
+        encoder = {'csv': encode_csv, 'ndjson': encode_ndjson, 'parquet': encode_parquet}[fmt]
+        chunks = encoder(cluster['name'], batches)
+        mimetype, extension = EXPORT_FORMATS[fmt]
+        headers = {'Content-Disposition': f'attachment; filename="galera-{cluster["name"]}-{stamp}.{extension}"'}
+        compression = get_compression_config()
+        if fmt != 'parquet' and compression['enabled'] and 'gzip' in request.headers.get('Accept-Encoding', '').lower():
+            chunks = gzip_stream(chunks, compression['gzip_level'])
+            headers['Content-Encoding'] = 'gzip'
+            headers['Vary'] = 'Accept-Encoding'
+        return Response(stream_with_context(chunks), mimetype=mimetype, headers=headers)
+    except Exception as e:
+        return jsonify({'ok': False, 'error': str(e)}), 500
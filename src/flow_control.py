@@ -0,0 +1,108 @@
+"""
+Windowed flow-control analytics.
+
+wsrep_flow_control_paused is averaged since the last FLUSH STATUS or restart,
+so it flattens out the longer a node is up. Instead every poll appends one
+(time, paused_ns, sent, recv) reading per node to a short ring kept in the
+state store. Each window compares the newest reading with the last one at
+or before the window start, giving the share of time replication was paused
+and the FC messages sent/received per second over the last 10s, 1m and 5m.
+Readings older than the longest window are dropped as new ones arrive.
+"""
+
+import bisect
+from src.state import get_state_store
+
+# Window name -> seconds
+FC_WINDOWS = {'10s': 10, '1m': 60, '5m': 300}
+FC_COUNTERS = ('wsrep_flow_control_paused_ns', 'wsrep_flow_control_sent', 'wsrep_flow_control_recv')
+# Window the alerts and sender attribution look at by default
+DEFAULT_FC_WINDOW = '1m'
+
+
+def _counters(global_status):
+    try:
+        return [int(global_status[name]) for name in FC_COUNTERS]
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def window_rates(readings, seconds):
+    """Paused percent and FC sent/recv per second between the newest reading and `seconds` before it"""
+    if len(readings) < 2:
+        return None
+    now = readings[-1][0]
+    times = [reading[0] for reading in readings]
+    # Last reading at or before the window start, or the oldest one we have
+    index = max(bisect.bisect_right(times, now - seconds) - 1, 0)
+    start = readings[index]
+    elapsed = now - start[0]
+    if elapsed <= 0:
+        return None
+    paused_ns, sent, recv = (readings[-1][i] - start[i] for i in (1, 2, 3))
+    return {
+        'paused_pct': round(min(paused_ns / 1e9 / elapsed * 100.0, 100.0), 3),
+        'sent_per_sec': round(sent / elapsed, 3),
+        'recv_per_sec': round(recv / elapsed, 3),
+        'span_seconds': round(elapsed, 1),
+    }
+
+
+def update_fc_windows(node_key, global_status, now):
+    """Record one reading for a node and return flat fc_* window metrics for its status"""
+    counters = _counters(global_status)
+    if counters is None:
+        return {}
+    longest = max(FC_WINDOWS.values())
+
+    def append(readings):
+        readings = list(readings or [])
+        # Counters went backwards: restart or FLUSH STATUS, start over
+        if readings and any(c < p for c, p in zip(counters, readings[-1][1:])):
+            readings = []
+        readings.append([now] + counters)
+        # Keep one reading older than the longest window as its starting point
+        cutoff = bisect.bisect_right([reading[0] for reading in readings], now - longest) - 1
+        return readings[max(cutoff, 0):]
+
+    readings = get_state_store().update('fc_readings', node_key, append)
+    metrics = {}
+    for name, seconds in FC_WINDOWS.items():
+        rates = window_rates(readings, seconds)
+        if rates is None:
+            continue
+        metrics[f'fc_paused_pct_{name}'] = rates['paused_pct']
+        metrics[f'fc_sent_per_sec_{name}'] = rates['sent_per_sec']
+        metrics[f'fc_recv_per_sec_{name}'] = rates['recv_per_sec']
+    return metrics
+
+
+def flow_control_summary(nodes_status, window=DEFAULT_FC_WINDOW):
+    """Which nodes are sending FC (slowing the cluster down) and which are paused, over one window"""
+    senders = []
+    paused = {}
+    for node in nodes_status:
+        status = node.get('status') or {}
+        sent = status.get(f'fc_sent_per_sec_{window}')
+        if sent:
+            senders.append({'host': node['host'], 'sent_per_sec': sent})
+        pct = status.get(f'fc_paused_pct_{window}')
+        if pct is not None:
+            paused[node['host']] = pct
+    total = sum(sender['sent_per_sec'] for sender in senders)
+    for sender in senders:
+        sender['share'] = round(sender['sent_per_sec'] / total, 3)
+    senders.sort(key=lambda sender: sender['sent_per_sec'], reverse=True)
+    return {
+        'window': window,
+        'senders': senders,
+        'paused_pct': paused,
+        'max_paused_pct': max(paused.values()) if paused else None,
+    }
+
+
+def annotate_fc_senders(node_status, summary):
+    """Name the cluster's FC senders in a node's status so alerts can attribute throttling"""
+    status = node_status.get('status')
+    if status:
+        status['fc_senders'] = [sender['host'] for sender in summary['senders']]
@@ -0,0 +1,80 @@
+"""
+Gcache IST-window estimator.
+
+Every write-set a node replicates or receives goes through its gcache ring
+buffer (gcache.size). A node that leaves and comes back can rejoin through
+IST as long as the write-sets it missed are still in a donor's gcache, so
+gcache.size divided by the write-set byte rate is roughly how long a node can
+be down before it needs a full SST. The byte rate is an exponentially
+weighted average of wsrep_replicated_bytes + wsrep_received_bytes, kept per
+node in the state store and weighted by time, so one burst does not swing the
+window and a long quiet spell does not inflate it forever.
+"""
+
+import re
+from src.config_utils import load_config
+from src.state import get_state_store
+
+SIZE_UNITS = {'': 1, 'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3, 'T': 1024 ** 4}
+SIZE_PATTERN = re.compile(r'^\s*(\d+(?:\.\d+)?)\s*([KMGT]?)B?\s*$', re.IGNORECASE)
+
+
+def get_gcache_config():
+    """Get IST window estimator configuration with defaults"""
+    cfg = (load_config() or {}).get('gcache', {}) or {}
+    return {
+        'enabled': cfg.get('enabled', True),
+        'rate_half_life_seconds': float(cfg.get('rate_half_life_seconds', 900) or 900),
+    }
+
+
+def parse_size(value):
+    """Parse a Galera size option such as '128M', '1G' or '134217728' into bytes"""
+    match = SIZE_PATTERN.match(str(value or ''))
+    if not match:
+        return None
+    return int(float(match.group(1)) * SIZE_UNITS[match.group(2).upper()])
+
+
+def _writeset_bytes(global_status):
+    try:
+        return int(global_status['wsrep_replicated_bytes']) + int(global_status['wsrep_received_bytes'])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def update_ist_window(node_key, global_status, options, now):
+    """Fold this poll's write-set bytes into the node's byte rate and return gcache/IST metrics"""
+    cfg = get_gcache_config()
+    if not cfg['enabled']:
+        return {}
+    metrics = {}
+    gcache_size = parse_size((options or {}).get('gcache.size'))
+    if gcache_size is not None:
+        metrics['gcache_size_bytes'] = gcache_size
+    page_size = parse_size((options or {}).get('gcache.page_size'))
+    if page_size is not None:
+        metrics['gcache_page_size_bytes'] = page_size
+    total = _writeset_bytes(global_status)
+    if total is None:
+        return metrics
+    half_life = cfg['rate_half_life_seconds']
+
+    def fold(state):
+        if not state or total < state['bytes'] or now <= state['t']:
+            # First reading, or the counters were reset by a restart
+            return {'t': now, 'bytes': total, 'rate': state.get('rate') if state else None}
+        dt = now - state['t']
+        rate = (total - state['bytes']) / dt
+        if state['rate'] is not None:
+            alpha = 1.0 - 0.5 ** (dt / half_life)
+            rate = state['rate'] + alpha * (rate - state['rate'])
+        return {'t': now, 'bytes': total, 'rate': rate}
+
+    rate = get_state_store().update('gcache_rates', node_key, fold)['rate']
+    if rate is None:
+        return metrics
+    metrics['writeset_bytes_per_sec'] = round(rate, 1)
+    if gcache_size is not None and rate > 0:
+        metrics['ist_window_minutes'] = round(gcache_size / rate / 60.0, 1)
+    return metrics
@@ -2,98 +2,106 @@ from datetime import datetime
 import requests
 from requests.auth import HTTPBasicAuth
 import subprocess
-from flask import jsonify, request
-from src.config_utils import load_config, get_restart_command
+from src.config_utils import get_cluster, get_restart_command
+from src.backends import get_backend
+from src.breaker import cached_call, haproxy_target
+from src.timing import span
 
-def parse_wsrep_provider_options(options_str):
-    if not options_str:
-        return {}
+def fetch_haproxy_stats_csv(haproxy_config):
+    """Fetch the stats CSV through the configured collector backend"""
+    with span('haproxy.fetch'):
+        return get_backend().haproxy_stats(haproxy_config)
+
+def parse_backend_servers(csv_text, config, haproxy_config):
+    """Map node host -> stats row for the Galera backend servers in a stats CSV"""
+    with span('haproxy.parse'):
+        return _parse_backend_servers(csv_text, config, haproxy_config)
+
+def _parse_backend_servers(csv_text, config, haproxy_config):
+    lines = csv_text.strip().split('\n')
+    headers = lines[0].split(',')
+    nodes = config.get('nodes', [])
+    server_mapping = { f"node{i+1}": node['host'] for i, node in enumerate(nodes) }
+    backend_name = haproxy_config.get('backend_name', 'galera_cluster_backend')
     result = {}
-    pairs = options_str.split(';')
-    for pair in pairs:
-        if '=' in pair:
-            key, value = pair.strip().split('=', 1)
-            result[key.strip()] = value.strip()
+    for line in lines[1:]:
+        fields = line.split(',')
+        if len(fields) >= len(headers):
+            data = dict(zip(headers, fields))
+            if data['# pxname'] == backend_name and data['svname'] not in ['FRONTEND', 'BACKEND']:
+                server_name = data['svname']
+                if server_name in server_mapping:
+                    result[server_mapping[server_name]] = data
     return result
 
-def get_haproxy_stats():
-    config = load_config()
-    haproxy_config = config.get('haproxy', {})
-    if not haproxy_config:
-        return {}
-    try:
-        url = f"http://{haproxy_config['host']}:{haproxy_config['stats_port']}{haproxy_config['stats_path']}"
-        response = requests.get(url, auth=HTTPBasicAuth(haproxy_config['stats_user'], haproxy_config['stats_password']), timeout=5)
-        if response.status_code != 200:
-            return {}
-        lines = response.text.strip().split('\n')
-        headers = lines[0].split(',')
-        current_by_server = {}
-        nodes = config.get('nodes', [])
-        server_mapping = { f"node{i+1}": node['host'] for i, node in enumerate(nodes) }
-        backend_name = haproxy_config.get('backend_name', 'galera_cluster_backend')
-        for line in lines[1:]:
-            fields = line.split(',')
-            if len(fields) >= len(headers):
-                data = dict(zip(headers, fields))
-                if data['# pxname'] == backend_name and data['svname'] not in ['FRONTEND', 'BACKEND']:
-                    server_name = data['svname']
-                    if server_name in server_mapping:
-                        server_ip = server_mapping[server_name]
-                        try:
-                            current_by_server[server_ip] = int(data.get('scur', 0))
-                        except ValueError:
-                            pass
-        return current_by_server
-    except Exception:
-        return {}
+def haproxy_has_placeholders(haproxy_config):
+    return (haproxy_config.get('host') == 'haproxy.example.com' or
+            haproxy_config.get('stats_password') in ['your_password', 'password', ''] or
+            haproxy_config.get('stats_port') == 'port_number')
+
+def fetch_backend_servers(cluster=None):
+    """Fetch and parse the Galera backend rows of a cluster's HAProxy once
 
-def get_haproxy_server_states():
-    config = load_config()
+    While the stats page is unreachable the last rows read are returned,
+    each marked with stale_age_seconds.
+    """
+    config = cluster or get_cluster() or {}
     haproxy_config = config.get('haproxy', {})
     if not haproxy_config:
         print("Warning: No HAProxy configuration found")
         return {}
     
     # Check for placeholder values
-    if (haproxy_config.get('host') == 'haproxy.example.com' or 
-        haproxy_config.get('stats_password') in ['your_password', 'password', ''] or
-        haproxy_config.get('stats_port') == 'port_number'):
+    if haproxy_has_placeholders(haproxy_config):
         print("Warning: HAProxy configuration contains placeholder values. Please update config.yaml")
         return {}
     
     try:
-        url = f"http://{haproxy_config['host']}:{haproxy_config['stats_port']}{haproxy_config['stats_path']}"
-        response = requests.get(url, auth=HTTPBasicAuth(haproxy_config['stats_user'], haproxy_config['stats_password']), timeout=5)
-        if response.status_code != 200:
-            print(f"Warning: HAProxy stats returned status {response.status_code}")
+        target = haproxy_target(haproxy_config)
+        csv_text, stale = cached_call(target, f"haproxy_stats:{target}", fetch_haproxy_stats_csv, haproxy_config)
+        if csv_text is None:
             return {}
-        lines = response.text.strip().split('\n')
-        headers = lines[0].split(',')
-        result = {}
-        nodes = config.get('nodes', [])
-        server_mapping = { f"node{i+1}": node['host'] for i, node in enumerate(nodes) }
-        backend_name = haproxy_config.get('backend_name', 'galera_cluster_backend')
-        for line in lines[1:]:
-            fields = line.split(',')
-            if len(fields) >= len(headers):
-                data = dict(zip(headers, fields))
-                if data['# pxname'] == backend_name and data['svname'] not in ['FRONTEND', 'BACKEND']:
-                    server_name = data['svname']
-                    if server_name in server_mapping:
-                        server_ip = server_mapping[server_name]
-                        try:
-                            cur = int(data.get('scur', 0))
-                        except ValueError:
-                            cur = 0
-                        result[server_ip] = { 'current': cur, 'status': data.get('status', '') }
-        return result
+        servers = parse_backend_servers(csv_text, config, haproxy_config)
+        if stale:
+            for row in servers.values():
+                row['stale_age_seconds'] = stale['stale_age_seconds']
+        return servers
     except Exception as e:
         print(f"Warning: HAProxy connection failed: {str(e)}")
         return {}
 
-def get_haproxy_admin_url_and_auth():
-    config = load_config()
+def haproxy_states_from_servers(servers):
+    result = {}
+    for server_ip, data in servers.items():
+        try:
+            cur = int(data.get('scur', 0))
+        except ValueError:
+            cur = 0
+        result[server_ip] = { 'current': cur, 'status': data.get('status', '') }
+    return result
+
+def haproxy_weights_from_servers(servers, haproxy_config):
+    backend_name = haproxy_config.get('backend_name', 'galera_cluster_backend')
+    result = {backend_name: {}}
+    for server_ip, data in servers.items():
+        try:
+            weight = int(data.get('weight', 1))
+        except ValueError:
+            weight = 1
+        result[backend_name][server_ip] = weight
+    return result
+
+def get_haproxy_stats(cluster=None):
+    current_by_server = {}
+    for server_ip, state in haproxy_states_from_servers(fetch_backend_servers(cluster)).items():
+        current_by_server[server_ip] = state['current']
+    return current_by_server
+
+def get_haproxy_server_states(cluster=None):
+    return haproxy_states_from_servers(fetch_backend_servers(cluster))
+
+def get_haproxy_admin_url_and_auth(cluster=None):
+    config = cluster or get_cluster() or {}
     haproxy_config = config.get('haproxy', {})
     if not haproxy_config:
         return None, None
@@ -114,56 +122,28 @@ def get_haproxy_admin_url_and_auth():
     auth = HTTPBasicAuth(haproxy_config['stats_user'], haproxy_config['stats_password'])
     return url, auth
 
-def get_haproxy_server_weights():
+def get_haproxy_server_weights(cluster=None):
     """Get current weight of all servers in the backend"""
-    config = load_config()
+    config = cluster or get_cluster() or {}
     haproxy_config = config.get('haproxy', {})
     if not haproxy_config:
         return {}
-    
-    try:
-        url = f"http://{haproxy_config['host']}:{haproxy_config['stats_port']}{haproxy_config['stats_path']}"
-        response = requests.get(url, auth=HTTPBasicAuth(haproxy_config['stats_user'], haproxy_config['stats_password']), timeout=5)
-        if response.status_code != 200:
-            return {}
-        
-        lines = response.text.strip().split('\n')
-        headers = lines[0].split(',')
-        nodes = config.get('nodes', [])
-        server_mapping = { f"node{i+1}": node['host'] for i, node in enumerate(nodes) }
-        backend_name = haproxy_config.get('backend_name', 'galera_cluster_backend')
-        
-        result = {backend_name: {}}
-        
-        for line in lines[1:]:
-            fields = line.split(',')
-            if len(fields) >= len(headers):
-                data = dict(zip(headers, fields))
-                if data['# pxname'] == backend_name and data['svname'] not in ['FRONTEND', 'BACKEND']:
-                    server_name = data['svname']
-                    if server_name in server_mapping:
-                        server_ip = server_mapping[server_name]
-                        try:
-                            weight = int(data.get('weight', 1))
-                        except ValueError:
-                            weight = 1
-                        result[backend_name][server_ip] = weight
-        return result
-    except Exception:
-        return {}
+    return haproxy_weights_from_servers(fetch_backend_servers(config), haproxy_config)
 
-def get_haproxy_server_name_for_host(host_ip):
+def get_haproxy_server_name_for_host(host_ip, cluster=None):
     """Convert host IP to HAProxy server name"""
-    config = load_config()
+    config = cluster or get_cluster() or {}
     nodes = config.get('nodes', [])
     for i, node in enumerate(nodes):
         if node['host'] == host_ip:
             return f"node{i+1}"
     return host_ip
 
-def haproxy_set_server_weight(backend_name, server_name, weight):
-    """Set weight for a specific server in HAProxy backend using admin socket"""
-    config = load_config()
+RUNTIME_ERROR_MARKERS = ('Backend not found', 'No such server', 'No such backend', 'Unknown command')
+
+def haproxy_runtime_commands(commands, cluster=None):
+    """Send runtime API commands to HAProxy's admin socket in one connection (';'-separated batch)"""
+    config = cluster or get_cluster() or {}
     haproxy_config = config.get('haproxy', {})
     
     socket_host = haproxy_config.get('admin_socket_host', '127.0.0.1')
@@ -171,42 +151,30 @@ def haproxy_set_server_weight(backend_name, server_name, weight):
     
     if not socket_port:
         return False, 'HAProxy admin socket port not configured'
+    if not commands:
+        return True, ''
     
     try:
-        weight = int(weight)
-        if weight < 0 or weight > 256:
-            return False, 'Weight must be between 0 and 256'
-    except ValueError:
-        return False, 'Invalid weight value'
-    
-    try:
-        import subprocess
-        
-        # Construct the HAProxy admin command
-        command = f"set weight {backend_name}/{server_name} {weight}"
-        
-        # Use socat to send command to HAProxy admin socket
+        # Use socat to send the batch to HAProxy admin socket
         socat_command = [
             'socat', 'stdio', f'tcp:{socket_host}:{socket_port}'
         ]
         
-        # Execute the command
-        process = subprocess.Popen(
-            socat_command,
-            stdin=subprocess.PIPE,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True
-        )
-        
-        stdout, stderr = process.communicate(input=command + '\n', timeout=10)
+        with span('haproxy.runtime'):
+            process = subprocess.Popen(
+                socat_command,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True
+            )
+            stdout, stderr = process.communicate(input='; '.join(commands) + '\n', timeout=10)
         
         if process.returncode == 0:
             # Check if the response indicates success
-            if "Backend not found" in stdout or "No such server" in stdout:
+            if any(marker in stdout for marker in RUNTIME_ERROR_MARKERS):
                 return False, f"HAProxy error: {stdout.strip()}"
-            else:
-                return True, "Weight updated successfully"
+            return True, stdout.strip()
         else:
             return False, f"Socket communication failed: {stderr.strip()}"
         
@@ -217,8 +185,20 @@ def haproxy_set_server_weight(backend_name, server_name, weight):
     except Exception as e:
         return False, str(e)
 
-def haproxy_admin_server_action(backend_name, server_name, action):
-    url, auth = get_haproxy_admin_url_and_auth()
+def haproxy_set_server_weight(backend_name, server_name, weight, cluster=None):
+    """Set weight for a specific server in HAProxy backend using admin socket"""
+    try:
+        weight = int(weight)
+        if weight < 0 or weight > 256:
+            return False, 'Weight must be between 0 and 256'
+    except ValueError:
+        return False, 'Invalid weight value'
+    
+    success, msg = haproxy_runtime_commands([f"set weight {backend_name}/{server_name} {weight}"], cluster)
+    return success, ("Weight updated successfully" if success else msg)
+
+def haproxy_admin_server_action(backend_name, server_name, action, cluster=None):
+    url, auth = get_haproxy_admin_url_and_auth(cluster)
     if not url:
         return False, 'HAProxy config not found'
     if action not in ['enable', 'disable']:
@@ -236,8 +216,14 @@ def haproxy_admin_server_action(backend_name, server_name, action):
 
 def api_haproxy_restart():
     """API endpoint for HAProxy restart"""
+    # Flask is imported here so the collector path (and `python -m src.top`) loads without it
+    from flask import jsonify, request
     try:
-        cmd = get_restart_command()
+        body = request.get_json(silent=True) or {}
+        cluster = get_cluster(body.get('cluster') or request.args.get('cluster'))
+        if cluster is None:
+            return jsonify({'ok': False, 'error': 'Unknown cluster'}), 404
+        cmd = get_restart_command(cluster)
         # Execute the restart command locally. SECURITY: In production, protect this endpoint!
         completed = subprocess.run(cmd, shell=True, capture_output=True, text=True, timeout=15)
         ok = completed.returncode == 0
@@ -252,9 +238,12 @@ def api_haproxy_restart():
 
 def api_haproxy_set_weight():
     """API endpoint for setting HAProxy server weight"""
+    from flask import jsonify, request
     try:
         body = request.get_json(silent=True) or {}
-        config = load_config()
+        config = get_cluster(body.get('cluster'))
+        if config is None:
+            return jsonify({'success': False, 'error': 'Unknown cluster'}), 404
         backend_name = body.get('backend_name') or config.get('haproxy', {}).get('backend_name', 'galera_cluster_backend')
         server_host = body.get('server_name')  # This is actually the host IP
         weight = body.get('weight')
@@ -266,9 +255,9 @@ def api_haproxy_set_weight():
             return jsonify({'success': False, 'error': 'weight is required'}), 400
             
         # Convert host IP to HAProxy server name
-        server_name = get_haproxy_server_name_for_host(server_host)
+        server_name = get_haproxy_server_name_for_host(server_host, config)
         
-        success, msg = haproxy_set_server_weight(backend_name, server_name, weight)
+        success, msg = haproxy_set_server_weight(backend_name, server_name, weight, config)
         return jsonify({'success': success, 'message': msg}), (200 if success else 500)
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -0,0 +1,166 @@
+"""
+HAProxy health checks served from the collector's snapshot.
+
+A clustercheck script forks a mysql client for every check. /health/<host>
+answers the same question (is this node Synced, ready and in the Primary
+component?) from the snapshot the background collector already keeps in the
+state store, so a check costs one state store read and no database I/O.
+A node whose last poll is older than max_age_seconds is reported down: the
+snapshot can no longer vouch for it. When this process runs no background
+collector (collector.enabled is off), health traffic starts a refresher
+thread that collects every cluster once per interval_seconds into the same
+snapshots; checks never wait on it and answer 503 until a first poll is
+stored. The health settings and the host to cluster map are re-read from
+config.yaml at most every CONFIG_TTL_SECONDS.
+"""
+
+import threading
+import time
+from datetime import datetime
+from flask import request
+from src.collector import get_scheduler_config, collect_cluster, collector_running, LEADER_RETRY_SECONDS
+from src.config_utils import load_config, get_clusters
+from src.state import get_state_store
+
+CONFIG_TTL_SECONDS = 5.0
+SYNCED = 'Synced'
+DONOR = 'Donor/Desynced'
+# How often the refresher looks for clusters that are due
+REFRESH_TICK_SECONDS = 1.0
+
+_cached = None
+_cached_lock = threading.Lock()
+_refresher = None
+_refresher_lock = threading.Lock()
+
+
+def get_health_config(config=None):
+    """Get health check endpoint configuration with defaults"""
+    config = config if config is not None else load_config()
+    cfg = (config or {}).get('health', {}) or {}
+    max_age = cfg.get('max_age_seconds')
+    return {
+        'enabled': cfg.get('enabled', True),
+        # None: same rule as the snapshot itself, two of the longest poll intervals
+        'max_age_seconds': float(max_age) if max_age is not None else None,
+        'available_when_donor': bool(cfg.get('available_when_donor', False)),
+        'require_primary': bool(cfg.get('require_primary', True)),
+    }
+
+
+def _settings():
+    """Health settings plus {host: [cluster, ...]} and per-cluster staleness, cached for CONFIG_TTL_SECONDS"""
+    global _cached
+    now = time.monotonic()
+    cached = _cached
+    if cached is not None and cached['expires'] > now:
+        return cached
+    with _cached_lock:
+        if _cached is not None and _cached['expires'] > now:
+            return _cached
+        config = load_config()
+        cfg = get_health_config(config)
+        max_interval = get_scheduler_config()['adaptive']['max_interval']
+        clusters, max_age, by_name = {}, {}, {}
+        for cluster in get_clusters(config):
+            by_name[cluster['name']] = cluster
+            max_age[cluster['name']] = cfg['max_age_seconds'] or 2 * max(max_interval, cluster['interval_seconds'])
+            for node in cluster['nodes']:
+                clusters.setdefault(node.get('host'), []).append(cluster['name'])
+        _cached = {'expires': now + CONFIG_TTL_SECONDS, 'config': cfg, 'clusters': clusters, 'max_age': max_age,
+                   'by_name': by_name}
+        return _cached
+
+
+def evaluate_node(node_status, cfg, max_age, now=None):
+    """(healthy, reason) for a node status entry from a snapshot"""
+    if node_status is None:
+        return False, 'not collected yet'
+    if node_status.get('error'):
+        return False, f"unreachable: {node_status['error']}"
+    try:
+        age = ((now or datetime.now()) - datetime.fromisoformat(node_status['timestamp'])).total_seconds()
+    except (KeyError, TypeError, ValueError):
+        return False, 'no poll timestamp'
+    if age > max_age:
+        return False, f'status is stale ({age:.0f}s old)'
+    status = node_status.get('status') or {}
+    if cfg['require_primary'] and status.get('wsrep_cluster_status') != 'Primary':
+        return False, f"cluster status is {status.get('wsrep_cluster_status')}"
+    if str(status.get('wsrep_ready', '')).upper() != 'ON':
+        return False, 'wsrep_ready is OFF'
+    state = status.get('wsrep_local_state_comment')
+    if state == SYNCED or (state == DONOR and cfg['available_when_donor']):
+        return True, f'state is {state}'
+    return False, f'state is {state}'
+
+
+def _find_node(snapshot, host):
+    return next((node for node in (snapshot or {}).get('nodes', []) if node.get('host') == host), None)
+
+
+def _refresh_loop():
+    # Only one worker process refreshes; the others wait to take over
+    store = get_state_store()
+    while not store.try_acquire_leader('health_refresher'):
+        time.sleep(LEADER_RETRY_SECONDS)
+    due = {}
+    while True:
+        try:
+            settings = _settings()
+            if settings['config']['enabled'] and not collector_running():
+                for name, cluster in settings['by_name'].items():
+                    now = time.monotonic()
+                    if due.get(name, 0) > now:
+                        continue
+                    due[name] = now + cluster['interval_seconds']
+                    try:
+                        collect_cluster(cluster)
+                    except Exception as e:
+                        print(f"Health snapshot refresh error for cluster {name}: {e}")
+        except Exception as e:
+            print(f"Health snapshot refresh error: {e}")
+        time.sleep(REFRESH_TICK_SECONDS)
+
+
+def start_health_refresher():
+    """Keep snapshots fresh for health checks when this process runs no collector"""
+    global _refresher
+    with _refresher_lock:
+        if _refresher is not None:
+            return _refresher or None
+        if collector_running():
+            _refresher = False
+            return None
+        _refresher = threading.Thread(target=_refresh_loop, name='health-refresher', daemon=True)
+        _refresher.start()
+        return _refresher
+
+
+def node_health(host, cluster_name=None):
+    """HTTP status code and plain-text reason for a node, from the stored snapshot"""
+    settings = _settings()
+    if not settings['config']['enabled']:
+        return 404, 'Health checks are disabled'
+    names = settings['clusters'].get(host, [])
+    if cluster_name:
+        names = [name for name in names if name == cluster_name]
+    if not names:
+        return 404, f'Unknown node {host}'
+    if len(names) > 1:
+        return 400, f'Node {host} is in several clusters, pass ?cluster='
+    name = names[0]
+    node_status = _find_node(get_state_store().get('snapshots', name), host)
+    healthy, reason = evaluate_node(node_status, settings['config'], settings['max_age'][name])
+    if healthy:
+        return 200, f'Galera node {host} is synced ({reason}).'
+    return 503, f'Galera node {host} is not available ({reason}).'
+
+
+def api_health(host):
+    """Unauthenticated health endpoint for HAProxy httpchk: 200 when the node can take traffic, 503 otherwise"""
+    try:
+        code, text = node_health(host, request.args.get('cluster'))
+    except Exception as e:
+        code, text = 503, f'Health check error: {e}'
+    return text + '\r\n', code, {'Content-Type': 'text/plain; charset=utf-8', 'Cache-Control': 'no-store'}
@@ -0,0 +1,255 @@
+import base64
+import threading
+import time
+from datetime import datetime
+import numpy as np
+from flask import jsonify, request
+from src.config_utils import load_config, get_cluster, DEFAULT_CLUSTER
+from src.probes import FRONTEND_LABEL
+from src.storage import connect, BackgroundWriter
+from src.timing import span
+
+# Numeric per-node metrics persisted on every collection
+HISTORY_METRICS = [
+    'wsrep_local_recv_queue',
+    'wsrep_local_send_queue',
+    'wsrep_flow_control_paused',
+    'fc_paused_pct_1m',
+    'fc_sent_per_sec_1m',
+    'writeset_bytes_per_sec',
+    'ist_window_minutes',
+    'wsrep_cert_deps_distance',
+    'wsrep_last_committed',
+    'wsrep_seqno_lag',
+    'wsrep_apply_rate',
+    'wsrep_local_cert_failures',
+    'queries_per_second',
+    'writes_per_second',
+    'reads_per_second',
+    'Threads_running',
+    'haproxy_current',
+    # Active probes; host is the node, or 'haproxy' for the frontend
+    'probe_read_p50_ms',
+    'probe_read_p99_ms',
+    'probe_read_p999_ms',
+    'probe_write_p50_ms',
+    'probe_write_p99_ms',
+    'probe_write_p999_ms',
+]
+PROBE_METRICS = [metric for metric in HISTORY_METRICS if metric.startswith('probe_')]
+
+HISTORY_SCHEMA = """
+CREATE TABLE IF NOT EXISTS node_samples (
+    cluster TEXT NOT NULL,
+    host TEXT NOT NULL,
+    metric TEXT NOT NULL,
+    ts INTEGER NOT NULL,
+    value REAL,
+    PRIMARY KEY (cluster, host, metric, ts)
+) WITHOUT ROWID;
+"""
+
+INSERT_SAMPLE_SQL = "INSERT OR REPLACE INTO node_samples (cluster, host, metric, ts, value) VALUES (?, ?, ?, ?, ?)"
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def default_hosts(cluster, metrics):
+    """Hosts to query when none are given: the nodes, plus the HAProxy frontend for probe metrics"""
+    hosts = [node['host'] for node in cluster['nodes']]
+    if (cluster.get('haproxy') or {}).get('frontend_port') and any(metric in PROBE_METRICS for metric in metrics):
+        hosts.append(FRONTEND_LABEL)
+    return hosts
+
+
+def get_history_config():
+    """Get history configuration with defaults"""
+    cfg = (load_config() or {}).get('history', {}) or {}
+    return {
+        'enabled': cfg.get('enabled', True),
+        'path': cfg.get('path', 'history.db'),
+        'retention_days': cfg.get('retention_days', 30),
+        'default_points': int(cfg.get('default_points', 500) or 500),
+        'max_points': int(cfg.get('max_points', 5000) or 5000),
+    }
+
+
+def _get_writer(cfg):
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            retention_ms = int(float(cfg['retention_days']) * 86400 * 1000) if cfg['retention_days'] else None
+
+            def prune(conn):
+                if retention_ms:
+                    conn.execute("DELETE FROM node_samples WHERE ts < ?", (int(time.time() * 1000) - retention_ms,))
+
+            _writer = BackgroundWriter(cfg['path'], HISTORY_SCHEMA, maintenance=prune)
+        return _writer
+
+
+def record_history(nodes_status, cluster_name=None):
+    """Queue numeric metrics from a cluster's status snapshot for persistence"""
+    cluster_name = cluster_name or DEFAULT_CLUSTER
+    cfg = get_history_config()
+    if not cfg['enabled']:
+        return
+    rows = []
+    for node in nodes_status:
+        status = node.get('status')
+        if node.get('error') or not status:
+            continue
+        try:
+            ts = int(datetime.fromisoformat(node['timestamp']).timestamp() * 1000)
+        except (KeyError, TypeError, ValueError):
+            ts = int(time.time() * 1000)
+        for metric in HISTORY_METRICS:
+            try:
+                value = float(status.get(metric))
+            except (TypeError, ValueError):
+                continue
+            rows.append((cluster_name, node['host'], metric, ts, value))
+    with span('history.record'):
+        _get_writer(cfg).submit(INSERT_SAMPLE_SQL, rows)
+
+
+def query_history(cluster_name, host, metric, start_ms, end_ms):
+    """Return (timestamps int64 ms, values float64) for one series in a time range"""
+    cfg = get_history_config()
+    _get_writer(cfg).ready.wait(5)
+    conn = connect(cfg['path'])
+    try:
+        rows = conn.execute(
+            "SELECT ts, value FROM node_samples WHERE cluster = ? AND host = ? AND metric = ? AND ts BETWEEN ? AND ? ORDER BY ts",
+            (cluster_name, host, metric, start_ms, end_ms)
+        ).fetchall()
+    finally:
+        conn.close()
+    if not rows:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+    data = np.array(rows, dtype=np.float64)
+    return data[:, 0].astype(np.int64), data[:, 1]
+
+
+def iter_history(cluster_name, series, start_ms, end_ms, batch_size=5000):
+    """Yield (host, metric, [(ts, value), ...]) batches for each (host, metric) series in a time range
+
+    Rows come in primary-key order, so SQLite streams them from the index and
+    memory stays bounded by batch_size however long the range is.
+    """
+    cfg = get_history_config()
+    _get_writer(cfg).ready.wait(5)
+    conn = connect(cfg['path'])
+    try:
+        for host, metric in series:
+            cursor = conn.execute(
+                "SELECT ts, value FROM node_samples WHERE cluster = ? AND host = ? AND metric = ? AND ts BETWEEN ? AND ? ORDER BY ts",
+                (cluster_name, host, metric, start_ms, end_ms)
+            )
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield host, metric, rows
+    finally:
+        conn.close()
+
+
+def lttb_downsample(ts, values, threshold):
+    """Largest-Triangle-Three-Buckets downsampling; returns indices of kept points
+
+    Area computation is vectorized per bucket, only the bucket walk is sequential
+    since each choice depends on the point selected in the previous bucket.
+    """
+    n = len(values)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = ts.astype(np.float64)
+    y = values.astype(np.float64)
+    # Bucket edges for the n - 2 interior points
+    edges = np.floor(np.linspace(1, n - 1, threshold - 1)).astype(np.int64)
+    # Average point of every bucket, used as the third triangle vertex
+    counts = np.diff(edges)
+    sums_x = np.add.reduceat(x[1:n - 1], edges[:-1] - 1)
+    sums_y = np.add.reduceat(y[1:n - 1], edges[:-1] - 1)
+    avg_x = np.append(sums_x / counts, x[n - 1])
+    avg_y = np.append(sums_y / counts, y[n - 1])
+
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    a = 0
+    for i in range(threshold - 2):
+        lo, hi = edges[i], edges[i + 1]
+        bx, by = x[lo:hi], y[lo:hi]
+        areas = np.abs((x[a] - avg_x[i + 1]) * (by - y[a]) - (x[a] - bx) * (avg_y[i + 1] - y[a]))
+        a = lo + int(np.argmax(areas))
+        selected[i + 1] = a
+    return selected
+
+
+def encode_series(ts, values, encoding='json'):
+    """Encode a series as delta-encoded int64 timestamps plus float32 values"""
+    deltas = np.diff(ts, prepend=ts[:1]) if len(ts) else ts
+    values32 = values.astype(np.float32)
+    if encoding == 'binary':
+        return {
+            't0': int(ts[0]) if len(ts) else None,
+            'dt': base64.b64encode(deltas.astype('<i8').tobytes()).decode('ascii'),
+            'v': base64.b64encode(values32.astype('<f4').tobytes()).decode('ascii'),
+        }
+    return {
+        't0': int(ts[0]) if len(ts) else None,
+        'dt': deltas.tolist(),
+        # str() of a float32 gives its shortest round-trip form, keeping JSON compact
+        'v': [float(str(v)) for v in values32],
+    }
+
+
+def api_history():
+    """API endpoint returning downsampled metric history for one or more nodes"""
+    try:
+        cfg = get_history_config()
+        if not cfg['enabled']:
+            return jsonify({'ok': False, 'error': 'History is disabled'}), 404
+        metric = request.args.get('metric', 'wsrep_local_recv_queue')
+        if metric not in HISTORY_METRICS:
+            return jsonify({'ok': False, 'error': f'Unknown metric {metric}'}), 400
+        cluster = get_cluster(request.args.get('cluster'))
+        if cluster is None:
+            return jsonify({'ok': False, 'error': 'Unknown cluster'}), 404
+        hosts = request.args.get('hosts') or request.args.get('host')
+        if hosts:
+            hosts = [h for h in hosts.split(',') if h]
+        else:
+            hosts = default_hosts(cluster, [metric])
+        now_ms = int(time.time() * 1000)
+        end_ms = request.args.get('to', default=now_ms, type=int)
+        window = request.args.get('window', default=3600, type=int)
+        start_ms = request.args.get('from', default=end_ms - window * 1000, type=int)
+        points = request.args.get('points', default=cfg['default_points'], type=int)
+        points = max(3, min(points, cfg['max_points']))
+        encoding = request.args.get('encoding', 'json')
+
+        series = {}
+        for host in hosts:
+            ts, values = query_history(cluster['name'], host, metric, start_ms, end_ms)
+            raw_count = len(ts)
+            keep = lttb_downsample(ts, values, points)
+            entry = encode_series(ts[keep], values[keep], encoding)
+            entry['raw_count'] = raw_count
+            series[host] = entry
+
+        return jsonify({
+            'ok': True,
+            'cluster': cluster['name'],
+            'metric': metric,
+            'from': start_ms,
+            'to': end_ms,
+            'points': points,
+            'encoding': encoding,
+            'series': series
+        })
+    except Exception as e:
+        return jsonify({'ok': False, 'error': str(e)}), 500
@@ -0,0 +1,172 @@
+"""
+Tiered per-node metric cache.
+
+static: parsed wsrep_provider_options and SHOW VARIABLES results. These only
+        change on a config reload, so they are kept for static_ttl and dropped
+        as soon as Uptime goes backwards (restart) or wsrep_cluster_conf_id
+        changes (membership change).
+slow:   status values that rarely move (versions, thread counts, ...), taken
+        from a full SHOW GLOBAL STATUS every slow_ttl.
+hot:    counters and states every poll needs; between slow refreshes a poll
+        only asks for HOT_STATUS by name.
+"""
+
+import threading
+import time
+from src.backends import get_backend
+from src.config_utils import load_config
+from src.utils import parse_wsrep_provider_options
+
+# Status variables read on every poll. Uptime and wsrep_cluster_conf_id must
+# stay here: they are what invalidates the static tier.
+HOT_STATUS = [
+    'Uptime',
+    'wsrep_cluster_conf_id',
+    'wsrep_cluster_size',
+    'wsrep_cluster_status',
+    'wsrep_local_state',
+    'wsrep_local_state_comment',
+    'wsrep_local_index',
+    'wsrep_ready',
+    'wsrep_flow_control_active',
+    'wsrep_flow_control_recv',
+    'wsrep_flow_control_sent',
+    'wsrep_flow_control_paused',
+    'wsrep_flow_control_paused_ns',
+    'wsrep_local_cert_failures',
+    'wsrep_local_recv_queue',
+    'wsrep_local_send_queue',
+    'wsrep_cert_deps_distance',
+    'wsrep_last_committed',
+    'wsrep_replicated_bytes',
+    'wsrep_received_bytes',
+    'Com_insert',
+    'Com_insert_select',
+    'Com_update',
+    'Com_update_multi',
+    'Com_select',
+    'Com_lock_tables',
+    'Queries',
+    'Threads_running',
+]
+
+_entries = {}
+_entries_lock = threading.Lock()
+
+
+def get_metric_cache_config():
+    """Get metric cache configuration with defaults"""
+    cfg = (load_config() or {}).get('metric_cache', {}) or {}
+    return {
+        'enabled': cfg.get('enabled', True),
+        'static_ttl': float(cfg.get('static_ttl', 600) or 0),
+        'slow_ttl': float(cfg.get('slow_ttl', 60) or 0),
+    }
+
+
+class _NodeEntry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.options = None
+        self.variables = None
+        self.static_at = 0.0
+        self.variables_at = 0.0
+        self.status = None
+        self.slow_at = 0.0
+        self.uptime = None
+        self.conf_id = None
+
+    def drop_static(self):
+        self.options = None
+        self.variables = None
+
+    def observe(self, status):
+        """Track restart/reconfiguration markers; returns True if the static tier was dropped"""
+        try:
+            uptime = int(status['Uptime'])
+        except (KeyError, TypeError, ValueError):
+            uptime = None
+        conf_id = status.get('wsrep_cluster_conf_id')
+        restarted = uptime is not None and self.uptime is not None and uptime < self.uptime
+        reconfigured = conf_id is not None and self.conf_id is not None and conf_id != self.conf_id
+        if uptime is not None:
+            self.uptime = uptime
+        if conf_id is not None:
+            self.conf_id = conf_id
+        if restarted or reconfigured:
+            self.drop_static()
+            # Slow values (versions, thread counts) may have moved too
+            self.slow_at = 0.0
+            return True
+        return False
+
+
+def _entry(key):
+    with _entries_lock:
+        entry = _entries.get(key)
+        if entry is None:
+            entry = _entries[key] = _NodeEntry()
+        return entry
+
+
+def invalidate_node(key):
+    """Forget a node's static tier, e.g. after SET GLOBAL"""
+    with _entries_lock:
+        entry = _entries.get(key)
+    if entry is not None:
+        with entry.lock:
+            entry.drop_static()
+
+
+def read_node_metrics(node_config, key):
+    """Return (global_status, parsed provider options) for a node, reading only stale tiers"""
+    cfg = get_metric_cache_config()
+    backend = get_backend()
+    if not cfg['enabled']:
+        global_status, provider_options = backend.node_status(node_config)
+        return global_status, parse_wsrep_provider_options(provider_options.get('Value') if provider_options else None)
+
+    entry = _entry(key)
+    with entry.lock:
+        now = time.monotonic()
+        static_fresh = entry.options is not None and now - entry.static_at < cfg['static_ttl']
+        slow_fresh = entry.status is not None and now - entry.slow_at < cfg['slow_ttl']
+        status_names = HOT_STATUS if slow_fresh else None
+        global_status, provider_options = backend.node_status(node_config, status_names, not static_fresh)
+        fetched_options = not static_fresh
+
+        if entry.observe(global_status) and not fetched_options:
+            # Restarted or reconfigured since the options were cached: re-read them now
+            _, provider_options = backend.node_status(node_config, [], True)
+            fetched_options = True
+
+        if status_names is None:
+            entry.status = dict(global_status)
+            entry.slow_at = now
+        else:
+            merged = dict(entry.status)
+            merged.update(global_status)
+            entry.status = merged
+        if fetched_options:
+            entry.options = parse_wsrep_provider_options(provider_options.get('Value') if provider_options else None)
+            entry.static_at = now
+        return dict(entry.status), entry.options
+
+
+def cached_variables(key, status, fetch):
+    """SHOW VARIABLES results for a node from the static tier, calling fetch() on a miss
+
+    status is a fresh status read holding Uptime (and wsrep_cluster_conf_id if
+    available) so a restart or reconfiguration invalidates the cached values.
+    """
+    cfg = get_metric_cache_config()
+    if not cfg['enabled']:
+        return fetch()
+    entry = _entry(key)
+    with entry.lock:
+        entry.observe(status)
+        now = time.monotonic()
+        if entry.variables is None or now - entry.variables_at >= cfg['static_ttl']:
+            entry.variables = fetch()
+            entry.variables_at = now
+        return dict(entry.variables)
@@ -0,0 +1,285 @@
+"""
+Active latency probes.
+
+Server-side counters say nothing about the round trip a client sees. When
+enabled, one worker runs `SELECT 1` every interval_seconds on each node and
+through each cluster's HAProxy frontend (haproxy.frontend_port), and
+optionally upserts a row of a heartbeat table to time a replicated write.
+Probes reuse pooled connections, so only the query round trip is timed.
+
+Latencies go into log-bucketed histograms: bucket i holds values up to
+MIN_MS * GROWTH ** i, so any percentile is within 2% of the true value while
+a histogram stays a small sparse dict. Histograms are kept per 10 second
+slice; the 1m and 5m windows merge the slices they cover. Summaries
+(p50/p99/p999, count, errors) are published to the state store after every
+round for /api/status, and the 1m percentiles go to the history store once
+per slice.
+"""
+
+import math
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from src.collector import LEADER_RETRY_SECONDS
+from src.config_utils import load_config, get_clusters
+from src.db_pool import pooled_connection
+from src.state import get_state_store
+
+MIN_MS = 0.01
+GROWTH = 1.02
+_LOG_GROWTH = math.log(GROWTH)
+SLICE_SECONDS = 10
+# Window name -> seconds
+PROBE_WINDOWS = {'1m': 60, '5m': 300}
+# Label of the probes that go through the cluster's HAProxy frontend
+FRONTEND_LABEL = 'haproxy'
+TABLE_PATTERN = re.compile(r'^[A-Za-z0-9_$]+(\.[A-Za-z0-9_$]+)?$')
+
+_runner = None
+_runner_lock = threading.Lock()
+
+
+def get_probe_config():
+    """Get active latency probe configuration with defaults"""
+    cfg = (load_config() or {}).get('probes', {}) or {}
+    heartbeat = cfg.get('heartbeat', {}) or {}
+    return {
+        'enabled': cfg.get('enabled', False),
+        'interval_seconds': float(cfg.get('interval_seconds', 1) or 1),
+        'workers': int(cfg.get('workers', 8) or 8),
+        'frontend': cfg.get('frontend', True),
+        'heartbeat': {
+            'enabled': heartbeat.get('enabled', False),
+            'table': heartbeat.get('table', 'galera_monitor.heartbeat'),
+        },
+    }
+
+
+class LogHistogram:
+    """Sparse histogram with logarithmic buckets (bounded relative error, HDR-style)"""
+
+    def __init__(self):
+        self.counts = {}
+        self.count = 0
+        self.max_ms = 0.0
+
+    def add(self, ms):
+        index = 0 if ms <= MIN_MS else math.ceil(math.log(ms / MIN_MS) / _LOG_GROWTH)
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.count += 1
+        self.max_ms = max(self.max_ms, ms)
+
+    def merge(self, other):
+        for index, n in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + n
+        self.count += other.count
+        self.max_ms = max(self.max_ms, other.max_ms)
+        return self
+
+    def percentile(self, pct):
+        """Upper bound of the bucket holding the percentile (capped at the observed max)"""
+        if not self.count:
+            return None
+        target = self.count * pct / 100.0
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= target:
+                return round(min(MIN_MS * GROWTH ** index, self.max_ms), 3)
+        return round(self.max_ms, 3)
+
+
+class _Series:
+    """Per-slice histograms and error counts of one probe (target + kind)"""
+
+    def __init__(self):
+        self.slices = deque()
+
+    def _slice(self, now):
+        start = now - now % SLICE_SECONDS
+        if not self.slices or self.slices[-1][0] != start:
+            self.slices.append([start, LogHistogram(), 0])
+            longest = max(PROBE_WINDOWS.values())
+            while self.slices and self.slices[0][0] <= start - longest:
+                self.slices.popleft()
+        return self.slices[-1]
+
+    def add(self, now, ms):
+        self._slice(now)[1].add(ms)
+
+    def error(self, now):
+        self._slice(now)[2] += 1
+
+    def summary(self, now, seconds):
+        hist, errors = LogHistogram(), 0
+        for start, slice_hist, slice_errors in self.slices:
+            if start > now - seconds:
+                hist.merge(slice_hist)
+                errors += slice_errors
+        return {
+            'count': hist.count,
+            'errors': errors,
+            'p50_ms': hist.percentile(50),
+            'p99_ms': hist.percentile(99),
+            'p999_ms': hist.percentile(99.9),
+            'max_ms': round(hist.max_ms, 3) if hist.count else None,
+        }
+
+
+def probe_targets(cluster, cfg):
+    """(label, host, port) of every node and, when configured, the HAProxy frontend"""
+    targets = [(node['host'], node['host'], node.get('port', 3306)) for node in cluster['nodes']]
+    haproxy_config = cluster.get('haproxy') or {}
+    if cfg['frontend'] and haproxy_config.get('frontend_port'):
+        host = haproxy_config.get('frontend_host') or haproxy_config.get('host')
+        targets.append((FRONTEND_LABEL, host, int(haproxy_config['frontend_port'])))
+    return targets
+
+
+def run_probe(cluster, label, host, port, heartbeat_table=None):
+    """Time SELECT 1 (and the heartbeat upsert) on one target; returns (read_ms, write_ms or None)"""
+    write_ms = None
+    with pooled_connection(cluster, host, port) as conn:
+        cursor = conn.cursor()
+        try:
+            start = time.perf_counter()
+            cursor.execute('SELECT 1')
+            cursor.fetchall()
+            read_ms = (time.perf_counter() - start) * 1000.0
+            if heartbeat_table:
+                start = time.perf_counter()
+                cursor.execute(
+                    f"INSERT INTO {heartbeat_table} (host, ts) VALUES (%s, NOW(6)) ON DUPLICATE KEY UPDATE ts = VALUES(ts)",
+                    (label,)
+                )
+                write_ms = (time.perf_counter() - start) * 1000.0
+        finally:
+            cursor.close()
+    return read_ms, write_ms
+
+
+class ProbeRunner:
+    """Probes every target at a fixed rate and keeps their windowed histograms
+
+    A target whose previous probe is still running (e.g. a node that does
+    not answer) is skipped for the round, so it cannot hold up the others.
+    """
+
+    def __init__(self):
+        self.series = {}
+        self.in_flight = set()
+        self.recorded_slice = None
+        self.lock = threading.Lock()
+
+    def _series(self, cluster_name, label, kind):
+        key = (cluster_name, label, kind)
+        if key not in self.series:
+            self.series[key] = _Series()
+        return self.series[key]
+
+    def _record(self, cluster_name, label, future):
+        now = time.time()
+        with self.lock:
+            self.in_flight.discard((cluster_name, label))
+            try:
+                read_ms, write_ms = future.result()
+                self._series(cluster_name, label, 'read').add(now, read_ms)
+                if write_ms is not None:
+                    self._series(cluster_name, label, 'write').add(now, write_ms)
+                return
+            except Exception as e:
+                self._series(cluster_name, label, 'read').error(now)
+                error = e
+        print(f"Probe error for {label} in cluster {cluster_name}: {error}")
+
+    def round(self, pool, cfg):
+        heartbeat = cfg['heartbeat']
+        table = heartbeat['table'] if heartbeat['enabled'] and TABLE_PATTERN.match(heartbeat['table'] or '') else None
+        for cluster in get_clusters():
+            for label, host, port in probe_targets(cluster, cfg):
+                key = (cluster['name'], label)
+                with self.lock:
+                    if key in self.in_flight:
+                        continue
+                    self.in_flight.add(key)
+                future = pool.submit(run_probe, cluster, label, host, port, table)
+                future.add_done_callback(lambda f, name=cluster['name'], label=label: self._record(name, label, f))
+        self.publish(time.time())
+
+    def summaries(self, now):
+        """{cluster: {label: {kind: {window: summary}}}}"""
+        result = {}
+        for (cluster_name, label, kind), series in self.series.items():
+            result.setdefault(cluster_name, {}).setdefault(label, {})[kind] = {
+                name: series.summary(now, seconds) for name, seconds in PROBE_WINDOWS.items()
+            }
+        return result
+
+    def publish(self, now):
+        from src.history import record_history
+
+        with self.lock:
+            summaries = self.summaries(now)
+        store = get_state_store()
+        for cluster_name, targets in summaries.items():
+            store.set('probe_latency', cluster_name, targets)
+        current_slice = now - now % SLICE_SECONDS
+        if self.recorded_slice == current_slice:
+            return
+        self.recorded_slice = current_slice
+        timestamp = datetime.fromtimestamp(now).isoformat()
+        for cluster_name, targets in summaries.items():
+            rows = []
+            for label, kinds in targets.items():
+                status = {}
+                for kind, windows in kinds.items():
+                    for pct in ('p50', 'p99', 'p999'):
+                        status[f'probe_{kind}_{pct}_ms'] = windows['1m'][f'{pct}_ms']
+                rows.append({'host': label, 'timestamp': timestamp, 'status': status, 'error': None})
+            record_history(rows, cluster_name)
+
+
+def _probe_loop():
+    # Only one worker process probes; the others wait to take over
+    store = get_state_store()
+    while not store.try_acquire_leader('probes'):
+        time.sleep(LEADER_RETRY_SECONDS)
+    runner = ProbeRunner()
+    cfg = get_probe_config()
+    with ThreadPoolExecutor(max_workers=cfg['workers'], thread_name_prefix='probe') as pool:
+        next_round = time.monotonic()
+        while True:
+            cfg = get_probe_config()
+            try:
+                runner.round(pool, cfg)
+            except Exception as e:
+                print(f"Probe round error: {e}")
+            # Fixed rate: a slow round shortens the next wait instead of shifting every later probe
+            next_round += cfg['interval_seconds']
+            delay = next_round - time.monotonic()
+            if delay < 0:
+                next_round = time.monotonic()
+                delay = 0
+            time.sleep(delay)
+
+
+def start_probes():
+    """Start the latency prober once per process; it runs where the probes lock is held"""
+    global _runner
+    with _runner_lock:
+        if _runner is not None:
+            return _runner or None
+        if not get_probe_config()['enabled']:
+            _runner = False
+            return None
+        _runner = threading.Thread(target=_probe_loop, name='latency-probes', daemon=True)
+        _runner.start()
+        return _runner
+
+
+def get_probe_latency(cluster_name):
+    """Latest published probe summaries for a cluster ({} when probes are off)"""
+    return get_state_store().get('probe_latency', cluster_name) or {}
@@ -0,0 +1,128 @@
+"""
+Replication lag and catch-up estimates from wsrep_last_committed.
+
+Every node reports the seqno of the last write-set it committed. A node's lag
+is how far that seqno trails the cluster head, and its apply rate is the
+slope of its own wsrep_last_committed history. Nodes are polled at different
+moments, so the head is estimated at each node's poll time by projecting the
+other nodes' seqnos along their apply rates. A lagging node catches up at its
+apply rate minus the rate the head moves on; the lag divided by that
+difference is the estimated time to catch up.
+"""
+
+from datetime import datetime
+import numpy as np
+from src.config_utils import load_config
+
+
+def get_replication_config():
+    """Get replication lag estimator configuration with defaults"""
+    cfg = (load_config() or {}).get('replication_lag', {}) or {}
+    return {
+        'enabled': cfg.get('enabled', True),
+        'rate_window_seconds': int(cfg.get('rate_window_seconds', 60) or 60),
+    }
+
+
+def _seqno(node_status):
+    if node_status.get('error'):
+        return None
+    try:
+        value = int((node_status.get('status') or {}).get('wsrep_last_committed'))
+    except (TypeError, ValueError):
+        return None
+    return value if value >= 0 else None
+
+
+def _poll_time(node_status):
+    try:
+        return datetime.fromisoformat(node_status['timestamp']).timestamp()
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def series_rate(ts_ms, values):
+    """Least-squares slope (per second) of a counter, ignoring anything before its last reset"""
+    if len(values) < 2:
+        return None
+    resets = np.nonzero(np.diff(values) < 0)[0]
+    if len(resets):
+        ts_ms, values = ts_ms[resets[-1] + 1:], values[resets[-1] + 1:]
+    if len(values) < 2 or ts_ms[-1] == ts_ms[0]:
+        return None
+    seconds = (ts_ms - ts_ms[0]) / 1000.0
+    slope = np.polyfit(seconds, values.astype(np.float64), 1)[0]
+    return round(max(float(slope), 0.0), 2)
+
+
+def annotate_apply_rate(cluster_name, node_status):
+    """Set status['wsrep_apply_rate'] from the node's recent wsrep_last_committed history"""
+    # Imported here so the estimator can be loaded without pulling in Flask
+    from src.history import get_history_config, query_history
+
+    seqno = _seqno(node_status)
+    poll_time = _poll_time(node_status)
+    cfg = get_replication_config()
+    if not cfg['enabled'] or seqno is None or poll_time is None or not get_history_config()['enabled']:
+        return None
+    now_ms = int(poll_time * 1000)
+    ts, values = query_history(cluster_name, node_status['host'], 'wsrep_last_committed',
+                               now_ms - cfg['rate_window_seconds'] * 1000, now_ms - 1)
+    # The sample being published is not in the history store yet
+    rate = series_rate(np.append(ts, now_ms), np.append(values, float(seqno)))
+    node_status['status']['wsrep_apply_rate'] = rate
+    return rate
+
+
+def replication_lag(nodes_status):
+    """Per-host lag, apply rate and catch-up estimate for one cluster's latest node statuses"""
+    readings = {}
+    for node in nodes_status:
+        seqno = _seqno(node)
+        poll_time = _poll_time(node)
+        if seqno is None or poll_time is None:
+            continue
+        rate = (node.get('status') or {}).get('wsrep_apply_rate')
+        readings[node['host']] = (seqno, poll_time, rate if isinstance(rate, (int, float)) else None)
+
+    result = {}
+    for node in nodes_status:
+        host = node['host']
+        if host not in readings:
+            result[host] = {'last_committed': None, 'lag': None, 'apply_rate': None,
+                            'head_rate': None, 'catchup_eta_seconds': None}
+            continue
+        seqno, poll_time, rate = readings[host]
+        # Cluster head at this node's poll time, projected from every other reading
+        head, head_rate = seqno, rate
+        for other, (other_seqno, other_time, other_rate) in readings.items():
+            if other == host:
+                continue
+            projected = other_seqno + (other_rate or 0.0) * (poll_time - other_time)
+            if projected > head:
+                head, head_rate = projected, other_rate
+        lag = max(int(round(head - seqno)), 0)
+        if lag == 0:
+            eta = 0.0
+        elif rate is not None and head_rate is not None and rate > head_rate:
+            eta = round(lag / (rate - head_rate), 1)
+        else:
+            # Not gaining on the head (or no rate history yet)
+            eta = None
+        result[host] = {
+            'last_committed': seqno,
+            'lag': lag,
+            'apply_rate': rate,
+            'head_rate': head_rate,
+            'catchup_eta_seconds': eta,
+        }
+    return result
+
+
+def annotate_lag(node_status, lag):
+    """Copy a node's lag estimate into its status so alerts and history see it"""
+    status = node_status.get('status')
+    if not status or not lag or lag['lag'] is None:
+        return
+    status['wsrep_seqno_lag'] = lag['lag']
+    status['catchup_eta_seconds'] = lag['catchup_eta_seconds']
@@ -0,0 +1,113 @@
+"""
+Response layer: fast JSON encoding and gzip/brotli compression.
+
+FastJSONProvider encodes with orjson when it is installed (falling back to the
+stdlib encoder). datetime/date values come out as ISO 8601, timedelta and
+Decimal as strings, so API modules can return rows straight from the cursor.
+compress_response compresses JSON/text bodies above a size threshold with
+brotli (if installed and accepted) or gzip.
+"""
+
+import datetime
+import decimal
+import gzip
+import json
+from flask import request
+from flask.json.provider import DefaultJSONProvider
+from src.config_utils import load_config
+from src.timing import span
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = ('application/json', 'text/html', 'text/plain', 'text/csv', 'text/css',
+                          'application/javascript', 'text/javascript', 'application/x-ndjson')
+
+
+def json_default(value):
+    """Encode the non-JSON types MySQL rows carry"""
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, (datetime.timedelta, decimal.Decimal)):
+        return str(value)
+    if isinstance(value, (bytes, bytearray)):
+        return value.decode('utf-8', errors='replace')
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson"""
+
+    def dumps(self, obj, **kwargs):
+        if orjson is not None and not kwargs:
+            return orjson.dumps(obj, default=json_default, option=orjson.OPT_NON_STR_KEYS).decode('utf-8')
+        kwargs.setdefault('default', json_default)
+        kwargs.setdefault('ensure_ascii', False)
+        return json.dumps(obj, **kwargs)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        if orjson is not None:
+            # Skip the bytes -> str -> bytes round trip of dumps()
+            body = orjson.dumps(obj, default=json_default, option=orjson.OPT_NON_STR_KEYS)
+        else:
+            body = json.dumps(obj, default=json_default, ensure_ascii=False, separators=(',', ':'))
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+_compression_cfg = None
+
+
+def get_compression_config():
+    """Get response compression configuration with defaults (read once)"""
+    global _compression_cfg
+    if _compression_cfg is None:
+        cfg = (load_config() or {}).get('compression', {}) or {}
+        _compression_cfg = {
+            'enabled': cfg.get('enabled', True),
+            'min_size': int(cfg.get('min_size', 1024) or 0),
+            'gzip_level': int(cfg.get('gzip_level', 5) or 5),
+            'brotli_quality': int(cfg.get('brotli_quality', 4) or 4),
+        }
+    return _compression_cfg
+
+
+def _accepted_encoding():
+    accepted = request.headers.get('Accept-Encoding', '').lower()
+    if brotli is not None and 'br' in accepted:
+        return 'br'
+    if 'gzip' in accepted:
+        return 'gzip'
+    return None
+
+
+def compress_response(response):
+    """after_request hook: compress large JSON/text bodies the client accepts"""
+    cfg = get_compression_config()
+    if (not cfg['enabled'] or response.direct_passthrough or response.is_streamed
+            or response.status_code < 200 or response.status_code in (204, 304)
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = _accepted_encoding()
+    if encoding is None or response.content_length is None or response.content_length < cfg['min_size']:
+        return response
+    data = response.get_data()
+    with span(f'compress.{encoding}'):
+        if encoding == 'br':
+            compressed = brotli.compress(data, quality=cfg['brotli_quality'])
+        else:
+            compressed = gzip.compress(data, compresslevel=cfg['gzip_level'])
+    response.set_data(compressed)
+    response.headers['Content-Encoding'] = encoding
+    return response
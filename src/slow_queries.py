@@ -1,6 +1,7 @@
 from flask import request, jsonify
 import mysql.connector
 import yaml
+from src.config_utils import resolve_cluster
 
 def load_config():
     with open('config.yaml', 'r') as file:
@@ -15,21 +16,22 @@ def api_slow_queries():
         # Get parameters from query string
         limit = request.args.get('limit', default=100, type=int)
         host = request.args.get('host', default=None, type=str)
+        cluster = resolve_cluster(request.args.get('cluster'), host)
+        if cluster is None:
+            return jsonify({'ok': False, 'error': 'Unknown cluster'}), 404
         
         # If host is not specified, use the first node
         if not host:
-            config = load_config()
-            nodes = config.get('nodes', [])
+            nodes = cluster['nodes']
             if not nodes:
                 return jsonify({'ok': False, 'error': 'No nodes available'}), 404
             host = nodes[0]['host']
         
         # Connect to database
-        config = load_config()
         db_config = {
             'host': host,
-            'user': config.get('mysql', {}).get('user', 'root'),
-            'password': config.get('mysql', {}).get('password', ''),
+            'user': cluster.get('mysql', {}).get('user', 'root'),
+            'password': cluster.get('mysql', {}).get('password', ''),
             'database': 'mysql'
         }
         
@@ -60,19 +62,13 @@ def api_slow_queries():
             cursor.execute(slow_query_sql, (limit,))
             slow_queries = cursor.fetchall()
             
-            # Convert dates to serializable format
+            # Numeric seconds for sorting; dates and the timedelta values themselves
+            # are serialized by the JSON provider (src/responses.py)
             for query in slow_queries:
-                if 'start_time' in query and query['start_time']:
-                    query['start_time'] = query['start_time'].isoformat()
-                    
-                # Convert numbers to readable format
-                if 'query_time' in query and query['query_time']:
-                    query['query_time_seconds'] = float(query['query_time'].total_seconds())
-                    query['query_time'] = str(query['query_time'])
-                    
-                if 'lock_time' in query and query['lock_time']:
-                    query['lock_time_seconds'] = float(query['lock_time'].total_seconds())
-                    query['lock_time'] = str(query['lock_time'])
+                if query.get('query_time'):
+                    query['query_time_seconds'] = query['query_time'].total_seconds()
+                if query.get('lock_time'):
+                    query['lock_time_seconds'] = query['lock_time'].total_seconds()
             
             return jsonify({
                 'ok': True,
@@ -1,5 +1,173 @@
-# Shared in-memory state (kept same behavior)
+"""
+Shared state: rate baselines, alert cooldowns and collector snapshots.
 
-previous_readings = {}
-alert_state = {}
+The memory backend keeps everything in this process, which is all a single
+`python app.py` needs. The sqlite backend stores JSON values in a WAL-mode
+SQLite file that every worker process opens; update() runs its
+read-modify-write inside BEGIN IMMEDIATE, so concurrent workers never lose a
+rate baseline or both win the same alert cooldown. Run several gunicorn
+workers against it and they behave like one process.
+"""
 
+import json
+import os
+import threading
+from src.config_utils import load_config
+from src.storage import connect
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process leader lock
+    fcntl = None
+
+STATE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS state (
+    ns TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    PRIMARY KEY (ns, key)
+) WITHOUT ROWID;
+"""
+
+
+class MemoryStateStore:
+    """Process-local state"""
+
+    shared = False
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.RLock()
+
+    def get(self, ns, key, default=None):
+        with self._lock:
+            return self._data.get(ns, {}).get(key, default)
+
+    def set(self, ns, key, value):
+        with self._lock:
+            self._data.setdefault(ns, {})[key] = value
+
+    def update(self, ns, key, fn, default=None):
+        """Atomically replace a value with fn(current); returns the new value"""
+        with self._lock:
+            values = self._data.setdefault(ns, {})
+            value = fn(values.get(key, default))
+            values[key] = value
+            return value
+
+    def items(self, ns):
+        with self._lock:
+            return dict(self._data.get(ns, {}))
+
+    def delete(self, ns, key):
+        with self._lock:
+            self._data.get(ns, {}).pop(key, None)
+
+    def try_acquire_leader(self, name):
+        return True
+
+
+class SQLiteStateStore:
+    """State shared by every process that opens the same SQLite file"""
+
+    shared = True
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._leader_files = {}
+        self._conn().executescript(STATE_SCHEMA)
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = connect(self.path)
+            # Transactions are managed explicitly below
+            conn.isolation_level = None
+            self._local.conn = conn
+        return conn
+
+    def get(self, ns, key, default=None):
+        row = self._conn().execute("SELECT value FROM state WHERE ns = ? AND key = ?", (ns, key)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def set(self, ns, key, value):
+        self._conn().execute("INSERT OR REPLACE INTO state (ns, key, value) VALUES (?, ?, ?)",
+                             (ns, key, json.dumps(value, default=str)))
+
+    def update(self, ns, key, fn, default=None):
+        """Atomically replace a value with fn(current) across processes; returns the new value"""
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT value FROM state WHERE ns = ? AND key = ?", (ns, key)).fetchone()
+            value = fn(json.loads(row[0]) if row else default)
+            conn.execute("INSERT OR REPLACE INTO state (ns, key, value) VALUES (?, ?, ?)",
+                         (ns, key, json.dumps(value, default=str)))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return value
+
+    def items(self, ns):
+        rows = self._conn().execute("SELECT key, value FROM state WHERE ns = ?", (ns,)).fetchall()
+        return {key: json.loads(value) for key, value in rows}
+
+    def delete(self, ns, key):
+        self._conn().execute("DELETE FROM state WHERE ns = ? AND key = ?", (ns, key))
+
+    def try_acquire_leader(self, name):
+        """Take a non-blocking exclusive lock held until this process exits"""
+        if fcntl is None:
+            return True
+        if name in self._leader_files:
+            return True
+        f = open(f"{self.path}.{name}.lock", 'a')
+        try:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            f.close()
+            return False
+        f.seek(0)
+        f.truncate()
+        f.write(str(os.getpid()))
+        f.flush()
+        self._leader_files[name] = f
+        return True
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_state_config():
+    """Get state backend configuration with defaults"""
+    cfg = (load_config() or {}).get('state', {}) or {}
+    return {
+        'backend': cfg.get('backend', 'memory'),
+        'path': cfg.get('path', 'state.db'),
+    }
+
+
+def get_state_store():
+    """Return the process-wide state store (the backend is chosen once, at first use)"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                cfg = get_state_config()
+                if cfg['backend'] == 'sqlite':
+                    _store = SQLiteStateStore(cfg['path'])
+                elif cfg['backend'] == 'memory':
+                    _store = MemoryStateStore()
+                else:
+                    raise ValueError(f"Unknown state backend: {cfg['backend']}")
+    return _store
+
+
+def set_state_store(store):
+    """Install a state store explicitly (CLI tools that must not share the app's state)"""
+    global _store
+    with _store_lock:
+        _store = store
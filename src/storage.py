@@ -0,0 +1,64 @@
+import queue
+import sqlite3
+import threading
+import time
+
+
+def connect(path):
+    """Open a SQLite connection tuned for a single writer and concurrent readers"""
+    conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    return conn
+
+
+class BackgroundWriter:
+    """Batch SQLite writes on a daemon thread so callers never wait on disk I/O"""
+
+    def __init__(self, path, schema, batch_size=500, flush_interval=1.0, maintenance=None, maintenance_interval=600):
+        self.path = path
+        self.schema = schema
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.maintenance = maintenance
+        self.maintenance_interval = maintenance_interval
+        self.queue = queue.Queue(maxsize=100000)
+        self.ready = threading.Event()
+        self.thread = threading.Thread(target=self._run, name=f'sqlite-writer:{path}', daemon=True)
+        self.thread.start()
+
+    def submit(self, sql, rows):
+        """Queue rows for executemany; drops the batch if the writer is saturated"""
+        if not rows:
+            return
+        try:
+            self.queue.put_nowait((sql, rows))
+        except queue.Full:
+            print(f"Warning: dropping {len(rows)} rows for {self.path}, writer queue is full")
+
+    def _run(self):
+        conn = connect(self.path)
+        conn.executescript(self.schema)
+        self.ready.set()
+        last_maintenance = time.monotonic()
+        while True:
+            try:
+                batch = [self.queue.get(timeout=self.flush_interval)]
+            except queue.Empty:
+                batch = []
+            while batch and len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                if batch:
+                    with conn:
+                        for sql, rows in batch:
+                            conn.executemany(sql, rows)
+                if self.maintenance and time.monotonic() - last_maintenance >= self.maintenance_interval:
+                    last_maintenance = time.monotonic()
+                    with conn:
+                        self.maintenance(conn)
+            except Exception as e:
+                print(f"Error writing to {self.path}: {e}")
@@ -1,6 +1,6 @@
 import requests
 from datetime import datetime
-from src.state import alert_state
+from src.state import get_state_store
 
 def telegram_enabled(telegram_cfg):
     """Check if telegram is enabled and properly configured"""
@@ -26,12 +26,17 @@ def send_telegram_message(telegram_cfg, message):
         return False
 
 def should_send_alert(node_key, alert_key, cooldown_seconds):
-    """Check if alert should be sent based on cooldown period"""
-    now = datetime.now()
-    node_state = alert_state.setdefault(node_key, {})
-    last_times = node_state.setdefault('last_sent', {})
-    last_time = last_times.get(alert_key)
-    if last_time is None or (now - last_time).total_seconds() >= cooldown_seconds:
-        last_times[alert_key] = now
-        return True
-    return False
\ No newline at end of file
+    """Check if alert should be sent based on cooldown period
+
+    The check and the new send time are one atomic state update, so only one
+    worker process claims each alert.
+    """
+    now = datetime.now().timestamp()
+    claimed = []
+    def claim(last_time):
+        if last_time is None or now - last_time >= cooldown_seconds:
+            claimed.append(True)
+            return now
+        return last_time
+    get_state_store().update('alert_cooldowns', f"{node_key}|{alert_key}", claim)
+    return bool(claimed)
\ No newline at end of file
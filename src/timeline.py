@@ -0,0 +1,206 @@
+"""
+Change-only timeline of wsrep state transitions.
+
+A handful of status fields (node state, cluster membership, readiness,
+provider version) almost never change, so storing them with every snapshot
+mostly stores repeats. After each collection the latest value of every
+TIMELINE_FIELDS entry, plus whether the node answered ('reachable'), is
+compared with the node's previous values in the state store. Only
+differences are queued to a background SQLite writer as (time, host, field,
+before, after) events. The first reading of a node is its baseline, and
+fields of an unreachable node are left alone until it answers again.
+
+Events are indexed by cluster and time, by field and time, and by host,
+field and time. "When did node2 go Donor" and "when did the cluster size
+drop" are each one index range scan.
+"""
+
+import threading
+import time
+from datetime import datetime
+from flask import jsonify, request
+from src.config_utils import load_config, get_cluster, cluster_node_key, DEFAULT_CLUSTER
+from src.state import get_state_store
+from src.storage import connect, BackgroundWriter
+
+TIMELINE_FIELDS = [
+    'wsrep_local_state_comment',
+    'wsrep_cluster_conf_id',
+    'wsrep_cluster_size',
+    'wsrep_cluster_status',
+    'wsrep_ready',
+    'wsrep_provider_version',
+]
+# Synthetic field: ON while the node answers polls, OFF while it does not
+REACHABLE_FIELD = 'reachable'
+
+TIMELINE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS state_events (
+    id INTEGER PRIMARY KEY,
+    ts INTEGER NOT NULL,
+    cluster TEXT NOT NULL,
+    host TEXT NOT NULL,
+    field TEXT NOT NULL,
+    before TEXT,
+    after TEXT
+);
+CREATE INDEX IF NOT EXISTS state_events_cluster_ts ON state_events (cluster, ts);
+CREATE INDEX IF NOT EXISTS state_events_field_ts ON state_events (cluster, field, ts);
+CREATE INDEX IF NOT EXISTS state_events_host_field_ts ON state_events (cluster, host, field, ts);
+"""
+
+INSERT_EVENT_SQL = "INSERT INTO state_events (ts, cluster, host, field, before, after) VALUES (?, ?, ?, ?, ?, ?)"
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_timeline_config():
+    """Get state timeline configuration with defaults"""
+    cfg = (load_config() or {}).get('timeline', {}) or {}
+    return {
+        'enabled': cfg.get('enabled', True),
+        'path': cfg.get('path', 'timeline.db'),
+        'retention_days': cfg.get('retention_days', 365),
+        'default_limit': int(cfg.get('default_limit', 500) or 500),
+        'max_limit': int(cfg.get('max_limit', 5000) or 5000),
+    }
+
+
+def _get_writer(cfg):
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            retention_ms = int(float(cfg['retention_days']) * 86400 * 1000) if cfg['retention_days'] else None
+
+            def prune(conn):
+                if retention_ms:
+                    conn.execute("DELETE FROM state_events WHERE ts < ?", (int(time.time() * 1000) - retention_ms,))
+
+            _writer = BackgroundWriter(cfg['path'], TIMELINE_SCHEMA, maintenance=prune)
+        return _writer
+
+
+def node_values(node_status):
+    """{field: value as text} of the tracked fields in one node status entry"""
+    if node_status.get('error'):
+        return {REACHABLE_FIELD: 'OFF'}
+    values = {REACHABLE_FIELD: 'ON'}
+    status = node_status.get('status') or {}
+    for field in TIMELINE_FIELDS:
+        value = status.get(field)
+        if value not in (None, '-'):
+            values[field] = str(value)
+    return values
+
+
+def _poll_ms(node_status):
+    try:
+        return int(datetime.fromisoformat(node_status['timestamp']).timestamp() * 1000)
+    except (KeyError, TypeError, ValueError):
+        return int(time.time() * 1000)
+
+
+def record_transitions(nodes_status, cluster_name):
+    """Queue an event for every tracked field whose value changed since the node's previous poll"""
+    cfg = get_timeline_config()
+    if not cfg['enabled']:
+        return
+    cluster_name = cluster_name or DEFAULT_CLUSTER
+    store = get_state_store()
+    rows = []
+    for node_status in nodes_status:
+        host = node_status['host']
+        values = node_values(node_status)
+        key = cluster_node_key(cluster_name, host)
+        previous = store.get('timeline_last', key)
+        if previous is not None and all(previous.get(field) == value for field, value in values.items()):
+            # Nothing changed; skip the atomic write
+            continue
+        ts = _poll_ms(node_status)
+
+        def transition(last, host=host, values=values, ts=ts):
+            last = dict(last or {})
+            for field, value in values.items():
+                if field in last and last[field] != value:
+                    rows.append((ts, cluster_name, host, field, last[field], value))
+                last[field] = value
+            return last
+
+        store.update('timeline_last', key, transition)
+    if rows:
+        _get_writer(cfg).submit(INSERT_EVENT_SQL, rows)
+
+
+def current_values(cluster_name):
+    """{host: {field: value}} as of each node's latest poll"""
+    prefix = cluster_node_key(cluster_name, '')
+    return {key[len(prefix):]: values for key, values in get_state_store().items('timeline_last').items()
+            if key.startswith(prefix) and values}
+
+
+def query_timeline(cluster_name, start_ms, end_ms, host=None, field=None, after=None, limit=500, cursor=None):
+    """Oldest-first events in a range; cursor is the 'ts:id' of the last row seen"""
+    cfg = get_timeline_config()
+    _get_writer(cfg).ready.wait(5)
+    clauses = ['cluster = ?', 'ts BETWEEN ? AND ?']
+    params = [cluster_name, start_ms, end_ms]
+    for column, value in (('host', host), ('field', field), ('after', after)):
+        if value:
+            clauses.append(f'{column} = ?')
+            params.append(value)
+    if cursor:
+        cursor_ts, cursor_id = (int(part) for part in cursor.split(':', 1))
+        clauses.append('(ts > ? OR (ts = ? AND id > ?))')
+        params.extend([cursor_ts, cursor_ts, cursor_id])
+    conn = connect(cfg['path'])
+    try:
+        rows = conn.execute(
+            f"SELECT id, ts, host, field, before, after FROM state_events "
+            f"WHERE {' AND '.join(clauses)} ORDER BY ts, id LIMIT ?",
+            params + [limit + 1]
+        ).fetchall()
+    finally:
+        conn.close()
+    events = [{'ts': ts, 'host': row_host, 'field': row_field, 'before': before, 'after': row_after}
+              for _, ts, row_host, row_field, before, row_after in rows[:limit]]
+    next_cursor = f"{rows[limit - 1][1]}:{rows[limit - 1][0]}" if len(rows) > limit else None
+    return events, next_cursor
+
+
+def api_timeline():
+    """API endpoint returning wsrep state transitions of a cluster, oldest first"""
+    try:
+        cfg = get_timeline_config()
+        if not cfg['enabled']:
+            return jsonify({'ok': False, 'error': 'Timeline is disabled'}), 404
+        cluster = get_cluster(request.args.get('cluster'))
+        if cluster is None:
+            return jsonify({'ok': False, 'error': 'Unknown cluster'}), 404
+        field = request.args.get('field')
+        if field and field not in TIMELINE_FIELDS and field != REACHABLE_FIELD:
+            return jsonify({'ok': False, 'error': f'Unknown field {field}'}), 400
+        now_ms = int(time.time() * 1000)
+        end_ms = request.args.get('to', default=now_ms, type=int)
+        window = request.args.get('window', default=86400, type=int)
+        start_ms = request.args.get('from', default=end_ms - window * 1000, type=int)
+        limit = max(1, min(request.args.get('limit', default=cfg['default_limit'], type=int), cfg['max_limit']))
+        try:
+            events, next_cursor = query_timeline(
+                cluster['name'], start_ms, end_ms,
+                host=request.args.get('host'), field=field, after=request.args.get('after'),
+                limit=limit, cursor=request.args.get('cursor'))
+        except ValueError:
+            return jsonify({'ok': False, 'error': 'Invalid cursor'}), 400
+        return jsonify({
+            'ok': True,
+            'cluster': cluster['name'],
+            'from': start_ms,
+            'to': end_ms,
+            'fields': TIMELINE_FIELDS + [REACHABLE_FIELD],
+            'events': events,
+            'next_cursor': next_cursor,
+            'current': current_values(cluster['name']),
+        })
+    except Exception as e:
+        return jsonify({'ok': False, 'error': str(e)}), 500
@@ -0,0 +1,121 @@
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+# Upper bounds (ms) of the latency buckets; the last bucket is open-ended
+BUCKET_BOUNDS_MS = [0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, float('inf')]
+
+_current_trace = contextvars.ContextVar('timing_trace', default=None)
+_histograms = {}
+_histograms_lock = threading.Lock()
+
+
+class PhaseHistogram:
+    """Fixed-bucket latency histogram for one phase"""
+
+    def __init__(self):
+        self.buckets = [0] * len(BUCKET_BOUNDS_MS)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def add(self, ms):
+        for i, bound in enumerate(BUCKET_BOUNDS_MS):
+            if ms <= bound:
+                self.buckets[i] += 1
+                break
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def percentile(self, pct):
+        """Upper bound of the bucket containing the percentile (capped at the observed max)"""
+        if not self.count:
+            return None
+        target = self.count * pct / 100.0
+        seen = 0
+        for bound, n in zip(BUCKET_BOUNDS_MS, self.buckets):
+            seen += n
+            if seen >= target:
+                return min(bound, self.max_ms)
+        return self.max_ms
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'mean_ms': round(self.total_ms / self.count, 3) if self.count else None,
+            'p50_ms': self.percentile(50),
+            'p95_ms': self.percentile(95),
+            'p99_ms': self.percentile(99),
+            'max_ms': round(self.max_ms, 3),
+            'buckets': {('+Inf' if b == float('inf') else str(b)): n for b, n in zip(BUCKET_BOUNDS_MS, self.buckets)},
+        }
+
+
+def start_trace():
+    """Start collecting spans for the current request/context"""
+    trace = []
+    _current_trace.set(trace)
+    return trace
+
+
+def end_trace():
+    """Stop collecting spans for the current context"""
+    _current_trace.set(None)
+
+
+def get_trace():
+    return _current_trace.get()
+
+
+def record_span(phase, duration_ms, target=None):
+    with _histograms_lock:
+        hist = _histograms.get(phase)
+        if hist is None:
+            hist = _histograms[phase] = PhaseHistogram()
+        hist.add(duration_ms)
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.append((phase, target, duration_ms))
+
+
+@contextmanager
+def span(phase, target=None):
+    """Time a block into the phase histogram and the active trace"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_span(phase, (time.perf_counter() - start) * 1000.0, target)
+
+
+def server_timing_header(trace):
+    """Render spans as a Server-Timing header, summing repeated phase/target pairs"""
+    totals = {}
+    for phase, target, duration_ms in trace:
+        key = (phase, target)
+        totals[key] = totals.get(key, 0.0) + duration_ms
+    targets = []
+    for _, target in totals:
+        if target is not None and target not in targets:
+            targets.append(target)
+    entries = []
+    for (phase, target), duration_ms in totals.items():
+        if target is None:
+            entries.append(f'{phase};dur={duration_ms:.2f}')
+        else:
+            # Metric names must be tokens, so the host goes into desc
+            index = targets.index(target) + 1
+            entries.append(f'{phase}.n{index};dur={duration_ms:.2f};desc="{target} {phase}"')
+    return ', '.join(entries)
+
+
+def api_debug_timings():
+    """API endpoint exposing per-phase latency histograms"""
+    from flask import jsonify, request
+    with _histograms_lock:
+        phases = {phase: hist.to_dict() for phase, hist in sorted(_histograms.items())}
+        if request.args.get('reset') in ('1', 'true'):
+            _histograms.clear()
+    return jsonify({'ok': True, 'phases': phases})
@@ -0,0 +1,154 @@
+"""
+Headless "galera top": a terminal view of every node without Flask or a browser.
+
+Usage (run from the directory holding config.yaml):
+    python -m src.top                      # refresh in place every second
+    python -m src.top --cluster prod --interval 2
+    python -m src.top --once --json        # one sample for scripts
+
+Nodes are polled concurrently on the collector's node pool with the same
+get_node_status the web app uses, so rates, flow-control windows and HAProxy
+state match the dashboard. Alerts and history are not run, and state (rate
+baselines) is kept in a private in-memory store so a running app's shared
+state is left alone. Only the collection path is imported at startup;
+tabulate is loaded when the first table is drawn.
+"""
+
+import argparse
+import json
+import sys
+import time
+from datetime import datetime
+
+CLEAR_SCREEN = '\033[H\033[2J'
+COLUMNS = [
+    ('host', 'HOST'),
+    ('state', 'STATE'),
+    ('cluster_status', 'CLUSTER'),
+    ('ready', 'READY'),
+    ('recv_queue', 'RECV_Q'),
+    ('send_queue', 'SEND_Q'),
+    ('fc_paused_pct', 'FC_PAUSED%'),
+    ('fc_sent', 'FC_SENT/s'),
+    ('qps', 'QPS'),
+    ('wps', 'WPS'),
+    ('rps', 'RPS'),
+    ('threads_running', 'THR_RUN'),
+    ('haproxy', 'HAPROXY'),
+    ('weight', 'WEIGHT'),
+]
+
+
+def poll_cluster(cluster):
+    """Poll HAProxy once and every node concurrently; returns (nodes_status, haproxy_weights)"""
+    from src.cluster import get_node_status
+    from src.collector import submit_node_task
+    from src.haproxy import fetch_backend_servers, haproxy_states_from_servers, haproxy_weights_from_servers
+
+    servers = fetch_backend_servers(cluster) if cluster['haproxy'] else {}
+    haproxy_states = haproxy_states_from_servers(servers)
+    haproxy_weights = haproxy_weights_from_servers(servers, cluster['haproxy']) if cluster['haproxy'] else {}
+    futures = [submit_node_task(get_node_status, node, cluster, haproxy_states) for node in cluster['nodes']]
+    return [future.result() for future in futures], haproxy_weights
+
+
+def collect(clusters):
+    """{cluster: {nodes, haproxy_weights, flow_control, collected_at}} for every selected cluster"""
+    from src.flow_control import flow_control_summary
+
+    result = {}
+    for cluster in clusters:
+        nodes_status, haproxy_weights = poll_cluster(cluster)
+        result[cluster['name']] = {
+            'nodes': nodes_status,
+            'haproxy_weights': haproxy_weights,
+            'flow_control': flow_control_summary(nodes_status),
+            'collected_at': datetime.now().isoformat(),
+        }
+    return result
+
+
+def node_row(node, weights):
+    """Flatten one node status into the table's columns"""
+    status = node.get('status') or {}
+    if node.get('error'):
+        return {'host': node['host'], 'state': 'ERROR', 'cluster_status': node['error'][:40]}
+    weight = next((backend[node['host']] for backend in weights.values() if node['host'] in backend), None)
+    return {
+        'host': node['host'],
+        'state': status.get('wsrep_local_state_comment'),
+        'cluster_status': status.get('wsrep_cluster_status'),
+        'ready': status.get('wsrep_ready'),
+        'recv_queue': status.get('wsrep_local_recv_queue'),
+        'send_queue': status.get('wsrep_local_send_queue'),
+        'fc_paused_pct': status.get('fc_paused_pct_1m'),
+        'fc_sent': status.get('fc_sent_per_sec_1m'),
+        'qps': status.get('queries_per_second'),
+        'wps': status.get('writes_per_second'),
+        'rps': status.get('reads_per_second'),
+        'threads_running': status.get('Threads_running'),
+        'haproxy': status.get('haproxy_status'),
+        'weight': weight,
+    }
+
+
+def render(snapshots):
+    from tabulate import tabulate
+
+    blocks = []
+    for name, snapshot in snapshots.items():
+        rows = [node_row(node, snapshot['haproxy_weights']) for node in snapshot['nodes']]
+        table = tabulate([[row.get(key) for key, _ in COLUMNS] for row in rows],
+                         headers=[header for _, header in COLUMNS], tablefmt='simple', missingval='-')
+        senders = ', '.join(f"{s['host']} ({s['share']:.0%})" for s in snapshot['flow_control']['senders']) or 'none'
+        blocks.append(f"Cluster {name}  {snapshot['collected_at'][11:19]}  FC senders (1m): {senders}\n{table}")
+    return '\n\n'.join(blocks)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m src.top', description='Terminal view of Galera cluster nodes')
+    parser.add_argument('--cluster', action='append', help='cluster to show (repeatable; default: all)')
+    parser.add_argument('--interval', type=float, default=1.0, help='seconds between refreshes')
+    parser.add_argument('--once', action='store_true', help='print one sample and exit')
+    parser.add_argument('--json', action='store_true', help='print JSON instead of a table')
+    parser.add_argument('--sample-seconds', type=float, default=1.0,
+                        help='with --once: gap between the two polls rates are computed from')
+    args = parser.parse_args(argv)
+
+    from src.config_utils import get_clusters
+    from src.state import MemoryStateStore, set_state_store
+
+    set_state_store(MemoryStateStore())
+    clusters = get_clusters()
+    if args.cluster:
+        clusters = [cluster for cluster in clusters if cluster['name'] in args.cluster]
+        if not clusters:
+            print(f"Unknown cluster: {', '.join(args.cluster)}", file=sys.stderr)
+            return 2
+
+    if args.once:
+        # Rates need a previous reading
+        collect(clusters)
+        time.sleep(args.sample_seconds)
+        snapshots = collect(clusters)
+        print(json.dumps(snapshots, default=str) if args.json else render(snapshots))
+        return 0
+
+    interactive = sys.stdout.isatty() and not args.json
+    try:
+        while True:
+            started = time.monotonic()
+            snapshots = collect(clusters)
+            if args.json:
+                print(json.dumps(snapshots, default=str), flush=True)
+            else:
+                output = render(snapshots)
+                sys.stdout.write((CLEAR_SCREEN + output + '\n') if interactive else output + '\n\n')
+                sys.stdout.flush()
+            time.sleep(max(args.interval - (time.monotonic() - started), 0))
+    except KeyboardInterrupt:
+        return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -11,4 +11,14 @@ def calculate_rate(current_value, previous_value, current_time, previous_time):
     if time_diff <= 0:
         return 0
         
-    return round(value_diff / time_diff, 2)
\ No newline at end of file
+    return round(value_diff / time_diff, 2)
+
+def parse_wsrep_provider_options(options_str):
+    """Parse wsrep_provider_options string into a dictionary"""
+    options = {}
+    if options_str:
+        for option in options_str.split(';'):
+            if '=' in option:
+                key, value = option.split('=', 1)
+                options[key.strip()] = value.strip()
+    return options
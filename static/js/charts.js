@@ -1,5 +1,40 @@
 const delayHistoryByHost = {};
 const MAX_POINTS = 1000;
+const HISTORY_POINTS = 600;
+
+// 0 = live in-browser buffer, otherwise a server-side history window in seconds
+let chartRangeSeconds = 0;
+let serverHistoryByHost = {};
+
+// Decode the columnar /api/history payload (delta-encoded timestamps) into points
+function decodeHistorySeries(entry) {
+  const points = [];
+  let t = entry.t0 || 0;
+  for (let i = 0; i < entry.dt.length; i++) {
+    t += entry.dt[i];
+    points.push({ t, v: entry.v[i] });
+  }
+  return points;
+}
+
+function loadServerHistory(nodes) {
+  const params = new URLSearchParams({
+    metric: 'wsrep_local_recv_queue',
+    window: chartRangeSeconds,
+    points: HISTORY_POINTS,
+    hosts: nodes.map(node => node.host).join(',')
+  });
+  if (window.currentCluster) params.set('cluster', window.currentCluster);
+  return fetch(`/api/history?${params.toString()}`, { cache: 'no-store' })
+    .then(response => response.json())
+    .then(data => {
+      if (!data.ok) throw new Error(data.error || 'Failed to load history');
+      serverHistoryByHost = {};
+      Object.keys(data.series).forEach(host => {
+        serverHistoryByHost[host] = decodeHistorySeries(data.series[host]);
+      });
+    });
+}
 
 function updateDelayHistories(nodes) {
   const now = Date.now();
@@ -14,11 +49,21 @@ function updateDelayHistories(nodes) {
 }
 
 function renderDelayCharts(nodes) {
+  if (chartRangeSeconds > 0) {
+    loadServerHistory(nodes)
+      .then(() => drawDelayCharts(nodes, serverHistoryByHost))
+      .catch(error => console.error('Error fetching history:', error));
+    return;
+  }
+  drawDelayCharts(nodes, delayHistoryByHost);
+}
+
+function drawDelayCharts(nodes, historyByHost) {
   const chartsContainer = document.getElementById('charts-container');
   if (!chartsContainer) return;
   chartsContainer.innerHTML = nodes.map(node => {
     const hostId = safeId(node.host);
-    const arr = delayHistoryByHost[node.host] || [];
+    const arr = historyByHost[node.host] || [];
     const latest = arr.length ? Math.round(arr[arr.length - 1].v || 0) : 0;
     return `
       <div class="metric-group" style="grid-column: 1 / -1;">
@@ -30,7 +75,7 @@ function renderDelayCharts(nodes) {
 
   nodes.forEach(node => {
     const host = node.host;
-    const arr = delayHistoryByHost[host] || [];
+    const arr = historyByHost[host] || [];
     const x = arr.map(p => new Date(p.t));
     const y = arr.map(p => Math.max(0, Math.round(p.v || 0)));
     const elId = `chart-delay-${safeId(host)}`;
@@ -60,6 +105,21 @@ document.addEventListener('shown.bs.tab', function (event) {
   }
 });
 
+document.addEventListener('DOMContentLoaded', function () {
+  const rangeSelect = document.getElementById('charts-range');
+  if (!rangeSelect) return;
+  rangeSelect.addEventListener('change', function () {
+    chartRangeSeconds = parseInt(this.value, 10) || 0;
+    if (window.lastNodesStatus) renderDelayCharts(window.lastNodesStatus);
+  });
+});
+
+// Host names may repeat across clusters, so start the live buffer over
+document.addEventListener('clusterchange', function () {
+  Object.keys(delayHistoryByHost).forEach(host => delete delayHistoryByHost[host]);
+  serverHistoryByHost = {};
+});
+
 window.updateDelayHistories = updateDelayHistories;
 window.renderDelayCharts = renderDelayCharts;
 
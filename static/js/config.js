@@ -71,6 +71,7 @@ function initConfig() {
   
   // Add event listeners
   document.getElementById('refresh-config').addEventListener('click', fetchConfig);
+  document.getElementById('compare-config').addEventListener('click', fetchConfigDiff);
   document.getElementById('config-node-select').addEventListener('change', function() {
     currentNodeForConfig = this.value;
     fetchConfig();
@@ -80,6 +81,12 @@ function initConfig() {
     filterConfigByCategory();
   });
   
+  document.addEventListener('clusterchange', function() {
+    currentNodeForConfig = null;
+    document.getElementById('config-diff-container').classList.add('d-none');
+    populateConfigNodeSelect();
+  });
+  
   // Create modal for editing variables
   createEditConfigModal();
   
@@ -112,7 +119,7 @@ function populateConfigNodeSelect() {
     }
   } else {
     // Fallback: Load nodes from API
-    fetch('/api/nodes')
+    fetch(withCluster('/api/nodes'))
       .then(response => response.json())
       .then(data => {
         if (data.ok && data.nodes) {
@@ -139,7 +146,7 @@ function fetchConfig() {
   tbody.innerHTML = '<tr><td colspan="3" class="text-center">Loading configuration...</td></tr>';
   
   // Fetch data from API
-  fetch(`/api/get_config?host=${encodeURIComponent(currentNodeForConfig)}`)
+  fetch(withCluster(`/api/get_config?host=${encodeURIComponent(currentNodeForConfig)}`))
     .then(response => response.json())
     .then(data => {
       if (!data.ok) {
@@ -298,6 +305,10 @@ function createEditConfigModal() {
                 <input type="text" class="form-control" id="edit-config-value">
                 <small class="text-muted" id="edit-config-help"></small>
               </div>
+              <div class="form-check">
+                <input class="form-check-input" type="checkbox" id="edit-config-all-nodes">
+                <label class="form-check-label" for="edit-config-all-nodes">Apply to every node in the cluster (rolled back everywhere if any node fails)</label>
+              </div>
             </div>
             <div class="modal-footer">
               <button type="button" class="btn btn-secondary" data-bs-dismiss="modal">Cancel</button>
@@ -322,6 +333,7 @@ function createEditConfigModal() {
 function showEditConfigModal(variable, value) {
   document.getElementById('edit-config-variable').value = variable;
   document.getElementById('edit-config-value').value = value;
+  document.getElementById('edit-config-all-nodes').checked = false;
   
   // Set help text based on variable type
   const helpText = document.getElementById('edit-config-help');
@@ -358,6 +370,11 @@ function updateConfig() {
   // Hide modal
   bootstrap.Modal.getInstance(document.getElementById('edit-config-modal')).hide();
   
+  if (document.getElementById('edit-config-all-nodes').checked) {
+    updateClusterConfig(variable, value);
+    return;
+  }
+  
   // Show loading status
   showConfigStatus('info', `Updating ${variable}...`);
   
@@ -369,6 +386,7 @@ function updateConfig() {
     },
     body: JSON.stringify({
       host: currentNodeForConfig,
+      cluster: window.currentCluster,
       variable: variable,
       value: value
     })
@@ -394,9 +412,88 @@ function updateConfig() {
     });
 }
 
+// Apply a variable on every node of the cluster at once
+function updateClusterConfig(variable, value) {
+  showConfigStatus('info', `Updating ${variable} on all nodes...`);
+  
+  fetch('/api/update_config/cluster', {
+    method: 'POST',
+    headers: {
+      'Content-Type': 'application/json'
+    },
+    body: JSON.stringify({
+      cluster: window.currentCluster,
+      variable: variable,
+      value: value
+    })
+  })
+    .then(response => response.json())
+    .then(data => {
+      const results = Object.entries(data.results || {})
+        .map(([host, result]) => `${host}: ${result.status}${result.error ? ' (' + result.error + ')' : ''}`)
+        .join('; ');
+      if (!data.ok) {
+        showConfigStatus('error', `${data.error || 'Error updating ' + variable}${results ? ' - ' + results : ''}`);
+        return;
+      }
+      showConfigStatus('success', `${variable} updated on all nodes`);
+      const current = (data.results || {})[currentNodeForConfig];
+      const valueElement = document.querySelector(`#config-tbody .editable-value[data-variable="${variable}"]`);
+      if (valueElement && current) {
+        valueElement.textContent = current.new_value;
+      }
+    })
+    .catch(error => {
+      console.error('Error updating configuration:', error);
+      showConfigStatus('error', `Error updating ${variable}`);
+    });
+}
+
+// Show only the variables that differ across the cluster's nodes
+function fetchConfigDiff() {
+  const container = document.getElementById('config-diff-container');
+  const table = document.getElementById('config-diff-table');
+  container.classList.remove('d-none');
+  table.innerHTML = '<tbody><tr><td class="text-center">Comparing nodes...</td></tr></tbody>';
+  
+  fetch(withCluster('/api/config/diff'))
+    .then(response => response.json())
+    .then(data => {
+      if (!data.ok) {
+        table.innerHTML = `<tbody><tr><td class="text-center text-danger">${escapeHtml(data.error || 'Error comparing nodes')}</td></tr></tbody>`;
+        return;
+      }
+      const hosts = data.hosts || [];
+      const names = Object.keys(data.diff || {});
+      const errors = Object.entries(data.errors || {}).map(([host, error]) => `${host}: ${error}`);
+      if (errors.length) {
+        showConfigStatus('error', `Could not read ${errors.join('; ')}`);
+      }
+      if (!names.length) {
+        table.innerHTML = `<tbody><tr><td class="text-center">No differences across ${hosts.length} nodes</td></tr></tbody>`;
+        return;
+      }
+      const head = `<thead><tr><th>Variable</th>${hosts.map(host => `<th>${escapeHtml(host)}</th>`).join('')}</tr></thead>`;
+      const rows = names.map(name => {
+        const values = data.diff[name];
+        const cells = hosts.map(host => values[host] === null || values[host] === undefined
+          ? '<td class="text-muted">(missing)</td>'
+          : `<td>${escapeHtml(values[host])}</td>`).join('');
+        return `<tr><td>${escapeHtml(name)}</td>${cells}</tr>`;
+      }).join('');
+      table.innerHTML = head + `<tbody>${rows}</tbody>`;
+    })
+    .catch(error => {
+      console.error('Error comparing configuration:', error);
+      table.innerHTML = '<tbody><tr><td class="text-center text-danger">Error comparing nodes</td></tr></tbody>';
+    });
+}
+
 // Initialize on document load
 document.addEventListener('DOMContentLoaded', initConfig);
 
 // Expose functions globally
 window.fetchConfig = fetchConfig;
+window.fetchConfigDiff = fetchConfigDiff;
+window.updateClusterConfig = updateClusterConfig;
 window.updateConfig = updateConfig;
\ No newline at end of file
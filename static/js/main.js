@@ -30,6 +30,7 @@ function safeId(text) { return String(text || '').replace(/[^a-zA-Z0-9_-]/g, '_'
 
 function createNodeRow(nodeData) {
   const status = nodeData.status || {};
+  const probe = (((window.probeLatency || {})[nodeData.host] || {}).read || {})['1m'] || {};
   const weight = nodeData.weight || status.haproxy_weight || 1;
   return `
     <div class="node-row">
@@ -65,6 +66,7 @@ function createNodeRow(nodeData) {
           </div>
           <div class="metric-row"><span class="metric-label">wsrep_cert_deps_distance:</span><span class="metric-value">${formatMetricValue(status.wsrep_cert_deps_distance, 'number')}</span></div>
           <div class="metric-row"><span class="metric-label">wsrep_last_committed:</span><span class="metric-value">${formatMetricValue(status.wsrep_last_committed, 'number')}</span></div>
+          <div class="metric-row"><span class="metric-label">Seqno lag / catch-up:</span><span class="metric-value">${formatMetricValue(status.wsrep_seqno_lag, 'number')} / ${status.wsrep_seqno_lag > 0 ? (status.catchup_eta_seconds != null ? formatMetricValue(status.catchup_eta_seconds, 'number') + 's' : 'n/a') : '-'}</span></div>
           <div class="metric-row"><span class="metric-label">wsrep_thread_count:</span><span class="metric-value">${formatMetricValue(status.wsrep_thread_count, 'number')}</span></div>
           <div class="metric-row"><span class="metric-label">wsrep_applier_thread_count:</span><span class="metric-value">${formatMetricValue(status.wsrep_applier_thread_count, 'number')}</span></div>
           <div class="metric-row"><span class="metric-label">wsrep_rollbacker_thread_count:</span><span class="metric-value">${formatMetricValue(status.wsrep_rollbacker_thread_count, 'number')}</span></div>
@@ -73,9 +75,13 @@ function createNodeRow(nodeData) {
           <div class="metric-row"><span class="metric-label">wsrep_flow_control_sent:</span><span class="metric-value">${formatMetricValue(status.wsrep_flow_control_sent, 'number')}</span></div>
           <div class="metric-row"><span class="metric-label">wsrep_flow_control_recv:</span><span class="metric-value">${formatMetricValue(status.wsrep_flow_control_recv, 'number')}</span></div>
           <div class="metric-row"><span class="metric-label">wsrep_flow_control_paused:</span><span class="metric-value">${formatMetricValue(status.wsrep_flow_control_paused, 'flow_control_paused')}</span></div>
+          <div class="metric-row"><span class="metric-label">FC paused % 10s/1m/5m:</span><span class="metric-value ${getStatusClass(status.fc_paused_pct_1m, { warning: 1, danger: 10 })}">${formatMetricValue(status.fc_paused_pct_10s, 'number')} / ${formatMetricValue(status.fc_paused_pct_1m, 'number')} / ${formatMetricValue(status.fc_paused_pct_5m, 'number')}</span></div>
+          <div class="metric-row"><span class="metric-label">FC sent/recv per sec (1m):</span><span class="metric-value">${formatMetricValue(status.fc_sent_per_sec_1m, 'number')} / ${formatMetricValue(status.fc_recv_per_sec_1m, 'number')}</span></div>
           <div class="metric-row"><span class="metric-label">wsrep_flow_control_active:</span><span class="metric-value ${status.wsrep_flow_control_active === 'true' ? 'true' : 'false'}">${status.wsrep_flow_control_active}</span></div>
           <div class="metric-row"><span class="metric-label">gcache.page_size:</span><span class="metric-value">${formatMetricValue(status['gcache.page_size'], 'size')}</span></div>
           <div class="metric-row"><span class="metric-label">gcache.size:</span><span class="metric-value">${formatMetricValue(status['gcache.size'], 'size')}</span></div>
+          <div class="metric-row"><span class="metric-label">Probe RTT p50/p99 (1m):</span><span class="metric-value">${probe.p50_ms != null ? formatMetricValue(probe.p50_ms, 'number') + ' / ' + formatMetricValue(probe.p99_ms, 'number') + ' ms' : '-'}</span></div>
+          <div class="metric-row"><span class="metric-label">IST window:</span><span class="metric-value">${status.ist_window_minutes != null ? formatMetricValue(status.ist_window_minutes, 'number') + ' min' : '-'}</span></div>
           <div class="metric-row"><span class="metric-label">gcs.fc_limit:</span><span class="metric-value">${formatMetricValue(status['gcs.fc_limit'], 'number')}</span></div>
         </div>
         <div class="metric-group">
@@ -95,6 +101,8 @@ function createNodeRow(nodeData) {
       </div>
       <div class="overall-status">
         ${status.need_more_slave ? '<div class="status-badge need-slave">NEED_MORE_SLAVE_T</div>' : ''}
+        ${status.fc_sent_per_sec_1m > 0 ? '<div class="status-badge need-slave">SENDING FC</div>' : ''}
+        ${(status.anomalies || []).map(a => `<div class="status-badge need-slave" title="expected ${a.expected}, z=${a.z}">${a.metric.toUpperCase()} ${a.direction.toUpperCase()}</div>`).join('')}
       </div>
     </div>
   `;
@@ -105,15 +113,59 @@ function renderOverview(nodes) {
   if (container) container.innerHTML = nodes.map(node => createNodeRow(node)).join('');
 }
 
+// Cluster the UI is scoped to; null means the server's first (or only) cluster
+window.currentCluster = null;
+
+// Append the selected cluster to an API URL
+function withCluster(url) {
+  if (!window.currentCluster) return url;
+  const sep = url.includes('?') ? '&' : '?';
+  return `${url}${sep}cluster=${encodeURIComponent(window.currentCluster)}`;
+}
+
+function loadClusters() {
+  fetch('/api/clusters')
+    .then(response => response.json())
+    .then(data => {
+      if (!data.ok) throw new Error(data.error || 'Failed to load clusters');
+      const select = document.getElementById('cluster-select');
+      if (!select) return;
+      select.innerHTML = data.clusters
+        .map(c => `<option value="${c.name}">${c.name} (${c.nodes} nodes)</option>`)
+        .join('');
+      // A single cluster needs no selector
+      select.classList.toggle('d-none', data.clusters.length < 2);
+      if (data.clusters.length && !window.currentCluster) window.currentCluster = data.clusters[0].name;
+      select.value = window.currentCluster;
+    })
+    .catch(error => console.error('Error loading clusters:', error));
+}
+
+function selectCluster(name) {
+  if (name === window.currentCluster) return;
+  window.currentCluster = name;
+  window.nodesData = null;
+  window.lastNodesStatus = [];
+  // Per-module listeners reset their node selection and reload
+  document.dispatchEvent(new CustomEvent('clusterchange', { detail: { cluster: name } }));
+  loadNodesData();
+  refreshStatus();
+}
+
 function refreshStatus() {
-  fetch('/api/status', { cache: 'no-store', headers: { 'Cache-Control': 'no-cache', 'Pragma': 'no-cache' } })
+  fetch(withCluster('/api/status'), { cache: 'no-store', headers: { 'Cache-Control': 'no-cache', 'Pragma': 'no-cache' } })
     .then(response => response.json())
     .then(data => {
+      // Drop responses for a cluster that is no longer selected
+      if (window.currentCluster && data.cluster && data.cluster !== window.currentCluster) return;
+      window.lastNodesStatus = data.nodes || data;
+      window.probeLatency = data.probes || {};
       renderOverview(data.nodes || data);
       updateDelayHistories(data.nodes || data);
       renderDelayCharts(data.nodes || data);
+      loadTimeline();
       loadServerWeights(data.haproxy_weights);
-      resetCountdown();
+      resetCountdown(uiRefreshSeconds(data.poll_intervals));
     })
     .catch(error => console.error('Error fetching status:', error));
 }
@@ -121,7 +173,7 @@ function refreshStatus() {
 // Load nodes data globally for other modules
 function loadNodesData() {
   if (!window.nodesData) {
-    fetch('/api/nodes')
+    fetch(withCluster('/api/nodes'))
       .then(response => response.json())
       .then(data => {
         if (data.ok && data.nodes) {
@@ -134,11 +186,23 @@ function loadNodesData() {
 
 // Initialize nodes data on page load
 document.addEventListener('DOMContentLoaded', loadNodesData);
+document.addEventListener('DOMContentLoaded', () => {
+  loadClusters();
+  const select = document.getElementById('cluster-select');
+  if (select) select.addEventListener('change', () => selectCluster(select.value));
+});
+
+// Follow the background collector: refresh as fast as the most urgent node is polled
+function uiRefreshSeconds(pollIntervals) {
+  const intervals = Object.values(pollIntervals || {});
+  if (!intervals.length) return 30;
+  return Math.min(30, Math.max(2, Math.ceil(Math.min(...intervals))));
+}
 
 let countdownInterval;
-function resetCountdown() {
+function resetCountdown(seconds = 30) {
   clearInterval(countdownInterval);
-  let countdown = 30;
+  let countdown = seconds;
   document.getElementById('refresh-countdown').textContent = countdown;
   countdownInterval = setInterval(() => {
     countdown--;
@@ -149,7 +213,7 @@ function resetCountdown() {
 
 function confirmRestart() {
   if (!confirm('Are you sure you want to restart HAProxy?')) return;
-  fetch('/api/haproxy/restart', { method: 'POST' })
+  fetch('/api/haproxy/restart', { method: 'POST', headers: { 'Content-Type': 'application/json' }, body: JSON.stringify({ cluster: window.currentCluster }) })
     .then(r => r.json())
     .then(res => {
       if (!res.ok) throw new Error(res.stderr || res.error || 'Failed');
@@ -161,7 +225,7 @@ function confirmRestart() {
 
 function hapEnable(host) {
   if (!confirm('Enable traffic to ' + host + ' in HAProxy?')) return;
-  fetch('/api/haproxy/server/enable', { method: 'POST', headers: { 'Content-Type': 'application/json' }, body: JSON.stringify({ host }) })
+  fetch('/api/haproxy/server/enable', { method: 'POST', headers: { 'Content-Type': 'application/json' }, body: JSON.stringify({ host, cluster: window.currentCluster }) })
     .then(r => r.json())
     .then(res => { 
       if (!res.ok) throw new Error(res.error || res.message || 'Failed'); 
@@ -173,7 +237,7 @@ function hapEnable(host) {
 
 function hapDisable(host) {
   if (!confirm('Disable traffic to ' + host + ' in HAProxy?')) return;
-  fetch('/api/haproxy/server/disable', { method: 'POST', headers: { 'Content-Type': 'application/json' }, body: JSON.stringify({ host }) })
+  fetch('/api/haproxy/server/disable', { method: 'POST', headers: { 'Content-Type': 'application/json' }, body: JSON.stringify({ host, cluster: window.currentCluster }) })
     .then(r => r.json())
     .then(res => { 
       if (!res.ok) throw new Error(res.error || res.message || 'Failed'); 
@@ -225,7 +289,8 @@ function setServerWeight() {
     contentType: 'application/json',
     data: JSON.stringify({
       server_name: host,
-      weight: weight
+      weight: weight,
+      cluster: window.currentCluster
     })
   })
   .done(function(data) {
@@ -268,6 +333,8 @@ function loadServerWeights(weights) {
 }
 
 window.refreshStatus = refreshStatus;
+window.withCluster = withCluster;
+window.selectCluster = selectCluster;
 window.confirmRestart = confirmRestart;
 window.hapEnable = hapEnable;
 window.hapDisable = hapDisable;
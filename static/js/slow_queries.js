@@ -3,9 +3,27 @@
 // Global variables
 let currentNodeForSlowQueries = null;
 let slowQueryThreshold = 1; // Default threshold in seconds
+let slowQueriesTable = null;
 
 // Initialize slow queries tab
 function initSlowQueries() {
+  slowQueriesTable = new VirtualTable(document.getElementById('slow-queries-table'), {
+    emptyText: 'No slow queries found',
+    columns: [
+      { key: 'start_time', title: 'Time', type: 'date' },
+      {
+        key: 'query_time', title: 'Query Time', type: 'number', sortBy: 'query_time_seconds',
+        className: (value, row, cols) => 'slow-query-time ' + slowQueryTimeClass(cols.query_time_seconds[row]),
+        render: value => escapeSlowQueryText(value) + 's'
+      },
+      { key: 'lock_time', title: 'Lock Time', type: 'number', sortBy: 'lock_time_seconds', render: value => escapeSlowQueryText(value) + 's' },
+      { key: 'rows_examined', title: 'Rows', type: 'number' },
+      { key: 'db', title: 'Database' },
+      { key: 'sql_text', title: 'Query', className: () => 'query-cell' }
+    ],
+    fields: ['query_time_seconds', 'lock_time_seconds']
+  });
+
   // Populate node select dropdown
   populateSlowQueryNodeSelect();
   
@@ -15,6 +33,10 @@ function initSlowQueries() {
     currentNodeForSlowQueries = this.value;
     fetchSlowQueries();
   });
+  document.addEventListener('clusterchange', function() {
+    currentNodeForSlowQueries = null;
+    populateSlowQueryNodeSelect();
+  });
   
   // Add tab change listener
   document.getElementById('slow-queries-tab').addEventListener('shown.bs.tab', function() {
@@ -45,7 +67,7 @@ function populateSlowQueryNodeSelect() {
     }
   } else {
     // Fallback: Load nodes from API
-    fetch('/api/nodes')
+    fetch(withCluster('/api/nodes'))
       .then(response => response.json())
       .then(data => {
         if (data.ok && data.nodes) {
@@ -67,18 +89,17 @@ function fetchSlowQueries() {
   if (!currentNodeForSlowQueries) return;
   
   const limit = document.getElementById('slow-query-limit').value;
-  const tbody = document.getElementById('slow-queries-tbody');
   
   // Show loading
-  tbody.innerHTML = '<tr><td colspan="6" class="text-center">Loading slow queries...</td></tr>';
+  slowQueriesTable.showMessage('Loading slow queries...');
   
   // Fetch data from API
-  fetch(`/api/slow_queries?host=${encodeURIComponent(currentNodeForSlowQueries)}&limit=${limit}`)
+  fetch(withCluster(`/api/slow_queries?host=${encodeURIComponent(currentNodeForSlowQueries)}&limit=${limit}`))
     .then(response => response.json())
     .then(data => {
       if (data.error) {
         showSlowQueryStatus('error', data.error);
-        tbody.innerHTML = `<tr><td colspan="6" class="text-center text-danger">${data.error}</td></tr>`;
+        slowQueriesTable.showMessage(escapeSlowQueryText(data.error), 'text-danger');
         return;
       }
       
@@ -86,66 +107,33 @@ function fetchSlowQueries() {
         renderSlowQueries(data.slow_queries);
         hideSlowQueryStatus();
       } else {
-        tbody.innerHTML = '<tr><td colspan="6" class="text-center">No slow queries found</td></tr>';
+        slowQueriesTable.showMessage('No slow queries found');
         showSlowQueryStatus('info', 'No slow queries found.');
       }
     })
     .catch(error => {
       console.error('Error fetching slow queries:', error);
-      tbody.innerHTML = `<tr><td colspan="6" class="text-center text-danger">Error fetching slow queries</td></tr>`;
+      slowQueriesTable.showMessage('Error fetching slow queries', 'text-danger');
       showSlowQueryStatus('error', 'Error fetching slow queries');
     });
 }
 
 // Render slow queries table
 function renderSlowQueries(queries) {
-  const tbody = document.getElementById('slow-queries-tbody');
-  tbody.innerHTML = '';
-  
-  for (const query of queries) {
-    const row = document.createElement('tr');
-    
-    // Format time
-    const timeCell = document.createElement('td');
-    timeCell.textContent = query.start_time;
-    row.appendChild(timeCell);
-    
-    // Format query time with color coding
-    const queryTimeCell = document.createElement('td');
-    queryTimeCell.textContent = query.query_time + 's';
-    queryTimeCell.className = 'slow-query-time';
-    
-    // Color code based on query time
-    if (query.query_time < 1) {
-      queryTimeCell.classList.add('normal');
-    } else if (query.query_time < 5) {
-      queryTimeCell.classList.add('warning');
-    }
-    row.appendChild(queryTimeCell);
-    
-    // Lock time
-    const lockTimeCell = document.createElement('td');
-    lockTimeCell.textContent = query.lock_time + 's';
-    row.appendChild(lockTimeCell);
-    
-    // Rows examined/sent
-    const rowsCell = document.createElement('td');
-    rowsCell.textContent = query.rows_examined;
-    row.appendChild(rowsCell);
-    
-    // Database
-    const dbCell = document.createElement('td');
-    dbCell.textContent = query.db || '-';
-    row.appendChild(dbCell);
-    
-    // Query with truncation
-    const queryCell = document.createElement('td');
-    queryCell.className = 'query-cell';
-    queryCell.textContent = query.sql_text || '-';
-    row.appendChild(queryCell);
-    
-    tbody.appendChild(row);
-  }
+  slowQueriesTable.setData(queries);
+}
+
+// Colour code based on query time
+function slowQueryTimeClass(seconds) {
+  if (seconds < slowQueryThreshold) return 'normal';
+  if (seconds < 5) return 'warning';
+  return '';
+}
+
+function escapeSlowQueryText(text) {
+  const div = document.createElement('div');
+  div.textContent = text === null || text === undefined ? '-' : String(text);
+  return div.innerHTML;
 }
 
 // Show status message
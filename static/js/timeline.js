@@ -0,0 +1,74 @@
+// State timeline strip: one bar per node coloured by wsrep state, ticks for other wsrep changes
+const TIMELINE_WINDOW_SECONDS = 86400;
+const TIMELINE_STATE_FIELD = 'wsrep_local_state_comment';
+const TIMELINE_STATE_CLASSES = {
+  'Synced': 'tl-synced',
+  'Donor/Desynced': 'tl-donor',
+  'Joining': 'tl-joining',
+  'Joined': 'tl-joining',
+  'Unreachable': 'tl-down'
+};
+
+function timelineTime(ts) {
+  return new Date(ts).toLocaleString();
+}
+
+// [{start, end, state}] for one host from its state and reachability events
+function timelineSegments(events, current, from, to) {
+  const first = field => events.find(e => e.field === field);
+  const initial = field => (first(field) ? first(field).before : current[field]);
+  let state = initial(TIMELINE_STATE_FIELD) || 'Unknown';
+  let reachable = initial('reachable') !== 'OFF';
+  const segments = [];
+  let start = from;
+  const shown = () => (reachable ? state : 'Unreachable');
+  events.forEach(e => {
+    if (e.field !== TIMELINE_STATE_FIELD && e.field !== 'reachable') return;
+    const before = shown();
+    if (e.field === 'reachable') reachable = e.after !== 'OFF';
+    else state = e.after;
+    if (shown() === before) return;
+    segments.push({ start, end: e.ts, state: before });
+    start = e.ts;
+  });
+  segments.push({ start, end: to, state: shown() });
+  return segments;
+}
+
+function renderTimeline(data) {
+  const container = document.getElementById('timeline-container');
+  if (!container) return;
+  const byHost = {};
+  Object.keys(data.current || {}).forEach(host => { byHost[host] = []; });
+  data.events.forEach(e => { (byHost[e.host] = byHost[e.host] || []).push(e); });
+  const span = Math.max(data.to - data.from, 1);
+  // A truncated page only knows the states up to its last event; leave the rest of the bar empty
+  const end = data.next_cursor && data.events.length ? data.events[data.events.length - 1].ts : data.to;
+  const pct = ts => (Math.min(Math.max(ts, data.from), data.to) - data.from) / span * 100;
+  const rows = Object.keys(byHost).sort().map(host => {
+    const events = byHost[host];
+    const segments = timelineSegments(events, (data.current || {})[host] || {}, data.from, end)
+      .map(s => `<div class="tl-segment ${TIMELINE_STATE_CLASSES[s.state] || 'tl-other'}" style="left:${pct(s.start).toFixed(3)}%;width:${(pct(s.end) - pct(s.start)).toFixed(3)}%" title="${escapeHtml(s.state)}: ${timelineTime(s.start)} – ${timelineTime(s.end)}"></div>`)
+      .join('');
+    const ticks = events
+      .filter(e => e.field !== TIMELINE_STATE_FIELD && e.field !== 'reachable')
+      .map(e => `<div class="tl-tick" style="left:${pct(e.ts).toFixed(3)}%" title="${timelineTime(e.ts)} ${escapeHtml(e.field)}: ${escapeHtml(e.before)} → ${escapeHtml(e.after)}"></div>`)
+      .join('');
+    return `<div class="tl-row"><div class="tl-host">${escapeHtml(host)}</div><div class="tl-bar">${segments}${ticks}</div></div>`;
+  });
+  container.innerHTML = rows.length
+    ? `<div class="group-title">State timeline (24h)${data.next_cursor ? ' – truncated' : ''}</div>${rows.join('')}`
+    : '';
+}
+
+function loadTimeline() {
+  const params = new URLSearchParams({ window: TIMELINE_WINDOW_SECONDS, limit: 5000 });
+  fetch(withCluster(`/api/timeline?${params.toString()}`), { cache: 'no-store' })
+    .then(response => response.json())
+    .then(data => {
+      if (!data.ok) throw new Error(data.error || 'Failed to load timeline');
+      if (window.currentCluster && data.cluster !== window.currentCluster) return;
+      renderTimeline(data);
+    })
+    .catch(error => console.error('Error fetching timeline:', error));
+}
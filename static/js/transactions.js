@@ -6,6 +6,8 @@ let transactionsData = null;
 
 // Initialize transactions tab
 function initTransactionsTab() {
+    initTransactionsTables();
+
     // Populate node selection
     populateTransactionsNodeSelect();
     
@@ -67,6 +69,11 @@ function initTransactionsTab() {
     });
     
     // refresh-processes button event listener added above
+
+    document.addEventListener('clusterchange', function() {
+        selectedTransactionsNode = null;
+        populateTransactionsNodeSelect();
+    });
 }
 
 // Populate node selection dropdown
@@ -98,7 +105,7 @@ function populateTransactionsNodeSelect() {
         }
     } else {
         // Fallback: Load nodes from API
-        fetch('/api/nodes')
+        fetch(withCluster('/api/nodes'))
             .then(response => response.json())
             .then(data => {
                 if (data.ok && data.nodes) {
@@ -115,6 +122,66 @@ function populateTransactionsNodeSelect() {
     }
 }
 
+// Virtualized tables for the transactions, locks and processes tabs
+let transactionsTable = null;
+let locksTable = null;
+let processesTable = null;
+
+function initTransactionsTables() {
+    transactionsTable = new VirtualTable(document.getElementById('transactions-table'), {
+        emptyText: 'No active transactions',
+        columns: [
+            { key: 'trx_id', title: 'ID' },
+            {
+                key: 'trx_state', title: 'State',
+                className: (value, row, cols) => cols.trx_wait_started[row] ? 'transaction-state-waiting' : 'transaction-state-active'
+            },
+            { key: 'trx_started', title: 'Started', type: 'date', render: value => formatDate(value) },
+            { key: 'trx_mysql_thread_id', title: 'Thread ID', type: 'number' },
+            { key: 'trx_query', title: 'Query', className: () => 'query-cell', render: value => renderShortQuery(value) }
+        ],
+        fields: ['trx_wait_started']
+    });
+
+    locksTable = new VirtualTable(document.getElementById('locks-table'), {
+        emptyText: 'No active locks',
+        columns: [
+            { key: 'lock_id', title: 'Lock ID' },
+            { key: 'lock_trx_id', title: 'Transaction ID' },
+            { key: 'lock_mode', title: 'Mode' },
+            { key: 'lock_type', title: 'Type' },
+            { key: 'lock_table', title: 'Table' }
+        ]
+    });
+
+    processesTable = new VirtualTable(document.getElementById('processes-table'), {
+        emptyText: 'No active processes',
+        columns: [
+            { key: 'id', title: 'ID', type: 'number' },
+            { key: 'user', title: 'User' },
+            { key: 'host', title: 'Host' },
+            { key: 'db', title: 'DB' },
+            { key: 'command', title: 'Command' },
+            { key: 'time', title: 'Time', type: 'number', className: value => processTimeClass(value), render: value => formatTime(value) },
+            { key: 'state', title: 'State' },
+            { key: 'info', title: 'Info', className: () => 'query-cell', render: value => renderShortQuery(value) },
+            {
+                key: 'kill', title: 'Actions', sortable: false,
+                render: (value, row, cols) => cols.command[row] !== 'Daemon' ?
+                    `<button class="btn btn-sm btn-danger kill-process" data-process-id="${cols.id[row]}">Kill</button>` : ''
+            }
+        ]
+    });
+
+    // Rows are re-rendered on scroll, so kill buttons use a delegated handler
+    processesTable.tbody.addEventListener('click', function(event) {
+        const button = event.target.closest('.kill-process');
+        if (button) {
+            killProcess(button.getAttribute('data-process-id'));
+        }
+    });
+}
+
 // Fetch transactions data
 function fetchTransactions() {
     if (!selectedTransactionsNode) return;
@@ -122,10 +189,10 @@ function fetchTransactions() {
     const limit = document.getElementById('transactions-limit').value || '50';
     
     // Show loading status
-    document.getElementById('transactions-tbody').innerHTML = '<tr><td colspan="5" class="text-center">Loading transactions...</td></tr>';
-    document.getElementById('locks-tbody').innerHTML = '<tr><td colspan="5" class="text-center">Loading locks...</td></tr>';
+    transactionsTable.showMessage('Loading transactions...');
+    locksTable.showMessage('Loading locks...');
     
-    fetch(`/api/transactions?host=${encodeURIComponent(selectedTransactionsNode)}&limit=${limit}`)
+    fetch(withCluster(`/api/transactions?host=${encodeURIComponent(selectedTransactionsNode)}&limit=${limit}`))
         .then(response => response.json())
         .then(data => {
             if (data.ok) {
@@ -135,14 +202,14 @@ function fetchTransactions() {
                 hideTransactionsStatus();
             } else {
                 showTransactionsStatus('Failed to load transactions: ' + (data.error || 'Unknown error'), 'danger');
-                document.getElementById('transactions-tbody').innerHTML = '<tr><td colspan="5" class="text-center">Failed to load transactions</td></tr>';
-                document.getElementById('locks-tbody').innerHTML = '<tr><td colspan="5" class="text-center">Failed to load locks</td></tr>';
+                transactionsTable.showMessage('Failed to load transactions');
+                locksTable.showMessage('Failed to load locks');
             }
         })
         .catch(error => {
             showTransactionsStatus('Failed to load transactions: ' + error.message, 'danger');
-            document.getElementById('transactions-tbody').innerHTML = '<tr><td colspan="5" class="text-center">Failed to load transactions</td></tr>';
-            document.getElementById('locks-tbody').innerHTML = '<tr><td colspan="5" class="text-center">Failed to load locks</td></tr>';
+            transactionsTable.showMessage('Failed to load transactions');
+            locksTable.showMessage('Failed to load locks');
         });
 }
 
@@ -151,9 +218,9 @@ function fetchProcesses() {
     if (!selectedTransactionsNode) return;
     
     // Show loading status
-    document.getElementById('processes-tbody').innerHTML = '<tr><td colspan="8" class="text-center">Loading processes...</td></tr>';
+    processesTable.showMessage('Loading processes...');
     
-    fetch(`/api/process_list?host=${encodeURIComponent(selectedTransactionsNode)}`)
+    fetch(withCluster(`/api/process_list?host=${encodeURIComponent(selectedTransactionsNode)}`))
         .then(response => response.json())
         .then(data => {
             if (data.ok) {
@@ -161,130 +228,42 @@ function fetchProcesses() {
                 hideTransactionsStatus();
             } else {
                 showTransactionsStatus('Failed to load processes: ' + (data.error || 'Unknown error'), 'danger');
-                document.getElementById('processes-tbody').innerHTML = '<tr><td colspan="8" class="text-center">Failed to load processes</td></tr>';
+                processesTable.showMessage('Failed to load processes');
             }
         })
         .catch(error => {
             showTransactionsStatus('Failed to load processes: ' + error.message, 'danger');
-            document.getElementById('processes-tbody').innerHTML = '<tr><td colspan="8" class="text-center">Failed to load processes</td></tr>';
+            processesTable.showMessage('Failed to load processes');
         });
 }
 
 // Render transactions table
 function renderTransactions(transactions) {
-    const tbody = document.getElementById('transactions-tbody');
-    tbody.innerHTML = '';
-    
-    if (!transactions || transactions.length === 0) {
-        tbody.innerHTML = '<tr><td colspan="5" class="text-center">No active transactions</td></tr>';
-        return;
-    }
-    
-    transactions.forEach(trx => {
-        // Determine state class
-        let stateClass = 'transaction-state-active';
-        if (trx.trx_wait_started) {
-            stateClass = 'transaction-state-waiting';
-        }
-        
-        // Format query for display
-        const query = trx.trx_query || 'No query';
-        const shortQuery = query.length > 100 ? query.substring(0, 100) + '...' : query;
-        
-        // Create row
-        const row = `
-            <tr>
-                <td>${trx.trx_id}</td>
-                <td class="${stateClass}">${trx.trx_state}</td>
-                <td>${formatDate(trx.trx_started)}</td>
-                <td>${trx.trx_mysql_thread_id}</td>
-                <td title="${escapeHtml(query)}">${escapeHtml(shortQuery)}</td>
-            </tr>
-        `;
-        
-        tbody.innerHTML += row;
-    });
+    transactionsTable.setData(transactions || []);
 }
 
 // Render locks table
 function renderLocks(locks) {
-    const tbody = document.getElementById('locks-tbody');
-    tbody.innerHTML = '';
-    
-    if (!locks || locks.length === 0) {
-        tbody.innerHTML = '<tr><td colspan="5" class="text-center">No active locks</td></tr>';
-        return;
-    }
-    
-    locks.forEach(lock => {
-        // Create row
-        const row = `
-            <tr>
-                <td>${lock.lock_id}</td>
-                <td>${lock.lock_trx_id}</td>
-                <td>${lock.lock_mode}</td>
-                <td>${lock.lock_type}</td>
-                <td>${lock.lock_table}</td>
-            </tr>
-        `;
-        
-        tbody.innerHTML += row;
-    });
+    locksTable.setData(locks || []);
 }
 
 // Render processes table
 function renderProcesses(processes) {
-    const tbody = document.getElementById('processes-tbody');
-    tbody.innerHTML = '';
-    
-    if (!processes || processes.length === 0) {
-        tbody.innerHTML = '<tr><td colspan="8" class="text-center">No active processes</td></tr>';
-        return;
-    }
-    
-    processes.forEach(process => {
-        // Determine time class
-        let timeClass = 'transaction-time-short';
-        if (process.time > 60) {
-            timeClass = 'transaction-time-medium';
-        }
-        if (process.time > 300) {
-            timeClass = 'transaction-time-long';
-        }
-        
-        // Format query for display
-        const info = process.info || 'No query';
-        const shortInfo = info.length > 100 ? info.substring(0, 100) + '...' : info;
-        
-        // Create row with kill button for non-system processes
-        const killButton = process.command !== 'Daemon' ? 
-            `<button class="btn btn-sm btn-danger kill-process" data-process-id="${process.id}">Kill</button>` : 
-            '';
-        
-        const row = `
-            <tr>
-                <td>${process.id}</td>
-                <td>${process.user}</td>
-                <td>${process.host}</td>
-                <td>${process.db || '-'}</td>
-                <td>${process.command}</td>
-                <td class="${timeClass}">${formatTime(process.time)}</td>
-                <td>${process.state || '-'}</td>
-                <td title="${escapeHtml(info)}">${escapeHtml(shortInfo)}</td>
-                <td>${killButton}</td>
-            </tr>
-        `;
-        
-        tbody.innerHTML += row;
-    });
-    
-    // Add event listeners for kill buttons
-    document.querySelectorAll('.kill-process').forEach(button => {
-        button.addEventListener('click', function() {
-            const processId = this.getAttribute('data-process-id');
-            killProcess(processId);
-        });
-    });
+    processesTable.setData(processes || []);
+}
+
+// Truncate long SQL text for a table cell, keeping the full text as tooltip
+function renderShortQuery(query) {
+    const text = query || 'No query';
+    const shortText = text.length > 100 ? text.substring(0, 100) + '...' : text;
+    return `<span title="${escapeHtml(text)}">${escapeHtml(shortText)}</span>`;
+}
+
+// Colour process runtime by how long it has been running
+function processTimeClass(seconds) {
+    if (seconds > 300) return 'transaction-time-long';
+    if (seconds > 60) return 'transaction-time-medium';
+    return 'transaction-time-short';
 }
 
 // Kill a process
@@ -300,6 +279,7 @@ function killProcess(processId) {
         },
         body: JSON.stringify({
             host: selectedTransactionsNode,
+            cluster: window.currentCluster,
             process_id: processId
         })
     })
@@ -357,7 +337,7 @@ function formatTime(seconds) {
 // Escape HTML to prevent XSS
 function escapeHtml(text) {
     if (!text) return '';
-    return text
+    return String(text)
         .replace(/&/g, "&amp;")
         .replace(/</g, "&lt;")
         .replace(/>/g, "&gt;")
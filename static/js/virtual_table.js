@@ -0,0 +1,180 @@
+// Virtualized table rendering
+//
+// Renders only the visible window of rows from a columnar data set
+// ({ key: [values...] }) so tables with thousands of rows stay responsive.
+// Sorting uses index arrays that are computed once per column and reused
+// for both directions until new data is loaded.
+
+const VT_DEFAULT_ROW_HEIGHT = 33;
+const VT_OVERSCAN = 10;
+
+// Convert an array of row objects into columnar arrays
+function toColumns(rows, keys) {
+    const columns = {};
+    keys.forEach(key => { columns[key] = new Array(rows.length); });
+    for (let i = 0; i < rows.length; i++) {
+        const row = rows[i];
+        for (const key of keys) columns[key][i] = row[key];
+    }
+    return { columns, length: rows.length };
+}
+
+function vtEscape(text) {
+    return String(text)
+        .replace(/&/g, '&amp;')
+        .replace(/</g, '&lt;')
+        .replace(/>/g, '&gt;')
+        .replace(/"/g, '&quot;')
+        .replace(/'/g, '&#039;');
+}
+
+function vtCompare(a, b, type) {
+    const aMissing = a === null || a === undefined || a === '';
+    const bMissing = b === null || b === undefined || b === '';
+    if (aMissing || bMissing) return aMissing === bMissing ? 0 : (aMissing ? 1 : -1);
+    if (type === 'number') return (parseFloat(a) || 0) - (parseFloat(b) || 0);
+    if (type === 'date') return new Date(a).getTime() - new Date(b).getTime();
+    return String(a).localeCompare(String(b));
+}
+
+class VirtualTable {
+    /**
+      * @param {HTMLElement} container  element that receives the scrolling table
+      * @param {Object} options
+      *   columns: [{ key, title, type, sortable, sortBy, render(value, row, cols), className(value, row, cols) }]
+      *   fields: extra keys kept in the columnar data without being displayed
+      *   height: viewport height in px, rowHeight: fixed row height in px
+      */
+    constructor(container, options) {
+        this.container = container;
+        this.columns = options.columns;
+        this.keys = this.columns.map(col => col.key).concat(options.fields || []);
+        this.rowHeight = options.rowHeight || VT_DEFAULT_ROW_HEIGHT;
+        this.height = options.height || 500;
+        this.emptyText = options.emptyText || 'No data';
+        this.data = { columns: {}, length: 0 };
+        this.order = null;
+        this.sortIndexes = {};
+        this.sortKey = null;
+        this.sortDesc = false;
+        this.message = null;
+        this.framePending = false;
+
+        this.container.innerHTML = `
+            <div class="virtual-table-scroll" style="height: ${this.height}px;">
+                <table class="table table-dark table-hover virtual-table">
+                    <thead><tr></tr></thead>
+                    <tbody></tbody>
+                </table>
+            </div>
+        `;
+        this.scroller = this.container.querySelector('.virtual-table-scroll');
+        this.thead = this.container.querySelector('thead tr');
+        this.tbody = this.container.querySelector('tbody');
+        this.renderHeader();
+        this.scroller.addEventListener('scroll', () => this.scheduleRender());
+    }
+
+    renderHeader() {
+        this.thead.innerHTML = this.columns.map(col => {
+            const sortable = col.sortable !== false;
+            let indicator = '';
+            if (this.sortKey === col.key) indicator = this.sortDesc ? ' ▼' : ' ▲';
+            return `<th class="${sortable ? 'sortable' : ''}" data-key="${col.key}">${col.title}${indicator}</th>`;
+        }).join('');
+        this.thead.querySelectorAll('th.sortable').forEach(th => {
+            th.addEventListener('click', () => this.toggleSort(th.getAttribute('data-key')));
+        });
+    }
+
+    // Replace the data set; accepts either row objects or { columns, length }
+    setData(data) {
+        if (Array.isArray(data)) data = toColumns(data, this.keys);
+        this.data = data;
+        this.sortIndexes = {};
+        this.message = null;
+        this.order = this.sortKey ? this.getSortIndex(this.sortKey) : null;
+        this.render();
+    }
+
+    // Show a single full-width message row (loading, errors, empty results)
+    showMessage(text, className = '') {
+        this.message = { text, className };
+        this.scroller.scrollTop = 0;
+        this.render();
+    }
+
+    getSortIndex(key) {
+        if (!this.sortIndexes[key]) {
+            const col = this.columns.find(c => c.key === key) || {};
+            const values = this.data.columns[col.sortBy || key] || [];
+            const index = new Uint32Array(this.data.length);
+            for (let i = 0; i < index.length; i++) index[i] = i;
+            index.sort((a, b) => vtCompare(values[a], values[b], col.type) || a - b);
+            this.sortIndexes[key] = index;
+        }
+        return this.sortIndexes[key];
+    }
+
+    toggleSort(key) {
+        if (this.sortKey === key) {
+            this.sortDesc = !this.sortDesc;
+        } else {
+            this.sortKey = key;
+            this.sortDesc = false;
+        }
+        this.order = this.getSortIndex(key);
+        this.renderHeader();
+        this.render();
+    }
+
+    // Map a visible position to a row index in the columnar data
+    rowAt(position) {
+        if (!this.order) return position;
+        return this.sortDesc ? this.order[this.order.length - 1 - position] : this.order[position];
+    }
+
+    scheduleRender() {
+        if (this.framePending) return;
+        this.framePending = true;
+        requestAnimationFrame(() => {
+            this.framePending = false;
+            this.render();
+        });
+    }
+
+    render() {
+        const colspan = this.columns.length;
+        if (this.message || this.data.length === 0) {
+            const text = this.message ? this.message.text : this.emptyText;
+            const className = this.message ? this.message.className : '';
+            this.tbody.innerHTML = `<tr><td colspan="${colspan}" class="text-center ${className}">${text}</td></tr>`;
+            return;
+        }
+
+        const total = this.data.length;
+        const visible = Math.ceil(this.height / this.rowHeight);
+        const start = Math.max(0, Math.floor(this.scroller.scrollTop / this.rowHeight) - VT_OVERSCAN);
+        const end = Math.min(total, start + visible + 2 * VT_OVERSCAN);
+        const cols = this.data.columns;
+
+        const parts = [];
+        if (start > 0) parts.push(`<tr class="virtual-spacer" style="height: ${start * this.rowHeight}px;"><td colspan="${colspan}"></td></tr>`);
+        for (let pos = start; pos < end; pos++) {
+            const row = this.rowAt(pos);
+            parts.push(`<tr data-row="${row}" style="height: ${this.rowHeight}px;">`);
+            for (const col of this.columns) {
+                const value = cols[col.key] ? cols[col.key][row] : undefined;
+                const cls = col.className ? col.className(value, row, cols) : '';
+                const html = col.render ? col.render(value, row, cols) : vtEscape(value === null || value === undefined ? '-' : value);
+                parts.push(`<td class="${cls}">${html}</td>`);
+            }
+            parts.push('</tr>');
+        }
+        if (end < total) parts.push(`<tr class="virtual-spacer" style="height: ${(total - end) * this.rowHeight}px;"><td colspan="${colspan}"></td></tr>`);
+        this.tbody.innerHTML = parts.join('');
+    }
+}
+
+window.VirtualTable = VirtualTable;
+window.toColumns = toColumns;
@@ -0,0 +1,65 @@
+import pytest
+
+from src import config
+
+CLUSTER = {'name': 'test', 'nodes': [{'host': 'node1'}, {'host': 'node2'}]}
+
+
+@pytest.fixture
+def nodes(monkeypatch):
+    """Fake globals per host; SET GLOBAL stores what store(host, value) returns"""
+    state = {'values': {'node1': {}, 'node2': {}}, 'store': lambda host, value: value}
+
+    def read_global(cluster, host, variable):
+        return state['values'][host].get(variable, 'OLD')
+
+    def set_global(cluster, host, variable, value):
+        state['values'][host][variable] = state['store'](host, value)
+        return state['values'][host][variable]
+
+    monkeypatch.setattr(config, '_read_global', read_global)
+    monkeypatch.setattr(config, '_set_global', set_global)
+    return state
+
+
+@pytest.mark.parametrize('left, right', [('ON', 1), ('ON', '1'), ('OFF', 0), ('1', 1.0), ('true', 'ON')])
+def test_normalized_booleans_and_numbers_compare_equal(left, right):
+    assert config._normalized(left) == config._normalized(right)
+
+
+def test_on_read_back_as_1_is_applied(nodes):
+    nodes['store'] = lambda host, value: 1 if value == 'ON' else value
+
+    applied, results = config.update_cluster_variable(CLUSTER, 'slow_query_log', 'ON')
+
+    assert applied
+    assert {result['status'] for result in results.values()} == {'applied'}
+    assert {result['new_value'] for result in results.values()} == {1}
+
+
+def test_1_read_back_as_on_is_applied(nodes):
+    nodes['store'] = lambda host, value: 'ON' if value == 1 else value
+
+    applied, results = config.update_cluster_variable(CLUSTER, 'query_cache_type', 1)
+
+    assert applied
+    assert {result['new_value'] for result in results.values()} == {'ON'}
+
+
+def test_rounded_size_is_applied_with_the_stored_value(nodes):
+    nodes['store'] = lambda host, value: value // 1024 * 1024
+
+    applied, results = config.update_cluster_variable(CLUSTER, 'max_allowed_packet', 1000000)
+
+    assert applied
+    assert {result['new_value'] for result in results.values()} == {999424}
+
+
+def test_nodes_storing_different_values_are_rolled_back(nodes):
+    nodes['store'] = lambda host, value: value + 1 if host == 'node2' and value != 'OLD' else value
+
+    applied, results = config.update_cluster_variable(CLUSTER, 'max_connections', 500)
+
+    assert not applied
+    assert {result['status'] for result in results.values()} == {'rolled_back'}
+    assert {result['new_value'] for result in results.values()} == {'OLD'}